@@ -0,0 +1,254 @@
+"""
+
+Инкрементальные суммы по варианту
+
+VariantAggregate keeps the running sums of the multiple objects calculation
+(NP, NPhr, weighted q0 numerators, Qu, device counts) per group of consumers
+(see group_consumers). Adding or removing a consumer recalculates the terms
+of its group only and replaces the group contribution in the sums, so it
+costs O(1); alphas and flows are derived from the sums only when totals are
+requested. Sums are exact and rounded once in totals(), as the stages of the
+report round them, so totals equal the report of the same consumers digit
+for digit. RunningSums is the same without the per-object entries that
+removal needs.
+
+"""
+
+from decimal import Decimal, localcontext
+
+from mathematics import (
+    DEFAULT_PRECISION,
+    K_0_3,
+    K_0_005,
+    K_1_16,
+    K_5,
+    EXACT_CONTEXT,
+    ConsumerGroup,
+    ConsumerTerms,
+    PrecisionPolicy,
+    WaterConsumerParams,
+    aproximate_alpha,
+    consumer_key,
+    norms_kernel,
+    precision_context,
+    record,
+    _d,
+)
+
+_SUM_FIELDS = (
+    "NP_tot", "NP_h", "NP_c",
+    "NP_tot_0", "NP_hot_0", "NP_cold_0",
+    "NPhr_tot", "NPhr_h", "NPhr_c",
+    "NPhr_tot_0", "NPhr_hot_0", "NPhr_cold_0",
+    "Qu_tot", "Qu_h", "Qu_c",
+)
+
+
+@record
+class VariantTotals:
+    num_of_consumers: int
+    N_tot: int
+    N_h: int
+    # Секундный расход
+    NPs_tot_sum: Decimal
+    NPs_h_sum: Decimal
+    NPs_c_sum: Decimal
+    alpha_tot: Decimal
+    alpha_h: Decimal
+    alpha_c: Decimal
+    q0_tot: Decimal
+    q0_h: Decimal
+    q0_c: Decimal
+    q_tot: Decimal
+    q_h: Decimal
+    q_c: Decimal
+    # Часовой расход
+    NPhrs_tot_sum: Decimal
+    NPhrs_h_sum: Decimal
+    NPhrs_c_sum: Decimal
+    alpha_hr_tot: Decimal
+    alpha_hr_h: Decimal
+    alpha_hr_c: Decimal
+    q0hr_tot: Decimal
+    q0hr_h: Decimal
+    q0hr_c: Decimal
+    qhr_tot: Decimal
+    qhr_h: Decimal
+    qhr_c: Decimal
+    # Суточный расход
+    Qu_total: Decimal
+    Qu_hot: Decimal
+    Qu_cold: Decimal
+    # Тепловой поток
+    Q_avg_hour: Decimal
+    Q_max_hour: Decimal
+
+
+class _Contribution:
+    __slots__ = _SUM_FIELDS
+
+    def __init__(self, params: WaterConsumerParams, t: ConsumerTerms):
+        k = norms_kernel(params.consumer_norms)
+
+        self.NP_tot, self.NP_h, self.NP_c = t.nP_tot, t.nP_h, t.nP_c
+        self.NP_tot_0, self.NP_hot_0, self.NP_cold_0 = t.nP_tot * k.q0, t.nP_h * k.q0, t.nP_c * k.q0
+        self.NPhr_tot, self.NPhr_h, self.NPhr_c = t.nPhr_tot, t.nPhr_h, t.nPhr_c
+        self.NPhr_tot_0 = t.nPhr_tot * k.q0tot_hr
+        self.NPhr_hot_0 = t.nPhr_h * k.q0_hr
+        self.NPhr_cold_0 = t.nPhr_c * k.q0_hr
+        self.Qu_tot, self.Qu_h, self.Qu_c = t.Q_tot, t.Q_h, t.Q_c
+
+
+class RunningSums:
+    """Running sums of the multiple objects calculation.
+
+    Holds one entry per group of consumers, so any number of consumers can
+    be pushed through it in memory bound by the number of distinct groups.
+    """
+
+    def __init__(self, precision: PrecisionPolicy = DEFAULT_PRECISION):
+        self.precision = precision
+        self._first: WaterConsumerParams | None = None
+        self._count = 0
+        self._groups: dict[tuple, tuple[ConsumerGroup, _Contribution]] = {}
+        self.N_tot = 0
+        self.N_h = 0
+        for name in _SUM_FIELDS:
+            setattr(self, name, Decimal(0))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _apply(self, c: _Contribution, sign: int):
+        with localcontext(EXACT_CONTEXT):
+            for name in _SUM_FIELDS:
+                v = getattr(c, name)
+                setattr(self, name, getattr(self, name) + v if sign > 0 else getattr(self, name) - v)
+
+    def _update(self, params: WaterConsumerParams, sign: int):
+        # terms are linear in U, so the group is recalculated with its new U
+        key = consumer_key(params)
+        entry = self._groups.pop(key, None)
+        if entry is None:
+            group = ConsumerGroup(params, 0, 0)
+        else:
+            group, c = entry
+            self._apply(c, -1)
+
+        group.weight += sign
+        group.num_of_measurers += sign * params.num_of_measurers
+        if group.weight > 0:
+            with precision_context(self.precision):
+                c = _Contribution(group.params, group.terms())
+            self._groups[key] = (group, c)
+            self._apply(c, 1)
+
+        self.N_tot += sign * params.num_of_devices
+        self.N_h += sign * params.num_of_devices_hot
+        self._count += sign
+
+    def push(self, params: WaterConsumerParams):
+        if self._first is None:
+            self._first = params
+        self._update(params, 1)
+
+    def _first_params(self) -> WaterConsumerParams:
+        return self._first
+
+    def totals(self) -> VariantTotals:
+        if self._count == 0:
+            raise ValueError("Variant has no consumers")
+
+        first = self._first_params()
+
+        with precision_context(self.precision):
+            NP_tot, NP_h, NP_c = +self.NP_tot, +self.NP_h, +self.NP_c
+            NPhr_tot, NPhr_h, NPhr_c = +self.NPhr_tot, +self.NPhr_h, +self.NPhr_c
+            N_c = self.N_tot - self.N_h
+
+            alpha_tot = aproximate_alpha(NP_tot, self.N_tot)
+            alpha_h = aproximate_alpha(NP_h, self.N_h)
+            alpha_c = aproximate_alpha(NP_c, N_c)
+            alpha_hr_tot = aproximate_alpha(NPhr_tot, self.N_tot)
+            alpha_hr_h = aproximate_alpha(NPhr_h, self.N_h)
+            alpha_hr_c = aproximate_alpha(NPhr_c, N_c)
+
+            q0_tot = +self.NP_tot_0 / NP_tot
+            q0_h = +self.NP_hot_0 / NP_h
+            q0_c = +self.NP_cold_0 / NP_c
+            q0hr_tot = +self.NPhr_tot_0 / NPhr_tot
+            q0hr_h = +self.NPhr_hot_0 / NPhr_h
+            q0hr_c = +self.NPhr_cold_0 / NPhr_c
+
+            qhr_h = K_0_005 * NPhr_h * alpha_hr_h
+            Qu_hot = +self.Qu_h
+
+            temp_diff = _d(first.temp_hot) - _d(first.temp_cold)
+
+            return VariantTotals(
+                num_of_consumers=self._count,
+                N_tot=self.N_tot,
+                N_h=self.N_h,
+                NPs_tot_sum=NP_tot,
+                NPs_h_sum=NP_h,
+                NPs_c_sum=NP_c,
+                alpha_tot=alpha_tot,
+                alpha_h=alpha_h,
+                alpha_c=alpha_c,
+                q0_tot=q0_tot,
+                q0_h=q0_h,
+                q0_c=q0_c,
+                q_tot=K_5 * q0_tot * alpha_tot,
+                q_h=K_5 * q0_h * alpha_h,
+                q_c=K_5 * q0_c * alpha_c,
+                NPhrs_tot_sum=NPhr_tot,
+                NPhrs_h_sum=NPhr_h,
+                NPhrs_c_sum=NPhr_c,
+                alpha_hr_tot=alpha_hr_tot,
+                alpha_hr_h=alpha_hr_h,
+                alpha_hr_c=alpha_hr_c,
+                q0hr_tot=q0hr_tot,
+                q0hr_h=q0hr_h,
+                q0hr_c=q0hr_c,
+                qhr_tot=K_0_005 * NPhr_tot * alpha_hr_tot,
+                qhr_h=qhr_h,
+                qhr_c=K_0_005 * NPhr_c * alpha_hr_c,
+                Qu_total=+self.Qu_tot,
+                Qu_hot=Qu_hot,
+                Qu_cold=+self.Qu_c,
+                Q_avg_hour=K_1_16 * Qu_hot * temp_diff + qhr_h * K_0_3,
+                Q_max_hour=K_1_16 * qhr_h * temp_diff + qhr_h * K_0_3,
+            )
+
+
+class VariantAggregate(RunningSums):
+    def __init__(self, precision: PrecisionPolicy = DEFAULT_PRECISION):
+        super().__init__(precision)
+        self._objects: dict[str, list[WaterConsumerParams]] = {}
+
+    @staticmethod
+    def from_objects(
+        objects: list[tuple[str, WaterConsumerParams]],
+        precision: PrecisionPolicy = DEFAULT_PRECISION,
+    ) -> "VariantAggregate":
+        agg = VariantAggregate(precision)
+        for object_id, params in objects:
+            agg.add(object_id, params)
+        return agg
+
+    def add(self, object_id: str, params: WaterConsumerParams):
+        self._objects.setdefault(object_id, []).append(params)
+        self._update(params, 1)
+
+    def remove(self, object_id: str) -> bool:
+        entries = self._objects.get(object_id)
+        if not entries:
+            return False
+        params = entries.pop(0)
+        if not entries:
+            del self._objects[object_id]
+        self._update(params, -1)
+        return True
+
+    def _first_params(self) -> WaterConsumerParams:
+        return next(iter(self._objects.values()))[0]
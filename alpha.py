@@ -0,0 +1,196 @@
+"""
+
+Коэффициент alpha по таблицам СП 30.13330.2020
+
+Таблица Б.1 - при P > 0,1 и N <= 200: alpha = f(N, P)
+Таблица Б.2 - в остальных случаях: alpha = f(NP)
+
+"""
+
+from bisect import bisect_right
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+
+from assets_bundle import load_bundle
+
+
+N_LIMIT = 200
+P_LIMIT = 0.1
+
+
+def _clean(values: list[float]) -> tuple[float, ...]:
+    # NP_more_200 was generated with accumulating float steps (0.018000000000000002 etc.)
+    return tuple(round(v, 6) for v in values)
+
+
+def build_alpha_tables() -> tuple[tuple[float, ...], tuple[float, ...], tuple[tuple[float, ...], ...], tuple[float, ...], tuple[float, ...]]:
+    """(N axis, P axis, alpha grid) of table Б.1 and (NP axis, alpha) of table Б.2 from ml.data."""
+    from ml.data import N_less_200, P_less_200, alpha_less_200, NP_more_200, alpha_more_200
+
+    # Table Б.2: duplicated keys are collapsed to the last value
+    table: dict[float, float] = {}
+    for np_, a in zip(_clean(NP_more_200), alpha_more_200):
+        table[np_] = a
+    keys = sorted(table)
+
+    return (
+        _clean(N_less_200),
+        _clean(P_less_200),
+        tuple(tuple(row) for row in alpha_less_200),
+        tuple(keys),
+        tuple(table[k] for k in keys),
+    )
+
+
+_bundle = load_bundle()
+if _bundle is not None:
+    # zero-copy views into the mapped assets bundle
+    _N_ARR = _bundle["b1_n_axis"]
+    _P_ARR = _bundle["b1_p_axis"]
+    _GRID_ARR = _bundle["b1_alpha"]
+    _NP_ARR = _bundle["b2_np_axis"]
+    _NP_ALPHA_ARR = _bundle["b2_alpha"]
+else:
+    _N_ARR, _P_ARR, _GRID_ARR, _NP_ARR, _NP_ALPHA_ARR = (np.asarray(t, dtype=np.float64) for t in build_alpha_tables())
+
+# Table Б.1: rows by P, columns by N; Table Б.2: NP -> alpha.
+# Both lookups read these arrays directly; they are shared and read-only.
+for _arr in (_N_ARR, _P_ARR, _GRID_ARR, _NP_ARR, _NP_ALPHA_ARR):
+    _arr.flags.writeable = False
+
+# largest P of table Б.1, above it alpha is clamped
+P_TABLE_MAX = float(_P_ARR[-1])
+
+
+def _locate(axis: np.ndarray, x: float) -> tuple[int, float]:
+    """Index of the left grid node and the interpolation weight, clamped to the axis."""
+    if x <= axis[0]:
+        return 0, 0.0
+    if x >= axis[-1]:
+        return len(axis) - 2, 1.0
+    i = bisect_right(axis, x) - 1
+    return i, float((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+
+def alpha_by_N_and_P(N: float, P: float) -> float:
+    """Bilinear interpolation over table Б.1."""
+    i, ti = _locate(_P_ARR, P)
+    j, tj = _locate(_N_ARR, N)
+    (a00, a01), (a10, a11) = _GRID_ARR[i:i + 2, j:j + 2].tolist()
+
+    return (
+        a00 * (1 - ti) * (1 - tj)
+        + a01 * (1 - ti) * tj
+        + a10 * ti * (1 - tj)
+        + a11 * ti * tj
+    )
+
+
+def alpha_by_NP(NP: float) -> float:
+    """Linear interpolation over table Б.2."""
+    i, t = _locate(_NP_ARR, NP)
+    a0, a1 = _NP_ALPHA_ARR[i:i + 2].tolist()
+    return a0 + (a1 - a0) * t
+
+
+def use_small_table(N: float | None, NP: float) -> bool:
+    if N is None or N <= 0 or N > N_LIMIT:
+        return False
+    return NP / N > P_LIMIT
+
+
+def _slope(axis: np.ndarray, x: float, i: int) -> float:
+    # derivative of the interpolation weight; zero where x is clamped
+    if x <= axis[0] or x >= axis[-1]:
+        return 0.0
+    return float(1 / (axis[i + 1] - axis[i]))
+
+
+def alpha_slopes(NP: float, N: float | None = None) -> tuple[float, float]:
+    """Partial derivatives (d alpha / d NP, d alpha / d N) of the interpolated alpha.
+
+    Derivatives are those of the interpolation, not of the value rounded to
+    three digits by lookup_alpha, whose derivative is zero almost everywhere.
+    """
+    if not use_small_table(N, NP):
+        i, _ = _locate(_NP_ARR, NP)
+        a0, a1 = _NP_ALPHA_ARR[i:i + 2].tolist()
+        return (a1 - a0) * _slope(_NP_ARR, NP, i), 0.0
+
+    P = NP / N  # type:ignore
+    i, ti = _locate(_P_ARR, P)
+    j, tj = _locate(_N_ARR, N)  # type:ignore
+    (a00, a01), (a10, a11) = _GRID_ARR[i:i + 2, j:j + 2].tolist()
+
+    d_P = ((a10 - a00) * (1 - tj) + (a11 - a01) * tj) * _slope(_P_ARR, P, i)
+    d_N = ((a01 - a00) * (1 - ti) + (a11 - a10) * ti) * _slope(_N_ARR, N, j)  # type:ignore
+
+    # P = NP / N
+    return d_P / N, d_N - d_P * P / N  # type:ignore
+
+
+def alpha_value(NP: float, N: int | None = None) -> float:
+    """alpha of the tables rounded to three digits, the value of lookup_alpha."""
+    if use_small_table(N, NP):
+        alpha = alpha_by_N_and_P(N, NP / N)  # type:ignore
+    else:
+        alpha = alpha_by_NP(NP)
+    return round(alpha, 3)
+
+
+@lru_cache(maxsize=4096)
+def lookup_alpha(NP: Decimal, N: int | None = None) -> Decimal:
+    return Decimal(str(alpha_value(float(NP), N)))
+
+
+def _locate_array(axis: np.ndarray, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """_locate over an array, with the same arithmetic."""
+    i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 2)
+    t = (x - axis[i]) / (axis[i + 1] - axis[i])
+    return i, np.where(x <= axis[0], 0.0, np.where(x >= axis[-1], 1.0, t))
+
+
+def _round_array(alpha: np.ndarray) -> np.ndarray:
+    """round(alpha, 3) of every element, as lookup_alpha rounds."""
+    rounded = np.round(alpha, 3)
+    # np.round scales by 1000 first and may go the other way near a half,
+    # those few values are rounded one by one
+    scaled = alpha * 1000
+    near = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near.any():
+        rounded[near] = [round(v, 3) for v in alpha[near].tolist()]
+    return rounded
+
+
+def lookup_alpha_array(NP, N):
+    """Vectorized lookup_alpha over NumPy arrays (NaN stays NaN).
+
+    Interpolation and rounding are those of lookup_alpha, so every element
+    equals lookup_alpha of the same float NP and N.
+    """
+    shape = np.shape(NP)
+    NP = np.atleast_1d(np.asarray(NP, dtype=np.float64))
+    N = np.broadcast_to(np.asarray(N, dtype=np.float64), NP.shape)
+
+    i, t = _locate_array(_NP_ARR, NP)
+    alpha = _NP_ALPHA_ARR[i] + (_NP_ALPHA_ARR[i + 1] - _NP_ALPHA_ARR[i]) * t
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        P = NP / N
+    small = (N > 0) & (N <= N_LIMIT) & (P > P_LIMIT)
+
+    if small.any():
+        i, ti = _locate_array(_P_ARR, P[small])
+        j, tj = _locate_array(_N_ARR, N[small])
+        alpha[small] = (
+            _GRID_ARR[i, j] * (1 - ti) * (1 - tj)
+            + _GRID_ARR[i, j + 1] * (1 - ti) * tj
+            + _GRID_ARR[i + 1, j] * ti * (1 - tj)
+            + _GRID_ARR[i + 1, j + 1] * ti * tj
+        )
+
+    alpha = _round_array(alpha)
+    alpha[np.isnan(NP)] = np.nan
+    return alpha.reshape(shape)
@@ -0,0 +1,223 @@
+"""
+
+Бинарный пакет таблиц (water-calc-assets)
+
+The consumer and device catalogues and the alpha grids are compiled once
+into a versioned binary file in the assets folder:
+
+    magic (4 bytes) | header length (uint32 LE) | JSON header | arrays
+
+The header holds the bundle version, a digest of the source tables and the
+dtype, shape and offset of every array. Arrays are 64-byte aligned, so at
+runtime the file is memory-mapped and each array is a zero-copy view.
+
+When the bundle is missing, has another version, or was built from other
+source tables, loaders return None and callers build the tables from the
+Python sources as before. The digest is checked in every mode, so build.py
+ships the source files next to the packaged app. The bundle is rebuilt by
+`python assets_bundle.py` (build.py does this before packaging).
+
+"""
+
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from settings import CONF, app_logger
+
+
+BUNDLE_MAGIC = b"WCAB"
+BUNDLE_VERSION = 1
+BUNDLE_NAME = "tables.wcab"
+
+_ALIGN = 64
+_SOURCES = ("tables.py", os.path.join("ml", "data.py"))
+
+# column order of the numeric Table A.2 array
+CONSUMER_COLUMNS = (
+    "avg_hot_and_cold_water_norms_per_day",
+    "avg_hot_water_norms_per_day",
+    "max_hot_and_cold_water_norms_per_hour",
+    "max_hot_water_norms_per_hour",
+    "device_water_consumption_hot_and_cold_q0tot",
+    "device_water_consumption_hot_and_cold_q0tot_hr",
+    "device_water_consumption_hot_or_cold_q0",
+    "device_water_consumption_hot_or_cold_q0_hr",
+    "T",
+)
+
+
+def bundle_path() -> Path:
+    return Path(CONF.ASSETS_FOLDER) / BUNDLE_NAME
+
+
+def source_digest() -> str | None:
+    """Digest of the Python sources the bundle is built from (None if they are not shipped)."""
+    h = hashlib.sha256()
+    for name in _SOURCES:
+        path = Path(__file__).parent / name
+        if not path.exists():
+            return None
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _collect_arrays() -> dict[str, np.ndarray]:
+    from alpha import build_alpha_tables
+    from mathematics import ConsuptionMeasurer
+    from tables import TABLE_A1, TABLE_A2
+
+    arrays: dict[str, np.ndarray] = {}
+
+    n_axis, p_axis, grid, np_axis, np_alpha = build_alpha_tables()
+    arrays["b1_n_axis"] = np.asarray(n_axis, dtype=np.float64)
+    arrays["b1_p_axis"] = np.asarray(p_axis, dtype=np.float64)
+    arrays["b1_alpha"] = np.asarray(grid, dtype=np.float64)
+    arrays["b2_np_axis"] = np.asarray(np_axis, dtype=np.float64)
+    arrays["b2_alpha"] = np.asarray(np_alpha, dtype=np.float64)
+
+    measurers = list(ConsuptionMeasurer)
+    numbers, groups, names, codes, values = [], [], [], [], []
+    for number, group, measurer, T, rows in TABLE_A2:
+        for name, *row in rows:
+            numbers.append(number)
+            groups.append(group)
+            names.append(name)
+            codes.append(measurers.index(measurer))
+            values.append([*row, T])
+
+    arrays["a2_values"] = np.asarray(values, dtype=np.float64)
+    arrays["a2_measurer"] = np.asarray(codes, dtype=np.int16)
+    for key, strings in (("a2_number", numbers), ("a2_group", groups), ("a2_name", names)):
+        arrays[f"{key}_blob"], arrays[f"{key}_offsets"] = _pack_strings(strings)
+
+    arrays["a1_id"] = np.asarray([r[0] for r in TABLE_A1], dtype=np.int64)
+    arrays["a1_values"] = np.asarray([r[2:] for r in TABLE_A1], dtype=np.float64)
+    arrays["a1_name_blob"], arrays["a1_name_offsets"] = _pack_strings([r[1] for r in TABLE_A1])
+
+    return arrays
+
+
+def compile_bundle(path: Path | str | None = None) -> Path:
+    from tables import table_problems
+
+    problems = table_problems()
+    if problems:
+        raise ValueError("source tables have problems:\n" + "\n".join(problems))
+
+    path = Path(path) if path is not None else bundle_path()
+    arrays = _collect_arrays()
+
+    entries = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        entries[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps({
+        "version": BUNDLE_VERSION,
+        "source_digest": source_digest(),
+        "arrays": entries,
+    }).encode("utf-8")
+    data_start = -(-(len(BUNDLE_MAGIC) + 4 + len(header)) // _ALIGN) * _ALIGN
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+    app_logger.debug(f"compiled assets bundle {path}")
+    return path
+
+
+class AssetsBundle:
+    """Memory-mapped bundle; every array is a read-only view into the mapping."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+        if bytes(self._map[:4]) != BUNDLE_MAGIC:
+            raise ValueError(f"{self.path} is not an assets bundle")
+        (header_len,) = struct.unpack("<I", bytes(self._map[4:8]))
+        header = json.loads(bytes(self._map[8:8 + header_len]).decode("utf-8"))
+
+        self.version: int = header["version"]
+        self.source_digest: str | None = header["source_digest"]
+        self._entries: dict[str, dict] = header["arrays"]
+        self._data_start = -(-(8 + header_len) // _ALIGN) * _ALIGN
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        e = self._entries[name]
+        dtype = np.dtype(e["dtype"])
+        count = int(np.prod(e["shape"], dtype=np.int64))
+        start = self._data_start + e["offset"]
+        return self._map[start:start + count * dtype.itemsize].view(dtype).reshape(e["shape"])
+
+    def strings(self, name: str) -> list[str]:
+        return unpack_strings(self[f"{name}_blob"], self[f"{name}_offsets"])
+
+
+_BUNDLE: AssetsBundle | None = None
+_BUNDLE_LOADED = False
+
+
+def load_bundle() -> AssetsBundle | None:
+    """Shared bundle of this process, or None if it is missing or stale."""
+    global _BUNDLE, _BUNDLE_LOADED
+    if _BUNDLE_LOADED:
+        return _BUNDLE
+    _BUNDLE_LOADED = True
+
+    path = bundle_path()
+    if not path.exists():
+        return None
+
+    try:
+        bundle = AssetsBundle(path)
+    except (OSError, ValueError) as err:
+        app_logger.warning(f"assets bundle {path} is not readable: {err}")
+        return None
+
+    if bundle.version != BUNDLE_VERSION:
+        app_logger.warning(f"assets bundle {path} has version {bundle.version}, expected {BUNDLE_VERSION}")
+        return None
+    digest = source_digest()
+    if digest is None or bundle.source_digest != digest:
+        app_logger.warning(f"assets bundle {path} does not match the source tables, rebuild it")
+        return None
+
+    _BUNDLE = bundle
+    return _BUNDLE
+
+
+if __name__ == "__main__":
+    print(compile_bundle())
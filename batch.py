@@ -0,0 +1,122 @@
+"""
+
+Пакетный пересчет проектов
+
+Recalculates every variant of many .wcp projects on a ProcessPoolExecutor.
+Variants are sent to workers in chunks, results come back in the order of
+the input paths and variants, and an error in one variant is recorded in its
+result instead of stopping the batch.
+
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from mathematics import (
+    DEFAULT_PRECISION,
+    CalculationEngine,
+    MultipleObjectsDataReport,
+    OneObjectDataReport,
+    PrecisionPolicy,
+    calculate_consumption_for_multiple_objects,
+    calculate_consumption_for_one_object,
+    record,
+)
+
+
+@record
+class VariantJob:
+    project_path: str
+    variant_tag: str
+
+
+@record
+class VariantResult:
+    project_path: str
+    variant_tag: str | None
+    report: OneObjectDataReport | MultipleObjectsDataReport | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _calculate_variant(project_ctx, variant_tag: str, engine: CalculationEngine, precision: PrecisionPolicy):
+    objects = project_ctx.get_variant_objects(variant_tag)
+    if len(objects) == 0:
+        raise ValueError("Nothing to calculate")
+    if len(objects) > 1:
+        return calculate_consumption_for_multiple_objects(objects, engine, precision)
+    if engine == CalculationEngine.NUMPY:
+        # the NumPy engine has no one object path
+        engine = CalculationEngine.DECIMAL
+    return calculate_consumption_for_one_object(objects[0], engine, precision)
+
+
+def _run_chunk(
+    jobs: list[VariantJob],
+    engine: CalculationEngine,
+    precision: PrecisionPolicy,
+) -> list[VariantResult]:
+    from data import ProjectContext
+
+    projects: dict[str, ProjectContext] = {}
+    results: list[VariantResult] = []
+
+    for job in jobs:
+        try:
+            if job.project_path not in projects:
+                projects[job.project_path] = ProjectContext.load(job.project_path)
+            report = _calculate_variant(projects[job.project_path], job.variant_tag, engine, precision)
+            results.append(VariantResult(job.project_path, job.variant_tag, report=report))
+        except Exception as err:
+            results.append(VariantResult(job.project_path, job.variant_tag, error=f"{type(err).__name__}: {err}"))
+
+    return results
+
+
+def collect_jobs(project_paths: list[str]) -> tuple[list[VariantJob], list[VariantResult]]:
+    """Variant jobs of every project plus results for projects that failed to load."""
+    from data import ProjectContext
+
+    jobs: list[VariantJob] = []
+    failed: list[VariantResult] = []
+
+    for path in project_paths:
+        try:
+            variants = list(ProjectContext.load(path).variants_data.keys())
+        except Exception as err:
+            failed.append(VariantResult(path, None, error=f"{type(err).__name__}: {err}"))
+            continue
+        jobs.extend(VariantJob(path, tag) for tag in variants)
+
+    return jobs, failed
+
+
+def run_batch(
+    project_paths: list[str],
+    engine: CalculationEngine = CalculationEngine.DECIMAL,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+    max_workers: int | None = None,
+    chunksize: int = 16,
+) -> list[VariantResult]:
+    jobs, failed = collect_jobs(project_paths)
+
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+    workers = min(max_workers or os.cpu_count() or 1, max(len(chunks), 1))
+
+    results: list[VariantResult] = []
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map keeps the submission order
+            for chunk_results in executor.map(
+                _run_chunk,
+                chunks,
+                [engine] * len(chunks),
+                [precision] * len(chunks),
+            ):
+                results.extend(chunk_results)
+
+    order = {path: i for i, path in enumerate(project_paths)}
+    return sorted(failed + results, key=lambda r: order[r.project_path])
@@ -2,12 +2,19 @@
 
 import PyInstaller.__main__
 
+from assets_bundle import BUNDLE_NAME, compile_bundle
+
+compile_bundle(f"./water-calc-assets/{BUNDLE_NAME}")
+
 with open(".env", "w") as f:
     f.write("MODE=build")
 
 PyInstaller.__main__.run([
     'main.py',
     '--add-data=./water-calc-assets:./assets',
+    # sources of the assets bundle, load_bundle checks their digest
+    '--add-data=./tables.py:.',
+    '--add-data=./ml/data.py:./ml',
     '--add-data=./.env:.',
     '--hide-console=hide-early',
     '--clean',
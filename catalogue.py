@@ -0,0 +1,188 @@
+"""
+
+Каталог водопотребителей и приборов
+
+Tables A.1 and A.2 as catalogues with an in-memory index. Every entry is
+indexed by id, by table row number and by the trigrams of its normalized
+name, so an incremental search only verifies the few entries that share all
+trigrams of the query instead of scanning the whole table.
+
+Only names are read at import. The norms of an entry are built from its row
+of the mapped assets bundle (or of tables.py) when the entry is first used.
+
+"""
+
+import re
+from typing import Callable, Generic, Iterable, TypeVar
+
+from assets_bundle import AssetsBundle, load_bundle
+from mathematics import ConsuptionMeasurer, DeviceWaterConsumptionNorms, WaterConsumerNorms, intern_norms, record
+
+
+T = TypeVar("T")
+
+_NOT_WORD = re.compile(r"[^0-9a-zа-я]+")
+
+
+def normalize(text: str) -> str:
+    return _NOT_WORD.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+def trigrams(token: str) -> set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+@record
+class CatalogueEntry:
+    id: int
+    number: str
+    name: str
+    # position of the entry in its source table
+    row: int
+
+
+class Catalogue(Generic[T]):
+    def __init__(self, entries: Iterable[CatalogueEntry], build: Callable[[CatalogueEntry], T]):
+        self.entries: list[CatalogueEntry] = list(entries)
+        self.by_id: dict[int, CatalogueEntry] = {}
+        self.by_number: dict[str, list[CatalogueEntry]] = {}
+        self.by_name: dict[str, CatalogueEntry] = {}
+
+        self._build = build
+        self._items: dict[int, T] = {}
+
+        self._normalized: dict[int, str] = {}
+        self._words: dict[int, tuple[str, ...]] = {}
+        self._trigrams: dict[str, set[int]] = {}
+
+        for e in self.entries:
+            if e.id in self.by_id or e.name in self.by_name:
+                raise ValueError(f"Duplicate catalogue entry: {e.id} {e.name}")
+            self.by_id[e.id] = e
+            self.by_name[e.name] = e
+            self.by_number.setdefault(e.number, []).append(e)
+
+            text = normalize(e.name)
+            self._normalized[e.id] = text
+            self._words[e.id] = tuple(text.split())
+            for tri in trigrams(text):
+                self._trigrams.setdefault(tri, set()).add(e.id)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def __getitem__(self, name: str) -> T:
+        return self.item(self.by_name[name])
+
+    def item(self, entry: CatalogueEntry) -> T:
+        """Item of the entry, built from its table row on first use."""
+        item = self._items.get(entry.id)
+        if item is None:
+            item = self._items[entry.id] = self._build(entry)
+        return item
+
+    def names(self) -> list[str]:
+        return [e.name for e in self.entries]
+
+    def _candidates(self, tokens: list[str]) -> Iterable[int]:
+        grams = set()
+        for t in tokens:
+            grams |= trigrams(t)
+        if not grams:
+            return self.by_id.keys()
+
+        postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+        ids = set(postings[0])
+        for p in postings[1:]:
+            ids &= p
+            if not ids:
+                break
+        return ids
+
+    def search(self, query: str, limit: int | None = None) -> list[CatalogueEntry]:
+        """Entries whose normalized name contains every query token.
+
+        Entries where a token starts a word, or a number token matches the
+        table row number, are ranked first; ties keep table order.
+        """
+        tokens = normalize(query).split()
+        if not tokens:
+            return self.entries[:limit]
+
+        found = []
+        for i in self._candidates(tokens):
+            text = self._normalized[i]
+            if not all(t in text for t in tokens):
+                continue
+            words = self._words[i]
+            number = self.by_id[i].number
+            prefix_hits = sum(
+                1 for t in tokens
+                if t == number or any(w.startswith(t) for w in words)
+            )
+            found.append((-prefix_hits, i))
+
+        found.sort()
+        return [self.by_id[i] for _, i in found[:limit]]
+
+
+def _consumer_catalogue(bundle: AssetsBundle | None) -> Catalogue[WaterConsumerNorms]:
+    if bundle is not None:
+        measurers = list(ConsuptionMeasurer)
+        codes, values = bundle["a2_measurer"], bundle["a2_values"]
+        heads = zip(bundle.strings("a2_number"), bundle.strings("a2_group"), bundle.strings("a2_name"))
+
+        def row(i: int) -> tuple:
+            return (measurers[int(codes[i])], *values[i].tolist())
+    else:
+        from tables import TABLE_A2
+
+        heads, rows = [], []
+        for number, group, measurer, T, sub_rows in TABLE_A2:
+            for name, *norms in sub_rows:
+                heads.append((number, group, name))
+                rows.append((measurer, *norms, T))
+        row = rows.__getitem__
+
+    def build(entry: CatalogueEntry) -> WaterConsumerNorms:
+        return intern_norms(WaterConsumerNorms(entry.name, *row(entry.row)))
+
+    return Catalogue(
+        (
+            CatalogueEntry(i + 1, number, f"{number} {group}: {name}", i)
+            for i, (number, group, name) in enumerate(heads)
+        ),
+        build,
+    )
+
+
+def _device_catalogue(bundle: AssetsBundle | None) -> Catalogue[DeviceWaterConsumptionNorms]:
+    if bundle is not None:
+        ids, names, values = bundle["a1_id"].tolist(), bundle.strings("a1_name"), bundle["a1_values"]
+
+        def row(i: int) -> list:
+            return values[i].tolist()
+    else:
+        from tables import TABLE_A1
+
+        ids, names = [r[0] for r in TABLE_A1], [r[1] for r in TABLE_A1]
+
+        def row(i: int) -> tuple:
+            return TABLE_A1[i][2:]
+
+    def build(entry: CatalogueEntry) -> DeviceWaterConsumptionNorms:
+        return DeviceWaterConsumptionNorms(entry.id, entry.name, *row(entry.row))
+
+    return Catalogue(
+        (CatalogueEntry(id_, str(id_), name, i) for i, (id_, name) in enumerate(zip(ids, names))),
+        build,
+    )
+
+
+_bundle = load_bundle()
+
+CONSUMERS: Catalogue[WaterConsumerNorms] = _consumer_catalogue(_bundle)
+DEVICES: Catalogue[DeviceWaterConsumptionNorms] = _device_catalogue(_bundle)
@@ -1,10 +1,13 @@
 import json
 import os
+import uuid
 
 from pathlib import Path
 
 from settings import app_logger
-from mathematics import WaterConsumerNorms, ConsuptionMeasurer, WaterConsumerParams
+from mathematics import ConsumerPlacement, WaterConsumerNorms, WaterConsumerParams
+from aggregate import VariantAggregate
+from catalogue import CONSUMERS, DEVICES
 
 
 PROJECT_ROOT = str(Path(__file__).parent)
@@ -21,15 +24,8 @@ APP_CONTEXT = {
     "CURRENT_PROJECT_PATH": None,
     "CURRENT_WIN": "main",
     "LAST_SAVE": 0,
-    "WATER_CONSUMERS": {
-        "23 Бани: душевая кабина": (
-            WaterConsumerNorms(
-                "23 Бани: душевая кабина",
-                ConsuptionMeasurer.ONE_INHABITANT,
-                360, 200, 360, 200, 0.2, 360, 0.14, 240, 3
-            )
-        ),
-    },
+    "WATER_CONSUMERS": CONSUMERS,
+    "DEVICES": DEVICES,
 }
 
 
@@ -102,6 +98,9 @@ class ProjectContext:
         app_logger.error("PROJECT CONTEXT")
         self._path = path
         self._data = data
+        self._aggregates: dict[str, VariantAggregate] = {}
+        # placements by id, built from the variant objects on first use
+        self._placements: dict[str, dict[str, ConsumerPlacement]] = {}
     
     def is_loaded(self):
         return "vars" in self._data
@@ -171,29 +170,58 @@ class ProjectContext:
         if tab_name in self._data["opened_tabs_tags"]:
             del self._data["opened_tabs_tags"][tab_name]
     
-    def remove_consumer(self, variant_tag: str, consumer: WaterConsumerNorms):
+    def remove_consumer(self, variant_tag: str, placement_id: str):
         if variant_tag in self._data["variants_data"]:
-            object_ids = [o["id"] for o in self._data["variants_data"][variant_tag]["objects"]]
-            if consumer.id in object_ids:
-                self._data["variants_data"][variant_tag]["objects"].pop(object_ids.index(consumer.id))
+            objects = self._data["variants_data"][variant_tag]["objects"]
+            object_ids = [o["id"] for o in objects]
+            if placement_id in object_ids:
+                objects.pop(object_ids.index(placement_id))
+                if variant_tag in self._placements:
+                    self._placements[variant_tag].pop(placement_id, None)
+                if variant_tag in self._aggregates:
+                    self._aggregates[variant_tag].remove(placement_id)
                 self.dump()
     
-    def get_variant_objects(self, variant_tag: str) -> list[WaterConsumerParams]:
+    @staticmethod
+    def _object_params(obj: dict) -> WaterConsumerParams:
+        return WaterConsumerParams(
+            consumer_norms=APP_CONTEXT["WATER_CONSUMERS"][obj["name"]],
+            num_of_devices=obj["num_of_devices"],
+            num_of_devices_hot=obj["num_of_devices_hot"],
+            num_of_measurers=obj["num_of_measurers"],
+            temp_cold=obj["temp_cold"],
+            temp_hot=obj["temp_hot"],
+            work_hours=obj["work_hours"]
+        )
+
+    def _variant_placements(self, variant_tag: str) -> dict[str, ConsumerPlacement]:
+        if variant_tag not in self._placements:
+            placements: dict[str, ConsumerPlacement] = {}
+            for obj in self._data["variants_data"][variant_tag]["objects"]:
+                # projects saved by older versions may share one id between
+                # placements of the same consumer type; the repair is made in
+                # memory and written by the next dump, reads never write
+                if obj["id"] in placements:
+                    obj["id"] = str(uuid.uuid4())
+                placements[obj["id"]] = ConsumerPlacement(obj["id"], self._object_params(obj))
+            self._placements[variant_tag] = placements
+        return self._placements[variant_tag]
+
+    def get_variant_placements(self, variant_tag: str) -> list[ConsumerPlacement]:
         if variant_tag in self._data["variants_data"]:
-            print(self._data["variants_data"][variant_tag]["objects"])
-            return [
-                WaterConsumerParams(
-                    consumer_norms=APP_CONTEXT["WATER_CONSUMERS"][obj["name"]],
-                    num_of_devices=obj["num_of_devices"],
-                    num_of_devices_hot=obj["num_of_devices_hot"],
-                    num_of_measurers=obj["num_of_measurers"],
-                    temp_cold=obj["temp_cold"],
-                    temp_hot=obj["temp_hot"],
-                    work_hours=obj["work_hours"]
-                )
-                for obj in self._data["variants_data"][variant_tag]["objects"]
-            ]
+            return list(self._variant_placements(variant_tag).values())
         return []
+
+    def get_variant_objects(self, variant_tag: str) -> list[WaterConsumerParams]:
+        return [p.params for p in self.get_variant_placements(variant_tag)]
+
+    def get_variant_aggregate(self, variant_tag: str) -> VariantAggregate:
+        """Running sums of the variant, kept up to date by add/remove."""
+        if variant_tag not in self._aggregates:
+            self._aggregates[variant_tag] = VariantAggregate.from_objects(
+                [(p.id, p.params) for p in self.get_variant_placements(variant_tag)]
+            )
+        return self._aggregates[variant_tag]
     
     def add_variant_object(
         self,
@@ -206,10 +234,12 @@ class ProjectContext:
         temp_cold: int,
         work_hours: int,
         num_of_devies_less_200: bool = True,
-    ):
+    ) -> ConsumerPlacement | None:
+        placement = None
         if variant_tag in self._data["variants_data"]:
-            self._data["variants_data"][variant_tag]["objects"].append({
-                "id": consumer.id,
+            placements = self._variant_placements(variant_tag)
+            obj = {
+                "id": str(uuid.uuid4()),
                 "name": consumer.name,
                 "num_of_measurers": num_of_measurers,
                 "are_there_devices_less_then_200": num_of_devies_less_200,
@@ -218,8 +248,14 @@ class ProjectContext:
                 "temp_hot": temp_hot,
                 "temp_cold": temp_cold,
                 "work_hours": work_hours,
-            })
+            }
+            self._data["variants_data"][variant_tag]["objects"].append(obj)
+            placement = ConsumerPlacement(obj["id"], self._object_params(obj))
+            placements[placement.id] = placement
+            if variant_tag in self._aggregates:
+                self._aggregates[variant_tag].add(placement.id, placement.params)
         self.dump()
+        return placement
     
     def dump(self):
         with open(self._path, "w") as f:
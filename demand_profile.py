@@ -0,0 +1,116 @@
+"""
+
+Суточный график водопотребления
+
+Hourly or 15-minute demand profiles of a variant. The day volume of every
+consumer (as in calculate_total_day_consumption) is spread over its working
+period: the whole day when T is 24 hours, work_hours from its start hour
+otherwise. Inside the period the volume follows the relative day shape,
+which is flat by default. A profile always integrates to the day volume;
+when the working period is T hours its flat level is the average hour flow
+of calculate_avg_hour_consumption.
+
+Profiles are kept as one consumers x timesteps matrix of shares of the day
+volume; variant profiles are its products with the day volume vectors, so
+the coincident peak of a variant is found without building a matrix per
+water kind.
+
+"""
+
+import numpy as np
+
+from mathematics import WaterConsumerParams, record
+from vectorized import ConsumersArrays
+
+
+HOURS = 24
+
+DEFAULT_START_HOUR = 8.0
+
+
+@record
+class DemandProfile:
+    steps_per_hour: int
+    # shares[i, t] - share of the day volume of consumer i drawn in step t
+    shares: np.ndarray
+    # day volumes of the consumers, m3/day
+    Q_total: np.ndarray
+    Q_hot: np.ndarray
+    Q_cold: np.ndarray
+
+    @property
+    def hours(self) -> np.ndarray:
+        """Start hour of every step."""
+        return np.arange(self.shares.shape[1]) / self.steps_per_hour
+
+    def _volumes(self, kind: str) -> np.ndarray:
+        if kind not in ("total", "hot", "cold"):
+            raise ValueError(f"Unknown water kind: {kind}")
+        return getattr(self, f"Q_{kind}")
+
+    def consumer_profiles(self, kind: str = "total") -> np.ndarray:
+        """Flow of every consumer in every step, m3/h."""
+        return self.shares * (self._volumes(kind) * self.steps_per_hour)[:, None]
+
+    def variant_profile(self, kind: str = "total") -> np.ndarray:
+        """Flow of the whole variant in every step, m3/h."""
+        return self._volumes(kind) @ self.shares * self.steps_per_hour
+
+    def coincident_peak(self, kind: str = "total") -> tuple[float, float]:
+        """(start hour, flow in m3/h) of the step with the largest variant flow."""
+        profile = self.variant_profile(kind)
+        step = int(np.argmax(profile))
+        return step / self.steps_per_hour, float(profile[step])
+
+
+def working_hours(arr: ConsumersArrays) -> np.ndarray:
+    """Length of the working period of every consumer in a day."""
+    return np.where(arr.T == HOURS, HOURS, arr.work_hours)
+
+
+def build_demand_profile(
+    consumers_params: list[WaterConsumerParams],
+    steps_per_hour: int = 1,
+    start_hours: float | np.ndarray = DEFAULT_START_HOUR,
+    day_shape: np.ndarray | None = None,
+) -> DemandProfile:
+    """Demand profile of a variant.
+
+    start_hours is the start of the working period, one for all consumers
+    or one per consumer (consumers working 24 hours ignore it). day_shape
+    gives relative weights of the 24 hours of a day.
+    """
+    if steps_per_hour < 1:
+        raise ValueError("steps_per_hour must be positive")
+
+    arr = ConsumersArrays(consumers_params)
+    steps = HOURS * steps_per_hour
+
+    if day_shape is None:
+        day_shape = np.ones(HOURS)
+    day_shape = np.asarray(day_shape, dtype=np.float64)
+    if day_shape.shape != (HOURS,):
+        raise ValueError("day_shape must have one weight per hour")
+
+    t = np.arange(steps) / steps_per_hour
+    start = np.where(arr.T == HOURS, 0.0, np.broadcast_to(np.asarray(start_hours, dtype=np.float64), (len(arr),)))
+
+    # steps whose start falls into the working period, wrapping over midnight
+    since_start = (t[None, :] - start[:, None]) % HOURS
+    working = since_start < working_hours(arr)[:, None]
+
+    weights = working * day_shape[(t // 1).astype(int)][None, :]
+    totals = weights.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = np.where(totals > 0, weights / totals, 0.0)
+
+    working_shifts = np.where(arr.T == HOURS, 1.0, arr.work_hours / arr.T)
+    day = arr.num_of_measurers * working_shifts / 1000
+
+    return DemandProfile(
+        steps_per_hour=steps_per_hour,
+        shares=shares,
+        Q_total=arr.avg_day_tot * day,
+        Q_hot=arr.avg_day_h * day,
+        Q_cold=(arr.avg_day_tot - arr.avg_day_h) * day,
+    )
@@ -0,0 +1,156 @@
+"""
+
+Точное распределение секундного расхода
+
+Exact distribution of the simultaneous flow of a variant. The number of busy
+devices of a consumer is Binomial(N, P) with P of the seconds calculation;
+its flow is that count times q0. Consumers with the same P and q0 are merged
+into one binomial, group pmfs are placed on a common flow grid and convolved
+pairwise with FFT (smallest first), so the cost stays O(L log L) per level
+for thousands of devices.
+
+The grid step is the greatest common step of the q0 values. If that grid
+would exceed `max_bins`, the step is widened and group flows are rounded to
+the nearest bin.
+
+"""
+
+import heapq
+from math import gcd
+
+import numpy as np
+
+from mathematics import WaterConsumerParams, record
+from montecarlo import DEFAULT_QUANTILES, normative_peak_flows, usage_groups
+
+
+# q0 values are given in l/s with at most 4 decimals
+_Q0_UNIT = 1e-4
+
+
+@record
+class PeakFlowDistribution:
+    normative_q: float
+    step: float
+    pmf: np.ndarray
+    mean: float
+    quantiles: dict[float, float]
+    clipped_probabilities: int
+
+    def cdf(self, flow: float) -> float:
+        i = int(np.floor(flow / self.step + 1e-9))
+        if i < 0:
+            return 0.0
+        return float(self.pmf[:i + 1].sum())
+
+    def quantile(self, q: float) -> float:
+        return _quantile(self.pmf, self.step, q)
+
+
+@record
+class ExactPeakFlowReport:
+    total: PeakFlowDistribution
+    hot: PeakFlowDistribution
+    cold: PeakFlowDistribution
+
+
+def binomial_pmf(n: int, p: float) -> np.ndarray:
+    """Binomial(n, p) pmf, computed in log space so large n does not underflow."""
+    if n <= 0 or p <= 0.0:
+        return np.ones(1)
+    if p >= 1.0:
+        pmf = np.zeros(n + 1)
+        pmf[n] = 1.0
+        return pmf
+
+    k = np.arange(n)
+    log_pmf = np.empty(n + 1)
+    log_pmf[0] = n * np.log1p(-p)
+    log_pmf[1:] = log_pmf[0] + np.cumsum(np.log(n - k) - np.log(k + 1)) + np.arange(1, n + 1) * np.log(p / (1 - p))
+
+    pmf = np.exp(log_pmf - log_pmf.max())
+    return pmf / pmf.sum()
+
+
+def _fft_convolve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    n = len(a) + len(b) - 1
+    if min(len(a), len(b)) < 64:
+        out = np.convolve(a, b)
+    else:
+        size = 1 << (n - 1).bit_length()
+        out = np.fft.irfft(np.fft.rfft(a, size) * np.fft.rfft(b, size), size)[:n]
+    np.clip(out, 0.0, None, out=out)
+    return out
+
+
+def convolve_all(pmfs: list[np.ndarray]) -> np.ndarray:
+    if not pmfs:
+        return np.ones(1)
+
+    heap = [(len(p), i, p) for i, p in enumerate(pmfs)]
+    heapq.heapify(heap)
+    counter = len(pmfs)
+    while len(heap) > 1:
+        _, _, a = heapq.heappop(heap)
+        _, _, b = heapq.heappop(heap)
+        c = _fft_convolve(a, b)
+        heapq.heappush(heap, (len(c), counter, c))
+        counter += 1
+
+    pmf = heap[0][2]
+    return pmf / pmf.sum()
+
+
+def _grid_step(q0: np.ndarray, max_flow: float, max_bins: int) -> float:
+    units = [int(round(v / _Q0_UNIT)) for v in np.unique(q0) if v > 0]
+    step = _Q0_UNIT * (gcd(*units) if units else 1)
+    return max(step, max_flow / max_bins)
+
+
+def _on_grid(pmf: np.ndarray, q0: float, step: float) -> np.ndarray:
+    idx = np.rint(np.arange(len(pmf)) * q0 / step).astype(np.int64)
+    return np.bincount(idx, weights=pmf)
+
+
+def _quantile(pmf: np.ndarray, step: float, q: float) -> float:
+    return float(np.searchsorted(np.cumsum(pmf), q - 1e-12, side="left")) * step
+
+
+def flow_distribution(
+    devices: np.ndarray,
+    probabilities: np.ndarray,
+    q0: np.ndarray,
+    max_bins: int = 1 << 22,
+) -> tuple[np.ndarray, float]:
+    """pmf of sum(Binomial(N_i, P_i) * q0_i) on a uniform flow grid and its step."""
+    merged: dict[tuple[float, float], int] = {}
+    for n, p, q in zip(devices.tolist(), probabilities.tolist(), q0.tolist()):
+        if n > 0 and p > 0:
+            merged[(p, q)] = merged.get((p, q), 0) + int(n)
+
+    step = _grid_step(q0, float((devices * q0).sum()), max_bins)
+    pmfs = [_on_grid(binomial_pmf(n, p), q, step) for (p, q), n in merged.items()]
+    return convolve_all(pmfs), step
+
+
+def exact_peak_flows(
+    consumers_params: list[WaterConsumerParams],
+    quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+    max_bins: int = 1 << 22,
+) -> ExactPeakFlowReport:
+    if len(consumers_params) == 0:
+        raise ValueError("Nothing to calculate")
+
+    distributions = []
+    for (devices, P, q0, clipped), q_norm in zip(usage_groups(consumers_params), normative_peak_flows(consumers_params)):
+        pmf, step = flow_distribution(devices, P, q0, max_bins)
+        distributions.append(PeakFlowDistribution(
+            normative_q=q_norm,
+            step=step,
+            pmf=pmf,
+            mean=float((np.arange(len(pmf)) * pmf).sum() * step),
+            quantiles={q: _quantile(pmf, step, q) for q in quantiles},
+            clipped_probabilities=clipped,
+        ))
+
+    return ExactPeakFlowReport(total=distributions[0], hot=distributions[1], cold=distributions[2])
@@ -0,0 +1,439 @@
+"""
+
+Расчет в целых числах с фиксированной точкой
+
+All norms and intermediates are Python ints scaled by ONE (10**18), so a
+flow of 0.00006 l/s still has 13 significant digits. Every value is the
+exact quotient of scaled norms and integer params, rounded once (half up)
+where it is divided, so results do not depend on a Decimal context and are
+reproducible bit-for-bit.
+
+Decimal appears only at the boundaries: norms are scaled through their
+shortest decimal representation (0.005 is exactly 5 * 10**15, not the
+binary float), and the values of a report are converted exactly once
+(to_decimal). Per-object values of the multiple objects report are
+calculated and converted only when they are read (ObjectColumn).
+
+"""
+
+from collections.abc import Sequence
+from decimal import Context, Decimal
+from functools import lru_cache
+
+from alpha import alpha_value
+from mathematics import (
+    AvgHourConsumptionReportData,
+    GrassWateringReportData,
+    HeatConsumptionReportData,
+    MaxHourConsumptionReportData,
+    MultipleObjectsDataReport,
+    MultipleObjectsHeatConsumptionDataReport,
+    MultipleObjectsSecondsConsumptionDataReport,
+    MultipleObjectsTotalDayConsumptionDataReport,
+    MultipleObjectsTotalHoursConsumptionDataReport,
+    OneObjectDataReport,
+    ResultWaterConsumption,
+    SecondConsumptionReportData,
+    TotalDayConsumptionReportData,
+    TotalObjectConsumption,
+    WaterConsumerNorms,
+    WaterConsumerParams,
+    group_consumers,
+)
+
+
+SCALE_DIGITS = 18
+ONE = 10 ** SCALE_DIGITS
+
+# wide enough to hold any scaled value without context rounding
+_EXACT = Context(prec=80)
+
+
+def _div_round(n: int, d: int) -> int:
+    """n / d rounded half up."""
+    if d < 0:
+        n, d = -n, -d
+    return (2 * n + d) // (2 * d)
+
+
+def fx(v: int | float | Decimal) -> int:
+    """Scale a number to a fixed-point int."""
+    if isinstance(v, int):
+        return v * ONE
+    if isinstance(v, float):
+        v = Decimal(repr(v))
+    n, d = v.as_integer_ratio()
+    return _div_round(n * ONE, d)
+
+
+def to_decimal(v: int) -> Decimal:
+    return Decimal(v).scaleb(-SCALE_DIGITS, _EXACT)
+
+
+@lru_cache(maxsize=4096)
+def _alpha(NP: int, N: int) -> tuple[int, Decimal]:
+    # the tables give alpha with three digits: scaled and report value
+    milli = round(alpha_value(NP / ONE, N) * 1000)
+    return milli * (ONE // 1000), Decimal(milli).scaleb(-3)
+
+
+class ScaledNorms:
+    """Numeric WaterConsumerNorms fields converted to fixed-point, with the
+    cold-water differences and the products the formulas divide by."""
+
+    __slots__ = (
+        "avg_day_tot", "avg_day_h", "max_hour_tot", "max_hour_h",
+        "q0tot", "q0tot_hr", "q0", "q0_hr", "T",
+        "avg_day_c", "max_hour_c", "q0tot_s", "q0_s",
+        "max_hour_tot_2", "max_hour_h_2", "max_hour_c_2",
+    )
+
+    def __init__(self, values: tuple[float, ...]):
+        (
+            self.avg_day_tot, self.avg_day_h, self.max_hour_tot, self.max_hour_h,
+            self.q0tot, self.q0tot_hr, self.q0, self.q0_hr, self.T,
+        ) = (fx(v) for v in values)
+
+        self.avg_day_c = self.avg_day_tot - self.avg_day_h
+        self.max_hour_c = self.max_hour_tot - self.max_hour_h
+        # device flows per hour (P = max_hour * U / (q0 * 3600 * N))
+        self.q0tot_s = 3600 * self.q0tot
+        self.q0_s = 3600 * self.q0
+        # doubled numerators of P and P_hr at ONE scale, for the rounding
+        self.max_hour_tot_2 = 2 * ONE * self.max_hour_tot
+        self.max_hour_h_2 = 2 * ONE * self.max_hour_h
+        self.max_hour_c_2 = 2 * ONE * self.max_hour_c
+
+
+@lru_cache(maxsize=1024)
+def scaled_norms(norms: WaterConsumerNorms) -> ScaledNorms:
+    return ScaledNorms((
+        norms.avg_hot_and_cold_water_norms_per_day,
+        norms.avg_hot_water_norms_per_day,
+        norms.max_hot_and_cold_water_norms_per_hour,
+        norms.max_hot_water_norms_per_hour,
+        norms.device_water_consumption_hot_and_cold_q0tot,
+        norms.device_water_consumption_hot_and_cold_q0tot_hr,
+        norms.device_water_consumption_hot_or_cold_q0,
+        norms.device_water_consumption_hot_or_cold_q0_hr,
+        norms.T,
+    ))
+
+
+def _probabilities(n: ScaledNorms, U: int, N: int, N_h: int) -> tuple[int, int, int, int, int, int]:
+    """P and P_hr (tot, h, c) of U consumers with N devices, N_h of them hot."""
+    N_c = N - N_h
+    d_tot, d_h, d_c = n.q0tot_s * N, n.q0_s * N_h, n.q0_s * N_c
+    e_tot, e_h, e_c = n.q0tot_hr * N, n.q0_hr * N_h, n.q0_hr * N_c
+    m_tot, m_h, m_c = n.max_hour_tot_2 * U, n.max_hour_h_2 * U, n.max_hour_c_2 * U
+    return (
+        (m_tot + d_tot) // (2 * d_tot),
+        (m_h + d_h) // (2 * d_h),
+        (m_c + d_c) // (2 * d_c),
+        # P_hr = 3600 * P * q0 / q0_hr, from the exact P
+        (m_tot + e_tot) // (2 * e_tot),
+        (m_h + e_h) // (2 * e_h),
+        (m_c + e_c) // (2 * e_c),
+    )
+
+
+def _heat(q_avg_hot: int, q_max_hot: int, temp_diff: int) -> tuple[int, int]:
+    # 1,16 * q * (t_h - t_c) + 0,3 * q_hr
+    loss = 300 * q_max_hot
+    return (
+        _div_round(1160 * q_avg_hot * temp_diff + loss, 1000),
+        _div_round(1160 * q_max_hot * temp_diff + loss, 1000),
+    )
+
+
+### One object ###
+
+
+def calculate_consumption_for_one_object_fixed(consumer_params: WaterConsumerParams) -> OneObjectDataReport:
+    cp = consumer_params
+    n = scaled_norms(cp.consumer_norms)
+
+    N = cp.num_of_devices
+    N_h = cp.num_of_devices_hot
+    N_c = N - N_h
+    U = cp.num_of_measurers
+
+    P_tot, P_h, P_c, Phr_tot, Phr_h, Phr_c = _probabilities(n, U, N, N_h)
+
+    (alpha_tot, d_alpha_tot), (alpha_h, d_alpha_h), (alpha_c, d_alpha_c) = (
+        _alpha(P_tot * N, N), _alpha(P_h * N_h, N_h), _alpha(P_c * N_c, N_c),
+    )
+    (alpha_hr_tot, d_alpha_hr_tot), (alpha_hr_h, d_alpha_hr_h), (alpha_hr_c, d_alpha_hr_c) = (
+        _alpha(Phr_tot * N, N), _alpha(Phr_h * N_h, N_h), _alpha(Phr_c * N_c, N_c),
+    )
+
+    # q = 5 * q0 * alpha, q_hr = 0,005 * q0_hr * alpha_hr
+    q_tot = _div_round(5 * n.q0tot * alpha_tot, ONE)
+    q_h = _div_round(5 * n.q0 * alpha_h, ONE)
+    q_c = _div_round(5 * n.q0 * alpha_c, ONE)
+    qhr_tot = _div_round(5 * n.q0tot_hr * alpha_hr_tot, 1000 * ONE)
+    qhr_h = _div_round(5 * n.q0_hr * alpha_hr_h, 1000 * ONE)
+    qhr_c = _div_round(5 * n.q0_hr * alpha_hr_c, 1000 * ONE)
+
+    # working shifts = work hours / T as an exact ratio, 1 for round-the-clock norms
+    if n.T == 24 * ONE:
+        shifts, shifts_den = 1, 1
+    else:
+        shifts, shifts_den = cp.work_hours * ONE, n.T
+
+    avg_den = 1000 * n.T * shifts
+    qT_tot = _div_round(n.avg_day_tot * U * ONE * shifts_den, avg_den)
+    qT_h = _div_round(n.avg_day_h * U * ONE * shifts_den, avg_den)
+    qT_c = _div_round(n.avg_day_c * U * ONE * shifts_den, avg_den)
+
+    day_den = 1000 * shifts_den
+    Q_tot = _div_round(n.avg_day_tot * U * shifts, day_den)
+    Q_h = _div_round(n.avg_day_h * U * shifts, day_den)
+    Q_c = _div_round(n.avg_day_c * U * shifts, day_den)
+
+    Qht, Qhrt = _heat(qT_h, qhr_h, cp.temp_hot - cp.temp_cold)
+
+    d = to_decimal
+    d_Q_tot, d_Q_h, d_Q_c = d(Q_tot), d(Q_h), d(Q_c)
+    d_q_tot, d_q_h, d_q_c = d(q_tot), d(q_h), d(q_c)
+    d_qhr_tot, d_qhr_h, d_qhr_c = d(qhr_tot), d(qhr_h), d(qhr_c)
+    seconds_consumption = SecondConsumptionReportData(
+        alpha_total=d_alpha_tot, alpha_cold=d_alpha_c, alpha_hot=d_alpha_h,
+        P_total=d(P_tot), P_hot=d(P_h), P_cold=d(P_c),
+        q_total=d_q_tot, q_hot=d_q_h, q_cold=d_q_c,
+    )
+    max_hour_consumption = MaxHourConsumptionReportData(
+        alpha_total=d_alpha_hr_tot, alpha_cold=d_alpha_hr_c, alpha_hot=d_alpha_hr_h,
+        P_total=d(Phr_tot), P_hot=d(Phr_h), P_cold=d(Phr_c),
+        q_total=d_qhr_tot, q_hot=d_qhr_h, q_cold=d_qhr_c,
+    )
+    avg_hour_consumption = AvgHourConsumptionReportData(q_total=d(qT_tot), q_hot=d(qT_h), q_cold=d(qT_c))
+    total_day_consumption = TotalDayConsumptionReportData(Q_total=d_Q_tot, Q_hot=d_Q_h, Q_cold=d_Q_c)
+    heat_consumption = HeatConsumptionReportData(Q_avg_hour=d(Qht), Q_max_hour=d(Qhrt))
+
+    # same layout as calculate_total_object_consumption; grass watering is
+    # not calculated yet (see calculate_grass_watering), so Quc is 0
+    total_object = TotalObjectConsumption(
+        domestic_and_drinking_water_supply_general=ResultWaterConsumption(
+            meters_cubic_per_day=d_Q_tot,
+            meters_cubic_per_hour=d_qhr_tot,
+            liters_per_second=d_q_tot,
+        ),
+        domestic_and_drinking_water_supply_hot=ResultWaterConsumption(
+            meters_cubic_per_day=d_Q_h,
+            meters_cubic_per_hour=d_qhr_h,
+            liters_per_second=d_q_h,
+        ),
+        domestic_and_drinking_water_supply_cold=ResultWaterConsumption(
+            meters_cubic_per_day=d_Q_c,
+            meters_cubic_per_hour=d_qhr_c,
+            liters_per_second=d_q_c,
+        ),
+        domestic_sewerage_general=ResultWaterConsumption(
+            meters_cubic_per_day=d_Q_tot,
+            meters_cubic_per_hour=d_qhr_tot,
+            liters_per_second=Decimal(-1),
+        ),
+    )
+
+    return OneObjectDataReport(
+        consumer=cp.consumer_norms,
+        consumer_params=cp,
+        seconds_report=seconds_consumption,
+        hours_avg_report=avg_hour_consumption,
+        hours_max_report=max_hour_consumption,
+        heat_report=heat_consumption,
+        total_day_report=total_day_consumption,
+        grass_watering_report=GrassWateringReportData(Quc=Decimal(0)),
+        total_object_report=total_object,
+    )
+
+
+### Multiple objects ###
+
+
+class ObjectRows:
+    """Scaled P, P_hr and Qu (tot, h, c) of every consumer, calculated on
+    first access."""
+
+    __slots__ = ("_consumers", "_rows")
+
+    def __init__(self, consumers_params: list[WaterConsumerParams]):
+        self._consumers = consumers_params
+        self._rows: list[tuple[int, ...]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._consumers)
+
+    def rows(self) -> list[tuple[int, ...]]:
+        if self._rows is None:
+            rows = []
+            for cp in self._consumers:
+                n = scaled_norms(cp.consumer_norms)
+                U = cp.num_of_measurers
+                rows.append((
+                    *_probabilities(n, U, cp.num_of_devices, cp.num_of_devices_hot),
+                    _div_round(n.avg_day_tot * U, 1000),
+                    _div_round(n.avg_day_h * U, 1000),
+                    _div_round(n.avg_day_c * U, 1000),
+                ))
+            self._rows = rows
+        return self._rows
+
+
+class ObjectColumn(Sequence):
+    """One column of ObjectRows, converted to Decimal on first access."""
+
+    __slots__ = ("_rows", "_column", "_decimals")
+
+    def __init__(self, rows: ObjectRows, column: int):
+        self._rows = rows
+        self._column = column
+        self._decimals: list[Decimal] | None = None
+
+    def _converted(self) -> list[Decimal]:
+        if self._decimals is None:
+            j = self._column
+            self._decimals = [to_decimal(row[j]) for row in self._rows.rows()]
+        return self._decimals
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        return self._converted()[i]
+
+    def __iter__(self):
+        return iter(self._converted())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._converted())
+
+
+def calculate_consumption_for_multiple_objects_fixed(consumers_params: list[WaterConsumerParams]) -> MultipleObjectsDataReport:
+    groups, _ = group_consumers(consumers_params)
+
+    NP_tot_sum = NP_h_sum = NP_c_sum = 0
+    NPhr_tot_sum = NPhr_h_sum = NPhr_c_sum = 0
+    NP_tot_0 = NP_hot_0 = NP_cold_0 = 0
+    NPhr_tot_0 = NPhr_hot_0 = NPhr_cold_0 = 0
+    Qu_total = Qu_hot = Qu_cold = 0
+    N_tot = N_h = 0
+
+    # every group is calculated once with U of all its members; only the
+    # device counts are weighted by the group size
+    for g in groups:
+        cp = g.params
+        n = scaled_norms(cp.consumer_norms)
+        U = g.num_of_measurers
+        P_tot, P_h, P_c, Phr_tot, Phr_h, Phr_c = _probabilities(n, U, cp.num_of_devices, cp.num_of_devices_hot)
+
+        NP_tot_sum += P_tot
+        NP_h_sum += P_h
+        NP_c_sum += P_c
+        NPhr_tot_sum += Phr_tot
+        NPhr_h_sum += Phr_h
+        NPhr_c_sum += Phr_c
+
+        # numerators of q0 stay exact at ONE**2 scale
+        NP_tot_0 += P_tot * n.q0
+        NP_hot_0 += P_h * n.q0
+        NP_cold_0 += P_c * n.q0
+        NPhr_tot_0 += Phr_tot * n.q0tot_hr
+        NPhr_hot_0 += Phr_h * n.q0_hr
+        NPhr_cold_0 += Phr_c * n.q0_hr
+
+        # day flows stay exact at 1000 * ONE scale
+        Qu_total += n.avg_day_tot * U
+        Qu_hot += n.avg_day_h * U
+        Qu_cold += n.avg_day_c * U
+
+        N_tot += g.weight * cp.num_of_devices
+        N_h += g.weight * cp.num_of_devices_hot
+
+    N_c = N_tot - N_h
+    (alpha_tot, d_alpha_tot), (alpha_h, d_alpha_h), (alpha_c, d_alpha_c) = (
+        _alpha(NP_tot_sum, N_tot), _alpha(NP_h_sum, N_h), _alpha(NP_c_sum, N_c),
+    )
+    (alpha_hr_tot, d_alpha_hr_tot), (alpha_hr_h, d_alpha_hr_h), (alpha_hr_c, d_alpha_hr_c) = (
+        _alpha(NPhr_tot_sum, N_tot), _alpha(NPhr_h_sum, N_h), _alpha(NPhr_c_sum, N_c),
+    )
+
+    Qu_total = _div_round(Qu_total, 1000)
+    Qu_hot = _div_round(Qu_hot, 1000)
+    Qu_cold = _div_round(Qu_cold, 1000)
+
+    # q = 5 * q0 * alpha with q0 = sum(NP * q0) / sum(NP), from the exact numerators
+    q_tot = _div_round(5 * NP_tot_0 * alpha_tot, NP_tot_sum * ONE)
+    q_h = _div_round(5 * NP_hot_0 * alpha_h, NP_h_sum * ONE)
+    q_c = _div_round(5 * NP_cold_0 * alpha_c, NP_c_sum * ONE)
+
+    qhr_tot = _div_round(5 * NPhr_tot_sum * alpha_hr_tot, 1000 * ONE)
+    qhr_h = _div_round(5 * NPhr_h_sum * alpha_hr_h, 1000 * ONE)
+    qhr_c = _div_round(5 * NPhr_c_sum * alpha_hr_c, 1000 * ONE)
+
+    first = consumers_params[0]
+    Qht, Qhrt = _heat(Qu_hot, qhr_h, first.temp_hot - first.temp_cold)
+
+    d = to_decimal
+    rows = ObjectRows(consumers_params)
+
+    seconds_report = MultipleObjectsSecondsConsumptionDataReport(
+        consumer_params=consumers_params,
+        NPs_tot=ObjectColumn(rows, 0),
+        NPs_c=ObjectColumn(rows, 2),
+        NPs_h=ObjectColumn(rows, 1),
+        NPs_tot_sum=d(NP_tot_sum),
+        NPs_c_sum=d(NP_c_sum),
+        NPs_h_sum=d(NP_h_sum),
+        alpha_tot=d_alpha_tot,
+        alpha_h=d_alpha_h,
+        alpha_c=d_alpha_c,
+        q_tot=d(q_tot),
+        q_h=d(q_h),
+        q_c=d(q_c),
+        q0_tot=d(_div_round(NP_tot_0, NP_tot_sum)),
+        q0_h=d(_div_round(NP_hot_0, NP_h_sum)),
+        q0_c=d(_div_round(NP_cold_0, NP_c_sum)),
+    )
+    hours_report = MultipleObjectsTotalHoursConsumptionDataReport(
+        consumer_params=consumers_params,
+        NPhrs_tot=ObjectColumn(rows, 3),
+        NPhrs_c=ObjectColumn(rows, 5),
+        NPhrs_h=ObjectColumn(rows, 4),
+        NPhrs_tot_sum=d(NPhr_tot_sum),
+        NPhrs_c_sum=d(NPhr_c_sum),
+        NPhrs_h_sum=d(NPhr_h_sum),
+        alpha_hr_h=d_alpha_hr_h,
+        alpha_hr_c=d_alpha_hr_c,
+        alpha_hr_tot=d_alpha_hr_tot,
+        qhr_tot=d(qhr_tot),
+        qhr_c=d(qhr_c),
+        qhr_h=d(qhr_h),
+        q0hr_tot=d(_div_round(NPhr_tot_0, NPhr_tot_sum)),
+        q0hr_c=d(_div_round(NPhr_cold_0, NPhr_c_sum)),
+        q0hr_h=d(_div_round(NPhr_hot_0, NPhr_h_sum)),
+    )
+    day_report = MultipleObjectsTotalDayConsumptionDataReport(
+        consumer_params=consumers_params,
+        Qu_tots=ObjectColumn(rows, 6),
+        Qu_hs=ObjectColumn(rows, 7),
+        Qu_cs=ObjectColumn(rows, 8),
+        Qu_total=d(Qu_total),
+        Qu_hot=d(Qu_hot),
+        Qu_cold=d(Qu_cold),
+    )
+    heat_report = MultipleObjectsHeatConsumptionDataReport(Q_avg_hour=d(Qht), Q_max_hour=d(Qhrt))
+
+    return MultipleObjectsDataReport(
+        seconds_consumption=seconds_report,
+        hours_consumption=hours_report,
+        day_consumption=day_report,
+        heat_consumption=heat_report,
+        consumers_params=consumers_params,
+    )
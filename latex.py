@@ -6,12 +6,16 @@ from pathlib import Path
 
 from data import ProjectContext
 from mathematics import (
+    CalculationTrace,
+    FormulaStep,
     MultipleObjectsDataReport,
     OneObjectDataReport,
     WaterConsumerParams,
-    calculate_consumption_for_multiple_objects,
-    calculate_consumption_for_one_object,
-    _r, _d
+    _r,
+)
+from memo import (
+    calculate_consumption_for_multiple_objects_cached,
+    calculate_consumption_for_one_object_cached,
 )
 
 from settings import CONF, app_logger
@@ -26,7 +30,10 @@ def prepare_latex(
     project_ctx: ProjectContext,
     variant: str,
     use_thread: bool = True,
+    data_report: OneObjectDataReport | MultipleObjectsDataReport | None = None,
 ):
+    # data_report: a traced report to export instead of the calculated one,
+    # e.g. with the alphas edited in the preview (see report_graph.traced_report)
     import os
 
     def _run(text: str):
@@ -85,10 +92,12 @@ def prepare_latex(
     if len(objects) == 0:
         raise TypeError("Nothing to build")
 
-    if len(objects) > 1:
-        data_report = calculate_consumption_for_multiple_objects(objects)
+    if data_report is not None:
+        pass
+    elif len(objects) > 1:
+        data_report = calculate_consumption_for_multiple_objects_cached(objects, trace=True)
     else:
-        data_report = calculate_consumption_for_one_object(objects[0])
+        data_report = calculate_consumption_for_one_object_cached(objects[0], trace=True)
 
     # FIX
     document_text = build_document_text(data_report, "ХУЙ")
@@ -148,7 +157,27 @@ def _build_one_object_report(report: OneObjectDataReport, project_name: str):
     return document
 
 
+def _step(step: FormulaStep) -> str:
+    """Formula with the operands substituted, followed by its result."""
+    text = step.expression
+    if step.index is not None:
+        text = text.replace("<i>", str(step.index + 1))
+    if step.terms:
+        text = text.replace("<sum>", " + ".join(f"{_r(a)} \\cdot {_r(b)}" for a, b in step.terms))
+    for i, operand in enumerate(step.operands):
+        text = text.replace(f"<{i}>", str(_r(operand)))
+    return f"{text} = {_r(step.result)}"
+
+
+def _trace_of(report: OneObjectDataReport | MultipleObjectsDataReport) -> CalculationTrace:
+    if report.trace is None:
+        raise ValueError("Report was calculated without a trace")
+    return report.trace
+
+
 def _build_objects_seconds_calculation(report: MultipleObjectsDataReport) -> str:
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
     txt += "\\noindent \\\\ \n"
     txt += "\\section*{\\textbf{Общий секундный расход:}} \\\\ \n"
@@ -159,127 +188,38 @@ def _build_objects_seconds_calculation(report: MultipleObjectsDataReport) -> str
             f"\\item {consumer_params.consumer_norms.name} \\\\ \n"
             "\\noindent \\\\ \n"
         )
-        txt += (
-            "$NP^{tot" + str(ind+1) + "} = \\frac{<a> \\cdot <b>}{<c> \\cdot 3600} = <d>$ \\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(consumer_params.consumer_norms.max_hot_and_cold_water_norms_per_hour)))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_and_cold_q0tot)))
-            .replace("<d>", str(_r(report.seconds_consumption.NPs_tot[ind])))
-        )
+        txt += f"${_step(trace.get('NP_tot', ind))}$ \\\\ \n"
         txt += "\\vspace{0.05cm}\\\\ \n\n"
-        txt += (
-            "$NP^{c" + str(ind+1) + "} = \\frac{<a> \\cdot <b>}{<c> \\cdot 3600} = <d>$ \\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(consumer_params.consumer_norms.max_hot_and_cold_water_norms_per_hour)))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0)))
-            .replace("<d>", str(_r(report.seconds_consumption.NPs_c[ind])))
-        )
+        txt += f"${_step(trace.get('NP_c', ind))}$ \\\\ \n"
         txt += "\\vspace{0.05cm}\\\\ \n\n"
-        txt += (
-            "$NP^{h" + str(ind+1) + "} = \\frac{<a> \\cdot <b>}{<c> \\cdot 3600} = <d>$ \\\\ \n"
-            .replace("<a>", str(_r(consumer_params.consumer_norms.max_hot_and_cold_water_norms_per_hour)))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0)))
-            .replace("<d>", str(_r(report.seconds_consumption.NPs_h[ind])))
-        )
+        txt += f"${_step(trace.get('NP_h', ind))}$ \\\\ \n"
         txt += "\\\\ \n"
     txt += "\\end{enumerate}\n"
 
     txt += "По приложению 4 таблица 2 СНиП 2.04.01-85* находим значение коэффициента $\\alpha$. \\\\ \n"
     txt += "\\noindent \\\\ \n"
 
-    txt += (
-        "$\\sum{NP^{tot}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.NPs_tot_sum)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_tot)))
-    )
-    txt += (
-        "$\\sum{NP^{c}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.NPs_c_sum)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_c)))
-    )
-    txt += (
-        "$\\sum{NP^{h}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.NPs_h_sum)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_h)))
-    )
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'alpha_{s}'))}$ \\\\ \n"
 
     txt += "\\vspace{2mm}\\\\ \n\n"
     txt += "\\noindent \\\\ \n"
 
-    q_formula = "$q_0^{tot} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_and_cold_q0tot)} "
-            "\\cdot "
-            f"{_r(report.seconds_consumption.NPs_tot[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.seconds_consumption.NPs_tot_sum)}"
-    q_formula += f" = {_r(report.seconds_consumption.q0_tot)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
-
-    q_formula = "$q_0^{c} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_or_cold_q0)} "
-            "\\cdot "
-            f"{_r(report.seconds_consumption.NPs_c[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.seconds_consumption.NPs_c_sum)}"
-    q_formula += f" = {_r(report.seconds_consumption.q0_c)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
-
-    q_formula = "$q_0^{h} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_or_cold_q0)} "
-            "\\cdot "
-            f"{_r(report.seconds_consumption.NPs_h[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.seconds_consumption.NPs_h_sum)}"
-    q_formula += f" = {_r(report.seconds_consumption.q0_h)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'q0_{s}'))}$ \\\\ \n"
 
     txt += "\\vspace{2mm}\\\\ \n\n"
     txt += "\\noindent \\\\ \n"
 
-    txt += (
-        "q^{tot} = 5 \\cdot <a> \\cdot <b> = <c>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.q0_tot)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_tot)))
-        .replace("<c>", str(_r(report.seconds_consumption.q0_tot)))
-    )
-    txt += (
-        "q^{c} = 5 \\cdot <a> \\cdot <b> = <c>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.q0_c)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_c)))
-        .replace("<c>", str(_r(report.seconds_consumption.q0_c)))
-    )
-    txt += (
-        "q^{h} = 5 \\cdot <a> \\cdot <b> = <c>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_consumption.q0_h)))
-        .replace("<b>", str(_r(report.seconds_consumption.alpha_h)))
-        .replace("<c>", str(_r(report.seconds_consumption.q0_h)))
-    )
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'q_{s}'))}$, л/с \\\\ \n"
 
     return txt
 
 
 def _build_objects_hours_calculation(report: MultipleObjectsDataReport) -> str:
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
     txt += "\\noindent \\\\ \n"
     txt += "\\section*{\\textbf{Общий часовой расход:}} \\\\ \n"
@@ -290,126 +230,35 @@ def _build_objects_hours_calculation(report: MultipleObjectsDataReport) -> str:
             f"\\item {consumer_params.consumer_norms.name} \\\\ \n"
             "\\noindent \\\\ \n"
         )
-        txt += (
-            "$NP^{tot" + str(ind+1) + "}_{hr} = 3600 \\cdot <a> \\cdot <b> / <c> = <d>$ \\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(report.seconds_consumption.NPs_tot[ind])))
-            .replace("<b>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_and_cold_q0tot)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_and_cold_q0tot_hr)))
-            .replace("<d>", str(_r(report.hours_consumption.NPhrs_tot[ind])))
-        )
-        txt += (
-            "$NP^{c" + str(ind+1) + "}_{hr} = 3600 \\cdot <a> \\cdot <b> / <c> = <d> $\\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(report.seconds_consumption.NPs_c[ind])))
-            .replace("<b>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)))
-            .replace("<d>", str(_r(report.hours_consumption.NPhrs_c[ind])))
-        )
-        txt += (
-            "$NP^{h" + str(ind+1) + "}_{hr} = 3600 \\cdot <a> \\cdot <b> / <c> = <d> $\\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(report.seconds_consumption.NPs_h[ind])))
-            .replace("<b>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0)))
-            .replace("<c>", str(_r(consumer_params.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)))
-            .replace("<d>", str(_r(report.hours_consumption.NPhrs_h[ind])))
-        )
+        for s in ("tot", "c", "h"):
+            txt += f"${_step(trace.get(f'NPhr_{s}', ind))}$ \\\\ \n"
         txt += "\\\\ \n"
     txt += "\\end{enumerate}\n"
 
     txt += "По приложению 4 таблица 2 СНиП 2.04.01-85* находим значение коэффициента $\\alpha$. \\\\ \n"
     txt += "\\noindent \\\\ \n"
 
-    txt += (
-        "$\\sum{NP^{tot}_{hr}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.NPhrs_tot_sum)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_tot)))
-    )
-    txt += (
-        "$\\sum{NP^{c}_{hr}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.NPhrs_c_sum)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_c)))
-    )
-    txt += (
-        "$\\sum{NP^{h}_{hr}} = <a> \\rightarrow \\alpha = <b>$ \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.NPhrs_h_sum)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_h)))
-    )
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'alpha_hr_{s}'))}$ \\\\ \n"
 
     txt += "\\vspace{2mm}\\\\ \n\n"
     txt += "\\noindent \\\\ \n"
 
-    q_formula = "$q_0^{tot} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_and_cold_q0tot_hr)} "
-            "\\cdot "
-            f"{_r(report.hours_consumption.NPhrs_tot[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.hours_consumption.NPhrs_tot_sum)}"
-    q_formula += f" = {_r(report.hours_consumption.q0hr_tot)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
-
-    q_formula = "$q_0^{c} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)} "
-            "\\cdot "
-            f"{_r(report.hours_consumption.NPhrs_c[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.hours_consumption.NPhrs_c_sum)}"
-    q_formula += f" = {_r(report.hours_consumption.q0hr_c)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
-
-    q_formula = "$q_0^{h} = ("
-    for ind, cp in enumerate(report.consumers_params):
-        q_formula += (
-            f"{_r(cp.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)} "
-            "\\cdot "
-            f"{_r(report.hours_consumption.NPhrs_h[ind])}"
-        )
-        if ind != len(report.consumers_params) - 1:
-            q_formula += " + "
-    q_formula += ")$"
-    q_formula += f" / {_r(report.hours_consumption.NPhrs_h_sum)}"
-    q_formula += f" = {_r(report.hours_consumption.q0hr_h)}"
-    q_formula += " \\\\ \n"
-    txt += q_formula
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'q0hr_{s}'))}$ \\\\ \n"
 
     txt += "\\vspace{2mm}\\\\ \n\n"
     txt += "\\noindent \\\\ \n"
 
-    txt += (
-        "q^{tot} = 0.005 \\cdot <a> \\cdot <b> = <c>$, м^3 $/$ ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.q0hr_tot)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_tot)))
-        .replace("<c>", str(_r(report.hours_consumption.qhr_tot)))
-    )
-    txt += (
-        "q^{c} = 0.005 \\cdot <a> \\cdot <b> = <c>$, м^3 $/$ ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.q0hr_c)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_c)))
-        .replace("<c>", str(_r(report.hours_consumption.qhr_c)))
-    )
-    txt += (
-        "q^{h} = 0.005 \\cdot <a> \\cdot <b> = <c>$, м^3 $/$ ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.q0hr_h)))
-        .replace("<b>", str(_r(report.hours_consumption.alpha_hr_h)))
-        .replace("<c>", str(_r(report.hours_consumption.qhr_h)))
-    )
+    for s in ("tot", "c", "h"):
+        txt += f"${_step(trace.get(f'qhr_{s}'))}$, м$^3$/ч \\\\ \n"
 
     return txt
 
 
 def _build_objects_total_day_calculation(report: MultipleObjectsDataReport) -> str:
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
     txt += "\\noindent \\\\ \n"
     txt += "\\section*{\\textbf{Общий суточный расход:}} \\\\ \n"
@@ -420,53 +269,17 @@ def _build_objects_total_day_calculation(report: MultipleObjectsDataReport) -> s
             f"\\item {consumer_params.consumer_norms.name} \\\\ \n"
             "\\noindent \\\\ \n"
         )
-        txt += (
-            "$Q^{tot" + str(ind+1) + "}_u = <a> \\cdot <b> / 1000 = <c>, м^3\\/сут$ \\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(consumer_params.consumer_norms.avg_hot_and_cold_water_norms_per_day)))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(report.day_consumption.Qu_tots[ind])))
-        )
-        txt += (
-            "$Q^{c" + str(ind+1) + "}_u = <a> \\cdot <b> / 1000 = <c>,  м^3\\/сут $\\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(_r(consumer_params.consumer_norms.avg_hot_water_norms_per_day)))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(report.day_consumption.Qu_cs[ind])))
-        )
-        txt += (
-            "$Q^{h" + str(ind+1) + "}_u = <a> \\cdot <b> / 1000 = <c>, м^3\\/сут $\\\\ \n"
-            # FIX TODO CHECK
-            .replace("<a>", str(
-                _r(
-                    _d(consumer_params.consumer_norms.avg_hot_and_cold_water_norms_per_day) 
-                    - _d(consumer_params.consumer_norms.avg_hot_water_norms_per_day)
-                )
-            ))
-            .replace("<b>", str(_r(consumer_params.num_of_measurers)))
-            .replace("<c>", str(_r(report.day_consumption.Qu_hs[ind])))
-        )
+        for s in ("tot", "c", "h"):
+            txt += f"${_step(trace.get(f'Qu_{s}', ind))}$, м$^3$/сут \\\\ \n"
         txt += "\\\\ \n"
-    txt += (
-        "$\\sum{Q_u^{tot}} = <a>$, м^3\\/сут \\\\ \n"
-        .replace("<a>", str(_r(report.day_consumption.Qu_total)))
-    )    
-    txt += (
-        "$\\sum{Q_u^{c}} = <a>$, м^3\\/сут \\\\ \n"
-        .replace("<a>", str(_r(report.day_consumption.Qu_cold)))
-    )    
-    txt += (
-        "$\\sum{Q_u^{h}} = <a>$, м^3\\/сут \\\\ \n"
-        .replace("<a>", str(_r(report.day_consumption.Qu_hot)))
-    )    
+    for key in ("Qu_total", "Qu_cold", "Qu_hot"):
+        txt += f"${_step(trace.get(key))}$, м$^3$/сут \\\\ \n"
 
     txt += "\\end{enumerate}\n"
     return txt
 
 
-def _build_objects_heat_consumption_calculation(report: MultipleObjectsDataReport) -> str:
-    txt = "\\\\ \n"
-    txt += """
+_HEAT_HEADER = """
 \\section*{\\textbf{Расход тепла}} \\\\ \n
 Расход тепла QTh  (Qhhr), кВт, на приготовление горячей воды с учетом потерь тепла подающими и циркуляционными трубопроводами Qht следует определять \\\\ \n
 \\noindent \n
@@ -476,28 +289,17 @@ $Q^h_T = 1,16 \\cdot q^h_T \\cdot (t^h - t^c) + Q^{ht}$; \\\\ \n
 б) в течение часа максимального водопотребления \\\\ \n
 $Q^h_{hr} = 1,16 \\cdot q^h_{hr} \\cdot (t^h - t^c) + Q^{ht}$; \\\\ \n
 """
+
+
+def _build_objects_heat_consumption_calculation(report: MultipleObjectsDataReport) -> str:
+    trace = _trace_of(report)
+
+    txt = "\\\\ \n"
+    txt += _HEAT_HEADER
     txt += "\\noindent \n"
     txt += "\\\\ \n"
-    txt += (
-        "$Q^h_T = 1,16 \\cdot <a> \\cdot (<b> - <c>) + <d> = <e>$; \\\\ \n"
-        .replace("<a>", str(_r(report.day_consumption.Qu_hot)))
-        # TODO: MAGIC NUMBER
-        .replace("<b>", str(_r(61)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(5)))
-        .replace("<d>", str(_r(report.hours_consumption.qhr_h* _d(0.3))))
-        .replace("<e>", str(_r(report.heat_consumption.Q_avg_hour)))
-    )
-    txt += (
-        "$Q^h_{hr} = 1,16 \\cdot <a> \\cdot (<b> - <c>) + <d> = <e>$; \\\\ \n"
-        .replace("<a>", str(_r(report.hours_consumption.qhr_h* _d(0.3))))
-        # TODO: MAGIC NUMBER
-        .replace("<b>", str(_r(61)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(5)))
-        .replace("<d>", str(_r(report.hours_consumption.qhr_h* _d(0.3))))
-        .replace("<e>", str(_r(report.heat_consumption.Q_max_hour)))
-    )
+    txt += f"${_step(trace.get('Q_avg_hour'))}$; \\\\ \n"
+    txt += f"${_step(trace.get('Q_max_hour'))}$; \\\\ \n"
 
     txt += "\\\\ \n"
 
@@ -587,75 +389,28 @@ def _build_objects_total_result_table(report: MultipleObjectsDataReport) -> str:
 
 
 def _build_one_object_total_day_calculation(report: OneObjectDataReport) -> str:
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
     txt += "\\section*{\\textbf{Общий суточный расход:}} \\\\ \n"
     txt += f"{report.consumer.name} \\\\ \n"
-    txt += (
-        "$Q_u^{tot} = <a> \\cdot <b> \\cdot <c> / 1000 = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_and_cold_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(4)))
-        .replace("<d>", str(_r(report.total_day_report.Q_total)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$Q_u^{h} = <a> \\cdot <b> \\cdot <c> / 1000 = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(4)))
-        .replace("<d>", str(_r(report.total_day_report.Q_hot)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$Q_u^{c} = <a> \\cdot <b> \\cdot <c> / 1000 = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_and_cold_water_norms_per_day - report.consumer.avg_hot_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(4)))
-        .replace("<d>", str(_r(report.total_day_report.Q_cold)))
-    )
-    txt += "\\\\ \n"
+    for key in ("Q_total", "Q_hot", "Q_cold"):
+        txt += f"${_step(trace.get(key))}$ \\\\ \n"
+        txt += "\\\\ \n"
     return txt
 
 
 def _build_one_object_heat_consumption_calculation(report: OneObjectDataReport):
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
-    txt += """
-\\section*{\\textbf{Расход тепла}} \\\\ \n
-Расход тепла QTh  (Qhhr), кВт, на приготовление горячей воды с учетом потерь тепла подающими и циркуляционными трубопроводами Qht следует определять \\\\ \n
-\\noindent \n
-а) в течение среднего часа  \\\\ \n
-$Q^h_T = 1,16 \\cdot q^h_T \\cdot (t^h - t^c) + Q^{ht}$; \\\\ \n
-\\noindent \n
-б) в течение часа максимального водопотребления \\\\ \n
-$Q^h_{hr} = 1,16 \\cdot q^h_{hr} \\cdot (t^h - t^c) + Q^{ht}$; \\\\ \n
-"""
+    txt += _HEAT_HEADER
     txt += "\\noindent \n"
     txt += f"{report.consumer.name} \\\\ \n"
     txt += "\\\\ \n"
-    txt += (
-        "$Q^h_T = 1,16 \\cdot <a> \\cdot (<b> - <c>) + <d> = <e>$; \\\\ \n"
-        .replace("<a>", str(_r(report.hours_avg_report.q_hot)))
-        # TODO: MAGIC NUMBER
-        .replace("<b>", str(_r(61)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(5)))
-        .replace("<d>", str(_r(report.hours_max_report.q_hot * _d(0.3))))
-        .replace("<e>", str(_r(report.heat_report.Q_avg_hour)))
-    )
+    txt += f"${_step(trace.get('Q_avg_hour'))}$; \\\\ \n"
     txt += "\\vspace{0.2cm}\\\\ \n\n"
-    txt += (
-        "$Q^h_{hr} = 1,16 \\cdot <a> \\cdot (<b> - <c>) + <d> = <e>$; \\\\ \n"
-        .replace("<a>", str(_r(report.hours_max_report.q_hot)))
-        # TODO: MAGIC NUMBER
-        .replace("<b>", str(_r(61)))
-        # TODO: MAGIC NUMBER
-        .replace("<c>", str(_r(5)))
-        .replace("<d>", str(_r(report.hours_max_report.q_hot * _d(0.3))))
-        .replace("<e>", str(_r(report.heat_report.Q_max_hour)))
-    )
+    txt += f"${_step(trace.get('Q_max_hour'))}$; \\\\ \n"
 
     txt += "\\\\ \n"
 
@@ -663,6 +418,8 @@ $Q^h_{hr} = 1,16 \\cdot q^h_{hr} \\cdot (t^h - t^c) + Q^{ht}$; \\\\ \n
 
 
 def _build_one_object_hours_avg_calculation(report: OneObjectDataReport):
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
 
     txt += """
@@ -674,36 +431,16 @@ $q_{T} = \\frac{\\sum_{1}^{i}{q_{u,i} \\cdot U_{i}}}{1000 \\cdot T} $ \\\\ \n
     txt += f"{report.consumer.name} \\\\ \n"
     txt += "\\\\ \n"
 
-    txt += (
-        "$q_{T,0}^{tot} = \\frac{\\sum_{1}^{i}{<a> \\cdot <b>}}{1000 \\cdot <c>}  = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_and_cold_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.T)))
-        .replace("<d>", str(_r(report.hours_avg_report.q_total)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$q_{T,0}^{h} = \\frac{\\sum_{1}^{i}{<a> \\cdot <b>}}{1000 \\cdot <c>}  = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.T)))
-        .replace("<d>", str(_r(report.hours_avg_report.q_hot)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$q_{T,0}^{c} = \\frac{\\sum_{1}^{i}{<a> \\cdot <b>}}{1000 \\cdot <c>}  = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.avg_hot_and_cold_water_norms_per_day - report.consumer.avg_hot_water_norms_per_day)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.T)))
-        .replace("<d>", str(_r(report.hours_avg_report.q_cold)))
-    )
-
-    txt += "\\\\ \n"
+    for key in ("qT_total", "qT_hot", "qT_cold"):
+        txt += f"${_step(trace.get(key))}$ \\\\ \n"
+        txt += "\\\\ \n"
 
     return txt
 
 
 def _build_one_object_hours_max_calculation(report: OneObjectDataReport):
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
 
     txt += """
@@ -718,62 +455,22 @@ $P_{hr} = \\frac{3600 \\cdot P \\cdot q_0}{q_{0,hr}}$ \\\\ \n
     txt += "\\noindent \n"
     txt += f"{report.consumer.name} \\\\ \n"
     txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{tot} = \\frac{3600 \\cdot <a> \\cdot <b>}{<c>} = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_total)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_and_cold_q0tot)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_and_cold_q0tot_hr)))
-        .replace("<d>", str(_r(report.hours_max_report.P_total)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{h} = \\frac{3600 \\cdot <a> \\cdot <b>}{<c>} = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_hot)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0_hr)))
-        .replace("<d>", str(_r(report.hours_max_report.P_hot)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{c} = \\frac{3600 \\cdot <a> \\cdot <b>}{<c>} = <d>$ \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_cold)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0_hr)))
-        .replace("<d>", str(_r(report.hours_max_report.P_cold)))
-    )
-    txt += "\\\\ \n"
+    for s in ("total", "hot", "cold"):
+        txt += f"${_step(trace.get(f'Phr_{s}'))}$ \\\\ \n"
+        txt += "\\\\ \n"
     txt += "По таблице Б.1 СП30.13330.2020 находим значение коэффициента $\\alpha$. \\\\ \n"
     txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{tot} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q_{hr,0} = 0,005 \\cdot <c> \\cdot \\<d>$, м3/ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_max_report.P_total)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_and_cold_q0tot_hr)))
-        .replace("<c>", str(_r(report.hours_max_report.alpha_total)))
-        .replace("<d>", str(_r(report.hours_max_report.q_total)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{h} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q_{hr,0}^{h} = 0,005 \\cdot <c> \\cdot \\<d>$, м3/ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_max_report.P_hot)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0_hr)))
-        .replace("<c>", str(_r(report.hours_max_report.alpha_hot)))
-        .replace("<d>", str(_r(report.hours_max_report.q_hot)))
-    )
-    txt += "\\\\ \n"
-    txt += (
-        "$P_{hr}^{c} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q_{hr,0}^{c} = 0,005 \\cdot <c> \\cdot \\<d>$, м3/ч \\\\ \n"
-        .replace("<a>", str(_r(report.hours_max_report.P_cold)))
-        .replace("<b>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0_hr)))
-        .replace("<c>", str(_r(report.hours_max_report.alpha_cold)))
-        .replace("<d>", str(_r(report.hours_max_report.q_cold)))
-    )
-
-    txt += "\\\\ \n"
+    for s in ("total", "hot", "cold"):
+        alpha, q = trace.get(f"alpha_hr_{s}"), trace.get(f"qhr_{s}")
+        txt += f"${_step(alpha)} \\hspace{{20px}} {_step(q)}$, м$^3$/ч \\\\ \n"
+        txt += "\\\\ \n"
 
     return txt
 
 
 def _build_one_object_seconds_calculation(report: OneObjectDataReport):
+    trace = _trace_of(report)
+
     txt = "\\\\ \n"
 
     txt += """
@@ -789,57 +486,14 @@ $P = q^{tot}_{hr,u} \\cdot U / (q_0 \\cdot N \\cdot 3600)$ \\\\ \n
 """
     txt += f"{report.consumer.name} \\\\ \n"
     txt += "\\\\ \n"
-    txt += (
-        "$P^{tot} = <a> \\cdot <b> / <c> \\cdot <d> \\cdot 3600 = <e>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.max_hot_and_cold_water_norms_per_hour)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_and_cold_q0tot)))
-        .replace("<d>", str(_r(report.consumer_params.num_of_devices)))
-        .replace("<e>", str(_r(report.seconds_report.P_total)))
-    )
-    txt += (
-        "$P^{h} = <a> \\cdot <b> / <c> \\cdot <d> \\cdot 3600 = <e>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.max_hot_water_norms_per_hour)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<d>", str(_r(report.consumer_params.num_of_devices_hot)))
-        .replace("<e>", str(_r(report.seconds_report.P_hot)))
-    )
-    txt += (
-        "$P^{h} = <a> \\cdot <b> / <c> \\cdot <d> \\cdot 3600 = <e>$ \\\\ \n"
-        .replace("<a>", str(_r(report.consumer.max_hot_and_cold_water_norms_per_hour - report.consumer.max_hot_water_norms_per_hour)))
-        .replace("<b>", str(_r(report.consumer_params.num_of_measurers)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<d>", str(_r(report.consumer_params.num_of_devices - report.consumer_params.num_of_devices_hot)))
-        .replace("<e>", str(_r(report.seconds_report.P_cold)))
-    )
+    for s in ("total", "hot", "cold"):
+        txt += f"${_step(trace.get(f'P_{s}'))}$ \\\\ \n"
     txt += "\\\\ \n"
     txt += "Формула (3) СП30.13330.2020 По таблице Б.1 СП30.13330.2020 находим значение коэффициента $\\alpha$. \\\\ \n"
     txt += "\\\\ \n"
-    txt += (
-        "$P^{tot} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q^{tot} = 5 \\cdot <c> \\cdot <d> = <e>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_total)))
-        .replace("<b>", str(_r(report.seconds_report.alpha_total)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_and_cold_q0tot)))
-        .replace("<d>", str(_r(report.seconds_report.alpha_total)))
-        .replace("<e>", str(_r(report.seconds_report.q_total)))
-    )
-    txt += (
-        "$P^{h} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q^{h} = 5 \\cdot <c> \\cdot <d> = <e>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_hot)))
-        .replace("<b>", str(_r(report.seconds_report.alpha_hot)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<d>", str(_r(report.seconds_report.alpha_hot)))
-        .replace("<e>", str(_r(report.seconds_report.q_hot)))
-    )
-    txt += (
-        "$P^{c} = <a> \\rightarrow \\alpha = <b> \\hspace{20px} q^{c} = 5 \\cdot <c> \\cdot <d> = <e>$, л/с \\\\ \n"
-        .replace("<a>", str(_r(report.seconds_report.P_cold)))
-        .replace("<b>", str(_r(report.seconds_report.alpha_cold)))
-        .replace("<c>", str(_r(report.consumer.device_water_consumption_hot_or_cold_q0)))
-        .replace("<d>", str(_r(report.seconds_report.alpha_cold)))
-        .replace("<e>", str(_r(report.seconds_report.q_cold)))
-    )
+    for s in ("total", "hot", "cold"):
+        alpha, q = trace.get(f"alpha_{s}"), trace.get(f"q_{s}")
+        txt += f"${_step(alpha)} \\hspace{{20px}} {_step(q)}$, л/с \\\\ \n"
 
     txt += "\\\\ \n"
 
@@ -13,17 +13,33 @@ from data import (
     APP_CONTEXT,
     ProjectContext,
 )
-from mathematics import (
-    MultipleObjectsDataReport,
-    OneObjectDataReport,
-    WaterConsumerNorms,
-    calculate_consumption_for_multiple_objects,
-    calculate_consumption_for_one_object,
-)
+from mathematics import ConsumerPlacement, MultipleObjectsDataReport, OneObjectDataReport
+from report_graph import ReportGraph, multiple_objects_graph, one_object_graph, traced_report
 
 from settings import app_logger, CONF
 
 
+# preview field -> graph quantity, for one object and multiple objects graphs
+PREVIEW_ONE_OBJECT_ALPHAS = {
+    "oo_seconds_alpha_tot": "alpha_total",
+    "oo_seconds_alpha_hot": "alpha_hot",
+    "oo_seconds_alpha_cold": "alpha_cold",
+    "oo_max_hour_alpha_tot": "alpha_hr_total",
+    "oo_max_hour_alpha_hot": "alpha_hr_hot",
+    "oo_max_hour_alpha_cold": "alpha_hr_cold",
+}
+PREVIEW_MULTIPLE_OBJECTS_ALPHAS = {
+    "mo_seconds_alpha_tot": "alpha_tot",
+    "mo_seconds_alpha_hot": "alpha_h",
+    "mo_seconds_alpha_cold": "alpha_c",
+    "mo_hour_alpha_tot": "alpha_hr_tot",
+    "mo_hour_alpha_hot": "alpha_hr_h",
+    "mo_hour_alpha_cold": "alpha_hr_c",
+}
+# alphas of the tables have 3 decimals, the preview inputs show as many
+PREVIEW_ALPHA_STEP = Decimal(".001")
+
+
 def _mk_handler(func: dpg.Callable, *args, **kwargs):
     def _(sender, app_data):
         func(*args, **kwargs)
@@ -73,7 +89,11 @@ def show_error(message: str):
         dpg.add_text(message)
 
 
-def create_report(project_ctx: ProjectContext, variant: str):
+def create_report(
+    project_ctx: ProjectContext,
+    variant: str,
+    data_report: OneObjectDataReport | MultipleObjectsDataReport | None = None,
+):
     import datetime
     dt_now = datetime.datetime.now().strftime("%d.%m.%Y")
     report_fname = f"Отчет по водопотреблению {dt_now}"
@@ -88,7 +108,7 @@ def create_report(project_ctx: ProjectContext, variant: str):
     )
 
     try:
-        prepare_latex(fpath, project_ctx, variant)
+        prepare_latex(fpath, project_ctx, variant, data_report=data_report)
     except OSError:
         show_error("Операционная система не поддерживает компиляцию в LaTeX. Мы работаем над этим ;)")
     except TypeError:
@@ -103,52 +123,46 @@ def draw_consumer_card(
     parent: int | str,
     variant: str,
     project_ctx: ProjectContext,
-    draw_only: bool = False,
-    card: WaterConsumerNorms | None = None,
-    card_num_of_visitors: int | None = None,
+    placement: ConsumerPlacement | None = None,
 ):
-    consumer_type = dpg.get_value(f"{variant}_consumer_value")
-    cons: WaterConsumerNorms = APP_CONTEXT["WATER_CONSUMERS"][consumer_type]
-    cons.upd_id()
-
-    num_of_devices_less_200 = dpg.get_value(f"{variant}_num_of_devices_check_value")
-    num_of_devices = dpg.get_value(f"{variant}_num_of_devices_input_value")
-    num_of_devices_hot = dpg.get_value(f"{variant}_num_of_devices_hot_input")
-    num_of_measurers = dpg.get_value(f"{variant}_num_of_measurers_input_value")
-    temp_hot = dpg.get_value(f"{variant}_temp_hot")
-    temp_cold = dpg.get_value(f"{variant}_temp_cold")
-    work_hours = dpg.get_value(f"{variant}_work_hours")
-
-    if card is not None:
-        if card_num_of_visitors is None:
-            return
-        num_of_measurers = card_num_of_visitors
-        cons: WaterConsumerNorms = card
-
-    if num_of_measurers <= 0:
-        show_error("Количество измерителей не может равняться 0")
-        return
+    if placement is None:
+        consumer_type = dpg.get_value(f"{variant}_consumer_value")
+        num_of_measurers = dpg.get_value(f"{variant}_num_of_measurers_input_value")
 
-    def _delcons():
-        _, win = APP_CONTEXT["CHOOSEN_CONSUMERS"][cons.id]
-        del APP_CONTEXT["CHOOSEN_CONSUMERS"][cons.id]
-        dpg.delete_item(win)
-        dpg.delete_item(f"spacer_{cons.id}")
-        # TODO: THIS ID DOESNT WORK
-        project_ctx.remove_consumer(variant, cons)
+        if num_of_measurers <= 0:
+            show_error("Количество измерителей не может равняться 0")
+            return
 
-    if not draw_only:
-        project_ctx.add_variant_object(
+        placement = project_ctx.add_variant_object(
             variant,
-            cons,
+            APP_CONTEXT["WATER_CONSUMERS"][consumer_type],
             num_of_measurers,
-            num_of_devices,
-            num_of_devices_hot,
-            temp_hot,
-            temp_cold,
-            work_hours,
-            num_of_devices_less_200
+            dpg.get_value(f"{variant}_num_of_devices_input_value"),
+            dpg.get_value(f"{variant}_num_of_devices_hot_input"),
+            dpg.get_value(f"{variant}_temp_hot"),
+            dpg.get_value(f"{variant}_temp_cold"),
+            dpg.get_value(f"{variant}_work_hours"),
+            dpg.get_value(f"{variant}_num_of_devices_check_value"),
         )
+        if placement is None:
+            return
+
+    params = placement.params
+    cons = params.consumer_norms
+    placement_id = placement.id
+    num_of_measurers = params.num_of_measurers
+    num_of_devices = params.num_of_devices
+    num_of_devices_hot = params.num_of_devices_hot
+    temp_hot = params.temp_hot
+    temp_cold = params.temp_cold
+    work_hours = params.work_hours
+
+    def _delcons():
+        _, win = APP_CONTEXT["CHOOSEN_CONSUMERS"][placement_id]
+        del APP_CONTEXT["CHOOSEN_CONSUMERS"][placement_id]
+        dpg.delete_item(win)
+        dpg.delete_item(f"spacer_{placement_id}")
+        project_ctx.remove_consumer(variant, placement_id)
 
     with dpg.child_window(parent=parent, height=660, width=460) as cwin:
         with dpg.group(horizontal=True):
@@ -156,7 +170,7 @@ def draw_consumer_card(
             dpg.add_separator(label=cons.name)
 
         dpg.add_spacer(height=3)
-        dpg.add_text(f"ID: {cons.id}")
+        dpg.add_text(f"ID: {placement_id}")
 
         dpg.add_spacer(height=3)
         dpg.add_text(f"Количество измерителей: {num_of_measurers}")
@@ -191,9 +205,9 @@ def draw_consumer_card(
         dpg.add_spacer(height=10)
         dpg.add_text(f"Т,ч: {cons.T}")
 
-    dpg.add_spacer(parent=parent, height=10, tag=f"spacer_{cons.id}")
+    dpg.add_spacer(parent=parent, height=10, tag=f"spacer_{placement_id}")
 
-    APP_CONTEXT["CHOOSEN_CONSUMERS"][cons.id] = cons, cwin
+    APP_CONTEXT["CHOOSEN_CONSUMERS"][placement_id] = placement, cwin
 
 
 def variant_screen(parent_tab: str, project_ctx: ProjectContext):
@@ -208,23 +222,20 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
             dpg.enable_item(f"{parent_tab}_num_of_devices_input")
     
 
-    def _update_alphas_and_make_report(data_report: OneObjectDataReport | MultipleObjectsDataReport, project_ctx: ProjectContext, variant: str):
-        if isinstance(data_report, OneObjectDataReport):
-            data_report.seconds_report.alpha_total = dpg.get_value(f"{parent_tab}_preedit_oo_seconds_alpha_tot")
-            data_report.seconds_report.alpha_hot = dpg.get_value(f"{parent_tab}_preedit_oo_seconds_alpha_hot")
-            data_report.seconds_report.alpha_cold = dpg.get_value(f"{parent_tab}_preedit_oo_seconds_alpha_cold")
-            data_report.hours_max_report.alpha_total = dpg.get_value(f"{parent_tab}_preedit_oo_max_hour_alpha_tot")
-            data_report.hours_max_report.alpha_hot = dpg.get_value(f"{parent_tab}_preedit_oo_max_hour_alpha_hot")
-            data_report.hours_max_report.alpha_cold = dpg.get_value(f"{parent_tab}_preedit_oo_max_hour_alpha_cold")
-        else:
-            data_report.seconds_consumption.alpha_tot = dpg.get_value(f"{parent_tab}_preedit_mo_seconds_alpha_tot")
-            data_report.seconds_consumption.alpha_h = dpg.get_value(f"{parent_tab}_preedit_mo_seconds_alpha_hot")
-            data_report.seconds_consumption.alpha_c = dpg.get_value(f"{parent_tab}_preedit_mo_seconds_alpha_cold")
-            data_report.hours_consumption.alpha_hr_tot = dpg.get_value(f"{parent_tab}_preedit_mo_hour_alpha_tot")
-            data_report.hours_consumption.alpha_hr_h = dpg.get_value(f"{parent_tab}_preedit_mo_hour_alpha_hot")
-            data_report.hours_consumption.alpha_hr_c = dpg.get_value(f"{parent_tab}_preedit_mo_hour_alpha_cold")
-        
-        create_report(project_ctx, variant)
+    def _update_alphas_and_make_report(
+        graph: ReportGraph,
+        alphas: dict[str, str],
+        shown: dict[str, Decimal],
+        project_ctx: ProjectContext,
+        variant: str,
+    ):
+        for field, quantity in alphas.items():
+            # the widget holds a float32, compare at the precision it shows
+            value = Decimal(str(dpg.get_value(f"{parent_tab}_preedit_{field}"))).quantize(PREVIEW_ALPHA_STEP)
+            if value != shown[quantity].quantize(PREVIEW_ALPHA_STEP):
+                graph.override(quantity, value)
+
+        create_report(project_ctx, variant, traced_report(graph))
         dpg.delete_item("preedit_modal")
     
     def show_report_modal():
@@ -238,31 +249,26 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
         if len(objects) == 0:
             show_error("Отсутствуют объекты для расчета")
 
+        # the preview needs only P/NP and alphas; for several objects they come
+        # from the running sums of the variant and the graph runs on save only
         if len(objects) > 1:
-            data_report = calculate_consumption_for_multiple_objects(objects)
+            graph = multiple_objects_graph(objects)
+            alphas = PREVIEW_MULTIPLE_OBJECTS_ALPHAS
+            totals = project_ctx.get_variant_aggregate(parent_tab).totals()
+            preview = lambda quantity: getattr(totals, quantity)
         else:
-            data_report = calculate_consumption_for_one_object(objects[0])
+            graph = one_object_graph(objects[0])
+            alphas = PREVIEW_ONE_OBJECT_ALPHAS
+            preview = graph.get
+        shown = {quantity: preview(quantity) for quantity in alphas.values()}
         
         def rd(d: Decimal) -> float:
             return float(d.quantize(Decimal(".001"), rounding=ROUND_UP))
         
         try:
             with dpg.value_registry():
-                if isinstance(data_report, OneObjectDataReport):
-                    print(rd(data_report.seconds_report.alpha_total))
-                    dpg.add_float_value(default_value=data_report.seconds_report.alpha_total, tag=f"{parent_tab}_preedit_oo_seconds_alpha_tot")
-                    dpg.add_float_value(default_value=data_report.seconds_report.alpha_hot, tag=f"{parent_tab}_preedit_oo_seconds_alpha_hot")
-                    dpg.add_float_value(default_value=data_report.seconds_report.alpha_cold, tag=f"{parent_tab}_preedit_oo_seconds_alpha_cold")
-                    dpg.add_float_value(default_value=data_report.hours_max_report.alpha_total, tag=f"{parent_tab}_preedit_oo_max_hour_alpha_tot")
-                    dpg.add_float_value(default_value=data_report.hours_max_report.alpha_hot, tag=f"{parent_tab}_preedit_oo_max_hour_alpha_hot")
-                    dpg.add_float_value(default_value=data_report.hours_max_report.alpha_cold, tag=f"{parent_tab}_preedit_oo_max_hour_alpha_cold")
-                else:
-                    dpg.add_float_value(default_value=data_report.seconds_consumption.alpha_tot, tag=f"{parent_tab}_preedit_mo_seconds_alpha_tot")
-                    dpg.add_float_value(default_value=data_report.seconds_consumption.alpha_h, tag=f"{parent_tab}_preedit_mo_seconds_alpha_hot")
-                    dpg.add_float_value(default_value=data_report.seconds_consumption.alpha_c, tag=f"{parent_tab}_preedit_mo_seconds_alpha_cold")
-                    dpg.add_float_value(default_value=data_report.hours_consumption.alpha_hr_tot, tag=f"{parent_tab}_preedit_mo_hour_alpha_tot")
-                    dpg.add_float_value(default_value=data_report.hours_consumption.alpha_hr_h, tag=f"{parent_tab}_preedit_mo_hour_alpha_hot")
-                    dpg.add_float_value(default_value=data_report.hours_consumption.alpha_hr_c, tag=f"{parent_tab}_preedit_mo_hour_alpha_cold")
+                for field, quantity in alphas.items():
+                    dpg.add_float_value(default_value=shown[quantity], tag=f"{parent_tab}_preedit_{field}")
         except Exception as err:
             app_logger.warning(str(err))
 
@@ -275,53 +281,53 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
             pos=[viewport_width // 2 - modal_width // 2, viewport_height // 3],
             tag="preedit_modal"
         ):
-            if isinstance(data_report, OneObjectDataReport):
+            if len(objects) == 1:
                 dpg.add_text("Общий секундный расход")
                 dpg.add_spacer(height=10)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"P_tot = {rd(data_report.seconds_report.P_total)} -> alpha = ")
+                    dpg.add_text(f"P_tot = {rd(graph['P_total'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_seconds_alpha_tot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"P_h = {rd(data_report.seconds_report.P_hot)} -> alpha = ")
+                    dpg.add_text(f"P_h = {rd(graph['P_hot'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_seconds_alpha_hot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"P_c = {rd(data_report.seconds_report.P_cold)} -> alpha = ")
+                    dpg.add_text(f"P_c = {rd(graph['P_cold'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_seconds_alpha_cold", width=150)
                 dpg.add_spacer(height=10)
                 dpg.add_text("Максимальный часовой расход")
                 dpg.add_spacer(height=10)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"Phr_tot = {rd(data_report.hours_max_report.P_total)} -> alpha = ")
+                    dpg.add_text(f"Phr_tot = {rd(graph['Phr_total'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_max_hour_alpha_tot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"Phr_h = {rd(data_report.hours_max_report.P_hot)} -> alpha = ")
+                    dpg.add_text(f"Phr_h = {rd(graph['Phr_hot'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_max_hour_alpha_hot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"Phr_c = {rd(data_report.hours_max_report.P_cold)} -> alpha = ")
+                    dpg.add_text(f"Phr_c = {rd(graph['Phr_cold'])} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_oo_max_hour_alpha_cold", width=150)
             else:
                 dpg.add_text("Общий секундный расход")
                 dpg.add_spacer(height=10)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_tot = {rd(data_report.seconds_consumption.NPs_tot_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_tot = {rd(preview('NPs_tot_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_seconds_alpha_tot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_h = {rd(data_report.seconds_consumption.NPs_h_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_h = {rd(preview('NPs_h_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_seconds_alpha_hot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_c = {rd(data_report.seconds_consumption.NPs_c_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_c = {rd(preview('NPs_c_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_seconds_alpha_cold", width=150)
                 dpg.add_spacer(height=10)
                 dpg.add_text("Общий часовой расход")
                 dpg.add_spacer(height=10)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_tot = {rd(data_report.hours_consumption.NPhrs_tot_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_tot = {rd(preview('NPhrs_tot_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_hour_alpha_tot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_h = {rd(data_report.hours_consumption.NPhrs_h_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_h = {rd(preview('NPhrs_h_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_hour_alpha_hot", width=150)
                 with dpg.group(horizontal=True):
-                    dpg.add_text(f"NP_c = {rd(data_report.hours_consumption.NPhrs_c_sum)} -> alpha = ")
+                    dpg.add_text(f"NP_c = {rd(preview('NPhrs_c_sum'))} -> alpha = ")
                     dpg.add_input_float(source=f"{parent_tab}_preedit_mo_hour_alpha_cold", width=150)
 
             dpg.add_spacer(height=20)
@@ -330,7 +336,9 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
                 height=30, width=-1,
                 callback=_mk_handler(
                     _update_alphas_and_make_report,
-                    data_report=data_report,
+                    graph=graph,
+                    alphas=alphas,
+                    shown=shown,
                     project_ctx=project_ctx,
                     variant=parent_tab
                 )
@@ -355,8 +363,20 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
             with dpg.child_window(border=False):
                 dpg.add_text("Тип потребителя")
 
+                def _filter_consumers(sender, app_data):
+                    found = APP_CONTEXT["WATER_CONSUMERS"].search(app_data)
+                    dpg.configure_item(f"{parent_tab}_consumer_combo", items=[e.name for e in found])
+                    if found:
+                        dpg.set_value(f"{parent_tab}_consumer_value", found[0].name)
+
+                dpg.add_input_text(
+                    hint="Поиск: номер или часть названия",
+                    callback=_filter_consumers,
+                    width=480,
+                )
                 dpg.add_combo(
-                    items=list(APP_CONTEXT["WATER_CONSUMERS"].keys()),
+                    tag=f"{parent_tab}_consumer_combo",
+                    items=APP_CONTEXT["WATER_CONSUMERS"].names(),
                     source=f"{parent_tab}_consumer_value",
                     height_mode=10,
                     width=480
@@ -435,16 +455,12 @@ def variant_screen(parent_tab: str, project_ctx: ProjectContext):
 
             with dpg.child_window(parent=mwin, tag=f"right_var_win_{parent_tab}", border=False) as cw:
                 dpg.add_text("Добавленные потребители:", parent=cw)
-                for object_ in project_ctx.variants_data[parent_tab]["objects"]:
-                    card = APP_CONTEXT["WATER_CONSUMERS"][object_["name"]]
-                    card.id = object_["id"]
+                for placement in project_ctx.get_variant_placements(parent_tab):
                     draw_consumer_card(
                         parent=f"right_var_win_{parent_tab}",
                         variant=parent_tab,
                         project_ctx=project_ctx,
-                        card=card,
-                        card_num_of_visitors=object_["num_of_measurers"],
-                        draw_only=True,
+                        placement=placement,
                     )
 
         with dpg.theme() as container_theme:
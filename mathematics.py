@@ -8,43 +8,87 @@ https://acs-nnov.ru/assets/files/sp_30.13330.2020_vnutrennij_vodoprovod_i_kanali
 
 """
 
+from collections.abc import Iterable, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass as std_dataclass
+from functools import lru_cache, wraps
 from typing import Literal
-import uuid
-from decimal import Decimal, getcontext
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, ROUND_HALF_EVEN, Context, Decimal, localcontext
 from enum import Enum
 
-from pydantic import Field
 from pydantic.dataclasses import dataclass
 
-# from ml import aproximate_alpha
+from alpha import lookup_alpha
 
-def aproximate_alpha(v: Decimal) -> Decimal:
-    return v
 
+def record(cls):
+    """Validation-free __slots__ dataclass for calculation results.
 
-# def approximate(NP: Decimal, less_200: bool = True) -> Decimal:
-#     if less_200:
-#         model = TwoVariableApproximator(nn.ReLU)                                                # type:ignore
-#     else:
-#         model = AlphaOneDimensionalApproximator(nn.ReLU)                                                # type:ignore
+    pydantic dataclasses are kept for the I/O boundary only (norms and
+    consumer params read from projects); results built in the hot path
+    skip validation and the per-instance __dict__.
+    """
+    return std_dataclass(cls, slots=True)
 
-#     model.load_state_dict(torch.load(CONF.MODEL_PATH))                                      # type:ignore
-#     model.eval()
 
-#     with torch.no_grad():                                                                   # type:ignore
-#         inp = torch.tensor(float(NP), dtype=torch.float32)                                         # type:ignore
-#         v = model(inp).squeeze(1).float()                                                # type:ignore
-    
-#     return Decimal(v)
- 
-# aproximate_alpha = lambda v: approximate(v, N < 200)                                      # type:ignore
+def aproximate_alpha(NP: Decimal, N: int | None = None) -> Decimal:
+    # N - number of devices; table Б.1 is used only when it is known
+    return lookup_alpha(NP, N)
+
+
+### Decimal precision ###
+
+
+@dataclass(frozen=True)
+class PrecisionPolicy:
+    prec: int = 8
+    rounding: str = ROUND_HALF_EVEN
+
+    def context(self) -> Context:
+        return Context(prec=self.prec, rounding=self.rounding)
+
+
+DEFAULT_PRECISION = PrecisionPolicy()
 
-getcontext().prec = 8
+# Policy of the calculation running in the current thread / task.
+# Decimal contexts are thread-local, so every calculation sets its own
+# instead of relying on a global getcontext() of whichever thread runs it.
+_CURRENT_PRECISION: ContextVar[PrecisionPolicy | None] = ContextVar("precision", default=None)
+
+
+@contextmanager
+def precision_context(policy: PrecisionPolicy = DEFAULT_PRECISION):
+    token = _CURRENT_PRECISION.set(policy)
+    try:
+        with localcontext(policy.context()):
+            yield
+    finally:
+        _CURRENT_PRECISION.reset(token)
+
+
+def _calculation(func):
+    """Run under DEFAULT_PRECISION unless called inside another calculation."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _CURRENT_PRECISION.get() is not None:
+            return func(*args, **kwargs)
+        with precision_context(DEFAULT_PRECISION):
+            return func(*args, **kwargs)
+    return wrapper
 
 
 ### Common structures for one object and multiple objects ###
 
 
+class CalculationEngine(Enum):
+    DECIMAL = "decimal"
+    # fixed_point.py: scaled integers, reproducible bit-for-bit
+    FIXED_POINT = "fixed_point"
+    # vectorized.py: NumPy float64, multiple objects only
+    NUMPY = "numpy"
+
+
 class WateringConsumption(Enum):
     GRASS = Decimal(3)
     FOOTBALL_FIELD = Decimal(0.5)
@@ -86,7 +130,9 @@ class DeviceWaterConsumptionNorms:
 
 
 # ТаблицаА.2 – Расчетные расходы воды потребителями
-@dataclass
+# Frozen: one instance per table row is shared by every placement of that
+# consumer type (see intern_norms); per-placement data is in ConsumerPlacement.
+@dataclass(frozen=True)
 class WaterConsumerNorms:
     # Водопотребители
     name: str
@@ -108,11 +154,156 @@ class WaterConsumerNorms:
     device_water_consumption_hot_or_cold_q0_hr: float
     # T, ч
     T: float
-    # id
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
 
-    def upd_id(self):
-        self.id = str(uuid.uuid4())
+
+_INTERNED_NORMS: dict[WaterConsumerNorms, WaterConsumerNorms] = {}
+
+
+def intern_norms(norms: WaterConsumerNorms) -> WaterConsumerNorms:
+    """Shared instance of the norms with these values."""
+    return _INTERNED_NORMS.setdefault(norms, norms)
+
+
+### Calculation trace ###
+
+
+@record
+class FormulaStep:
+    # expression is a LaTeX template: <0>, <1>, ... are operands, <i> is the
+    # consumer number, <sum> is the sum of the products in terms
+    key: str
+    expression: str
+    operands: tuple
+    result: Decimal
+    index: int | None = None
+    terms: tuple = ()
+
+
+class CalculationTrace:
+    """Formulas of one calculation in the order they were evaluated."""
+
+    __slots__ = ("steps", "_by_key")
+
+    def __init__(self):
+        self.steps: list[FormulaStep] = []
+        self._by_key: dict[tuple[str, int | None], FormulaStep] = {}
+
+    def add(self, step: FormulaStep):
+        self.steps.append(step)
+        self._by_key[(step.key, step.index)] = step
+
+    def get(self, key: str, index: int | None = None) -> FormulaStep:
+        return self._by_key[(key, index)]
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+
+_CURRENT_TRACE: ContextVar[CalculationTrace | None] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def trace_context(trace: CalculationTrace):
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+def current_trace() -> CalculationTrace | None:
+    return _CURRENT_TRACE.get()
+
+
+def traced(calculate, engine: CalculationEngine | None = None):
+    """Run calculate() and attach the trace of its formulas to the report."""
+    if engine is not None and engine != CalculationEngine.DECIMAL:
+        raise ValueError("Calculation trace is recorded only by the Decimal engine")
+    trace = CalculationTrace()
+    with trace_context(trace):
+        report = calculate()
+    report.trace = trace
+    return report
+
+
+def _trace(key: str, expression: str, operands: tuple, result: Decimal, index: int | None = None, terms: tuple = ()):
+    trace = _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.add(FormulaStep(key, expression, operands, result, index, terms))
+
+
+### Per-norms kernels ###
+
+
+K_5 = Decimal(5)
+K_1000 = Decimal(1000)
+# exact values of the float literals, same as _d(0.005) etc.
+K_0_005 = Decimal(0.005)
+K_0_3 = Decimal(0.3)
+K_1_16 = Decimal(1.16)
+
+
+class NormsKernel:
+    """WaterConsumerNorms converted to Decimal once, with the products and
+    differences of norms that the formulas need.
+
+    Composite values are rounded under the precision policy they were built
+    for and are evaluated in the same order as the formulas, so results do
+    not change.
+    """
+
+    __slots__ = (
+        "avg_day_tot", "avg_day_h", "avg_day_c",
+        "max_hour_tot", "max_hour_h", "max_hour_c",
+        "q0tot", "q0tot_hr", "q0", "q0_hr", "T",
+        "q0tot_x5", "q0_x5", "q0tot_hr_x0005", "q0_hr_x0005", "T_x1000",
+    )
+
+    def __init__(self, values: tuple[float, ...]):
+        (
+            self.avg_day_tot, self.avg_day_h, self.max_hour_tot, self.max_hour_h,
+            self.q0tot, self.q0tot_hr, self.q0, self.q0_hr, self.T,
+        ) = (Decimal(v) for v in values)
+
+        self.avg_day_c = self.avg_day_tot - self.avg_day_h
+        self.max_hour_c = self.max_hour_tot - self.max_hour_h
+        self.q0tot_x5 = K_5 * self.q0tot
+        self.q0_x5 = K_5 * self.q0
+        self.q0tot_hr_x0005 = K_0_005 * self.q0tot_hr
+        self.q0_hr_x0005 = K_0_005 * self.q0_hr
+        self.T_x1000 = 1000 * self.T
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"NormsKernel is immutable: {name}")
+        super().__setattr__(name, value)
+
+
+@lru_cache(maxsize=4096)
+def _kernel_from_values(values: tuple[float, ...], policy: PrecisionPolicy) -> NormsKernel:
+    with localcontext(policy.context()):
+        return NormsKernel(values)
+
+
+def norms_kernel(norms: WaterConsumerNorms) -> NormsKernel:
+    # keyed by values: norms that differ only by name share a kernel
+    return _kernel_from_values(
+        (
+            norms.avg_hot_and_cold_water_norms_per_day,
+            norms.avg_hot_water_norms_per_day,
+            norms.max_hot_and_cold_water_norms_per_hour,
+            norms.max_hot_water_norms_per_hour,
+            norms.device_water_consumption_hot_and_cold_q0tot,
+            norms.device_water_consumption_hot_and_cold_q0tot_hr,
+            norms.device_water_consumption_hot_or_cold_q0,
+            norms.device_water_consumption_hot_or_cold_q0_hr,
+            norms.T,
+        ),
+        _CURRENT_PRECISION.get() or DEFAULT_PRECISION,
+    )
 
 
 ### Reports for one object ###
@@ -129,14 +320,21 @@ class WaterConsumerParams:
     work_hours: int
 
 
-@dataclass
+@record
+class ConsumerPlacement:
+    # one consumer placed in a project variant
+    id: str
+    params: WaterConsumerParams
+
+
+@record
 class ResultWaterConsumption:
     meters_cubic_per_day: Decimal
     meters_cubic_per_hour: Decimal
     liters_per_second: Decimal
 
 
-@dataclass
+@record
 class SecondConsumptionReportData:
     # alphas
     alpha_total: Decimal
@@ -152,7 +350,7 @@ class SecondConsumptionReportData:
     q_cold: Decimal
 
 
-@dataclass
+@record
 class MaxHourConsumptionReportData:
     # alphas
     alpha_total: Decimal
@@ -168,7 +366,7 @@ class MaxHourConsumptionReportData:
     q_cold: Decimal
 
 
-@dataclass
+@record
 class AvgHourConsumptionReportData:
     # Water consumption
     q_total: Decimal
@@ -176,7 +374,7 @@ class AvgHourConsumptionReportData:
     q_cold: Decimal
 
 
-@dataclass
+@record
 class TotalDayConsumptionReportData:
     # Water consumption
     Q_total: Decimal
@@ -184,18 +382,18 @@ class TotalDayConsumptionReportData:
     Q_cold: Decimal
 
 
-@dataclass
+@record
 class HeatConsumptionReportData:
     Q_avg_hour: Decimal
     Q_max_hour: Decimal
 
 
-@dataclass
+@record
 class GrassWateringReportData:
     Quc: Decimal
 
 
-@dataclass
+@record
 class TotalObjectConsumption:
     # Хозяйственно-питьевой водопровод
     domestic_and_drinking_water_supply_general: ResultWaterConsumption # Общий расход воды
@@ -207,7 +405,7 @@ class TotalObjectConsumption:
     # domestic_sewerage_cold: ResultWaterConsumption # Расход горячей воды
 
 
-@dataclass
+@record
 class OneObjectDataReport:
     consumer: WaterConsumerNorms
     consumer_params: WaterConsumerParams
@@ -218,33 +416,34 @@ class OneObjectDataReport:
     grass_watering_report: GrassWateringReportData
     total_day_report: TotalDayConsumptionReportData
     total_object_report: TotalObjectConsumption
+    trace: CalculationTrace | None = None
 
 
 ### Reports for multiple objects ###
 
 
-@dataclass
+@record
 class MultipleObjectsNP:
     NP_total: Decimal
     NP_hot: Decimal
     NP_cold: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsAlphas:
     alhpha_total: Decimal
     alhpha_hot: Decimal
     alhpha_cold: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsQs:
     q_total: Decimal
     q_hot: Decimal
     q_cold: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsSecondsConsumptionDataReport:
     consumer_params: list[WaterConsumerParams]
     NPs_tot: list[Decimal]
@@ -264,7 +463,7 @@ class MultipleObjectsSecondsConsumptionDataReport:
     q0_c: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsTotalHoursConsumptionDataReport:
     consumer_params: list[WaterConsumerParams]
     NPhrs_tot: list[Decimal]
@@ -284,7 +483,7 @@ class MultipleObjectsTotalHoursConsumptionDataReport:
     q0hr_h: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsTotalDayConsumptionDataReport:
     consumer_params: list[WaterConsumerParams]
     Qu_tots: list[Decimal]
@@ -295,23 +494,29 @@ class MultipleObjectsTotalDayConsumptionDataReport:
     Qu_cold: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsHeatConsumptionDataReport:
     Q_avg_hour: Decimal
     Q_max_hour: Decimal
 
 
-@dataclass
+@record
 class MultipleObjectsDataReport:
     seconds_consumption: MultipleObjectsSecondsConsumptionDataReport
     hours_consumption: MultipleObjectsTotalHoursConsumptionDataReport
     day_consumption: MultipleObjectsTotalDayConsumptionDataReport
     heat_consumption: MultipleObjectsHeatConsumptionDataReport
     consumers_params: list[WaterConsumerParams]
+    trace: CalculationTrace | None = None
 
 
 ### Multiple objects calculations ###
 
+HEAT_AVG_EXPRESSION = "Q^h_T = 1,16 \\cdot <0> \\cdot (<1> - <2>) + <3>"
+HEAT_MAX_EXPRESSION = "Q^h_{hr} = 1,16 \\cdot <0> \\cdot (<1> - <2>) + <3>"
+
+
+@_calculation
 def calculate_multiple_objects_heat_consumption(
     consumers_params: list[WaterConsumerParams],
     hour_consumption: MultipleObjectsTotalHoursConsumptionDataReport,
@@ -320,126 +525,353 @@ def calculate_multiple_objects_heat_consumption(
     temp_diff = _d(consumers_params[0].temp_hot) - _d(consumers_params[0].temp_cold)
 
     Qht = (
-        _d(1.16) 
+        K_1_16
         * day_consumption.Qu_hot
         * temp_diff
-        + hour_consumption.qhr_h * _d(0.3)
+        + hour_consumption.qhr_h * K_0_3
     )
     Qhrt = (
-        _d(1.16) 
+        K_1_16
         * hour_consumption.qhr_h
         * temp_diff
-        + hour_consumption.qhr_h * _d(0.3)
+        + hour_consumption.qhr_h * K_0_3
     )
 
+    if current_trace() is not None:
+        losses = hour_consumption.qhr_h * K_0_3
+        temps = (consumers_params[0].temp_hot, consumers_params[0].temp_cold, losses)
+        _trace("Q_avg_hour", HEAT_AVG_EXPRESSION, (day_consumption.Qu_hot, *temps), Qht)
+        _trace("Q_max_hour", HEAT_MAX_EXPRESSION, (hour_consumption.qhr_h, *temps), Qhrt)
+
     return MultipleObjectsHeatConsumptionDataReport(
         Q_avg_hour=Qht,
         Q_max_hour=Qhrt,
     ) 
 
-def calculate_multiple_objects_day_consumption(
+class ConsumerTerms:
+    """Per-consumer intermediates of the multiple objects calculation."""
+
+    __slots__ = (
+        "nP_tot", "nP_h", "nP_c",
+        "nPhr_tot", "nPhr_h", "nPhr_c",
+        "Q_tot", "Q_h", "Q_c",
+    )
+
+    def __init__(
+        self,
+        nP_tot: Decimal, nP_h: Decimal, nP_c: Decimal,
+        nPhr_tot: Decimal, nPhr_h: Decimal, nPhr_c: Decimal,
+        Q_tot: Decimal, Q_h: Decimal, Q_c: Decimal,
+    ):
+        self.nP_tot, self.nP_h, self.nP_c = nP_tot, nP_h, nP_c
+        self.nPhr_tot, self.nPhr_h, self.nPhr_c = nPhr_tot, nPhr_h, nPhr_c
+        self.Q_tot, self.Q_h, self.Q_c = Q_tot, Q_h, Q_c
+
+
+@_calculation
+def calculate_consumer_terms(consumer: WaterConsumerParams, num_of_measurers: int | None = None) -> ConsumerTerms:
+    # num_of_measurers replaces U of the consumer, e.g. with U of a whole group
+    if num_of_measurers is None:
+        num_of_measurers = consumer.num_of_measurers
+
+    k = norms_kernel(consumer.consumer_norms)
+    U = _d(num_of_measurers)
+
+    nP_tot = (k.max_hour_tot * U) / (k.q0tot * _d(consumer.num_of_devices) * 3600)
+    nP_h = (k.max_hour_h * U) / (k.q0 * _d(consumer.num_of_devices_hot) * 3600)
+    nP_c = (k.max_hour_c * U) / (k.q0 * (_d(consumer.num_of_devices) - _d(consumer.num_of_devices_hot)) * 3600)
+
+    nPhr_tot = (3600 * nP_tot * k.q0tot) / k.q0tot_hr
+    nPhr_c = (3600 * nP_c * k.q0) / k.q0_hr
+    nPhr_h = (3600 * nP_h * k.q0) / k.q0_hr
+
+    Q_total = k.avg_day_tot * num_of_measurers / K_1000
+    Q_hot = k.avg_day_h * num_of_measurers / K_1000
+    Q_cold = k.avg_day_c * num_of_measurers / K_1000
+
+    return ConsumerTerms(nP_tot, nP_h, nP_c, nPhr_tot, nPhr_h, nPhr_c, Q_total, Q_hot, Q_cold)
+
+
+@record
+class ConsumerGroup:
+    # consumers of a variant that differ only in U, calculated once
+    params: WaterConsumerParams
+    weight: int
+    num_of_measurers: int
+
+    def terms(self) -> ConsumerTerms:
+        return calculate_consumer_terms(self.params, self.num_of_measurers)
+
+
+def consumer_key(consumer: WaterConsumerParams) -> tuple:
+    return (
+        consumer.consumer_norms,
+        consumer.num_of_devices,
+        consumer.num_of_devices_hot,
+        consumer.temp_hot,
+        consumer.temp_cold,
+        consumer.work_hours,
+    )
+
+
+def group_consumers(consumers_params: list[WaterConsumerParams]) -> tuple[list[ConsumerGroup], list[int]]:
+    """Groups of consumers and the group index of every consumer.
+
+    Consumers are grouped by norms, devices, temperatures and work hours.
+    All terms of a consumer are linear in U, so the terms of a group are
+    calculated once with the U of all its members; its weight is the number
+    of members, which counts their devices.
+    """
+    index_of: dict[tuple, int] = {}
+    groups: list[ConsumerGroup] = []
+    index: list[int] = []
+    for consumer in consumers_params:
+        key = consumer_key(consumer)
+        i = index_of.get(key)
+        if i is None:
+            i = index_of[key] = len(groups)
+            groups.append(ConsumerGroup(consumer, 0, 0))
+        groups[i].weight += 1
+        groups[i].num_of_measurers += consumer.num_of_measurers
+        index.append(i)
+    return groups, index
+
+
+# wide enough for any sum of report values, so adding never rounds
+EXACT_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def exact_sum(values: Iterable[Decimal]) -> Decimal:
+    """Sum rounded once in the current context.
+
+    The result does not depend on the order of the values, so sums kept by
+    adding and removing values (aggregate.py) match the report exactly.
+    """
+    # values are calculated in the current context, only the sum is exact
+    values = list(values)
+    with localcontext(EXACT_CONTEXT):
+        total = sum(values, Decimal(0))
+    return +total
+
+
+class VariantTerms:
+    """Terms of a variant, one ConsumerTerms per group (see group_consumers).
+
+    Sums of the report are taken over the groups. Per-object terms are
+    calculated from the consumers when a per-object column is first read.
+    """
+
+    __slots__ = ("consumers_params", "groups", "index", "group_terms", "_policy", "_objects")
+
+    def __init__(
+        self,
+        consumers_params: list[WaterConsumerParams],
+        groups: list[ConsumerGroup],
+        index: list[int],
+        group_terms: list[ConsumerTerms],
+    ):
+        self.consumers_params = consumers_params
+        self.groups = groups
+        self.index = index
+        self.group_terms = group_terms
+        self._policy = _CURRENT_PRECISION.get() or DEFAULT_PRECISION
+        self._objects: list[ConsumerTerms] | None = None
+
+    def objects(self) -> list[ConsumerTerms]:
+        if self._objects is None:
+            calculated: dict[tuple[int, int], ConsumerTerms] = {}
+            objects = []
+            with precision_context(self._policy):
+                for consumer, i in zip(self.consumers_params, self.index):
+                    key = (i, consumer.num_of_measurers)
+                    t = calculated.get(key)
+                    if t is None:
+                        t = calculated[key] = calculate_consumer_terms(consumer)
+                    objects.append(t)
+            self._objects = objects
+        return self._objects
+
+    def column(self, name: str) -> "ObjectTerms":
+        return ObjectTerms(self, name)
+
+    def sum(self, name: str) -> Decimal:
+        return exact_sum(getattr(t, name) for t in self.group_terms)
+
+    def weighted_sum(self, name: str, factor: str) -> Decimal:
+        # sum of a term times a kernel value of its norms, e.g. nP_tot * q0
+        return exact_sum(
+            getattr(t, name) * getattr(norms_kernel(g.params.consumer_norms), factor)
+            for g, t in zip(self.groups, self.group_terms)
+        )
+
+    def num_of_devices(self) -> tuple[int, int]:
+        N_tot = sum(g.weight * g.params.num_of_devices for g in self.groups)
+        N_h = sum(g.weight * g.params.num_of_devices_hot for g in self.groups)
+        return N_tot, N_h
+
+
+class ObjectTerms(Sequence):
+    """Per-object column of VariantTerms, e.g. nP_tot of every consumer."""
+
+    __slots__ = ("_terms", "_name")
+
+    def __init__(self, terms: VariantTerms, name: str):
+        self._terms = terms
+        self._name = name
+
+    def __len__(self) -> int:
+        return len(self._terms.consumers_params)
+
+    def __getitem__(self, i):
+        objects = self._terms.objects()
+        if isinstance(i, slice):
+            return [getattr(t, self._name) for t in objects[i]]
+        return getattr(objects[i], self._name)
+
+    def __iter__(self):
+        return (getattr(t, self._name) for t in self._terms.objects())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+@_calculation
+def variant_terms(consumers_params: list[WaterConsumerParams]) -> VariantTerms:
+    groups, index = group_consumers(consumers_params)
+    return VariantTerms(consumers_params, groups, index, [g.terms() for g in groups])
+
+
+def _trace_objects_seconds(
     consumers_params: list[WaterConsumerParams],
+    report: MultipleObjectsSecondsConsumptionDataReport,
 ):
-    Q_tots: list[Decimal] = []
-    Q_hs: list[Decimal] = []
-    Q_cs: list[Decimal] = []
-
-    for ind, consumer in enumerate(consumers_params):
-        Q_total = (
-            _d(consumer.consumer_norms.avg_hot_and_cold_water_norms_per_day)
-            * consumer.num_of_measurers
-            / _d(1000)
-        )
-        Q_hot = (
-            _d(consumer.consumer_norms.avg_hot_water_norms_per_day)
-            * consumer.num_of_measurers
-            / _d(1000)
-        )
-        Q_cold = (
-            (
-                _d(consumer.consumer_norms.avg_hot_and_cold_water_norms_per_day) 
-                - _d(consumer.consumer_norms.avg_hot_water_norms_per_day)
-            )
-            * consumer.num_of_measurers
-            / _d(1000)
-        )
+    kernels = [norms_kernel(c.consumer_norms) for c in consumers_params]
+    for i, (c, k) in enumerate(zip(consumers_params, kernels)):
+        N_c = c.num_of_devices - c.num_of_devices_hot
+        expr = "NP^{<s><i>} = \\frac{<0> \\cdot <1>}{<2> \\cdot <3> \\cdot 3600}"
+        _trace("NP_tot", expr.replace("<s>", "tot"), (k.max_hour_tot, c.num_of_measurers, k.q0tot, c.num_of_devices), report.NPs_tot[i], i)
+        _trace("NP_h", expr.replace("<s>", "h"), (k.max_hour_h, c.num_of_measurers, k.q0, c.num_of_devices_hot), report.NPs_h[i], i)
+        _trace("NP_c", expr.replace("<s>", "c"), (k.max_hour_c, c.num_of_measurers, k.q0, N_c), report.NPs_c[i], i)
+
+    q0s = [k.q0 for k in kernels]
+    for s, NPs, NP_sum, alpha, q0, q in (
+        ("tot", report.NPs_tot, report.NPs_tot_sum, report.alpha_tot, report.q0_tot, report.q_tot),
+        ("h", report.NPs_h, report.NPs_h_sum, report.alpha_h, report.q0_h, report.q_h),
+        ("c", report.NPs_c, report.NPs_c_sum, report.alpha_c, report.q0_c, report.q_c),
+    ):
+        _trace(f"alpha_{s}", "\\sum{NP^{<s>}} = <0> \\rightarrow \\alpha".replace("<s>", s), (NP_sum,), alpha)
+        _trace(f"q0_{s}", "q_0^{<s>} = (<sum>) / <0>".replace("<s>", s), (NP_sum,), q0, terms=tuple(zip(q0s, NPs)))
+        _trace(f"q_{s}", "q^{<s>} = 5 \\cdot <0> \\cdot <1>".replace("<s>", s), (q0, alpha), q)
+
+
+def _trace_objects_hours(
+    consumers_params: list[WaterConsumerParams],
+    seconds_consumption: MultipleObjectsSecondsConsumptionDataReport,
+    report: MultipleObjectsTotalHoursConsumptionDataReport,
+):
+    kernels = [norms_kernel(c.consumer_norms) for c in consumers_params]
+    for i, k in enumerate(kernels):
+        expr = "NP^{<s><i>}_{hr} = 3600 \\cdot <0> \\cdot <1> / <2>"
+        _trace("NPhr_tot", expr.replace("<s>", "tot"), (seconds_consumption.NPs_tot[i], k.q0tot, k.q0tot_hr), report.NPhrs_tot[i], i)
+        _trace("NPhr_h", expr.replace("<s>", "h"), (seconds_consumption.NPs_h[i], k.q0, k.q0_hr), report.NPhrs_h[i], i)
+        _trace("NPhr_c", expr.replace("<s>", "c"), (seconds_consumption.NPs_c[i], k.q0, k.q0_hr), report.NPhrs_c[i], i)
+
+    q0tot_hrs = [k.q0tot_hr for k in kernels]
+    q0_hrs = [k.q0_hr for k in kernels]
+    for s, q0hrs, NPhrs, NPhr_sum, alpha, q0hr, qhr in (
+        ("tot", q0tot_hrs, report.NPhrs_tot, report.NPhrs_tot_sum, report.alpha_hr_tot, report.q0hr_tot, report.qhr_tot),
+        ("h", q0_hrs, report.NPhrs_h, report.NPhrs_h_sum, report.alpha_hr_h, report.q0hr_h, report.qhr_h),
+        ("c", q0_hrs, report.NPhrs_c, report.NPhrs_c_sum, report.alpha_hr_c, report.q0hr_c, report.qhr_c),
+    ):
+        _trace(f"alpha_hr_{s}", "\\sum{NP^{<s>}_{hr}} = <0> \\rightarrow \\alpha_{hr}".replace("<s>", s), (NPhr_sum,), alpha)
+        _trace(f"q0hr_{s}", "q_{0,hr}^{<s>} = (<sum>) / <0>".replace("<s>", s), (NPhr_sum,), q0hr, terms=tuple(zip(q0hrs, NPhrs)))
+        _trace(f"qhr_{s}", "q_{hr}^{<s>} = 0,005 \\cdot <0> \\cdot <1>".replace("<s>", s), (NPhr_sum, alpha), qhr)
+
+
+def _trace_objects_day(
+    consumers_params: list[WaterConsumerParams],
+    report: MultipleObjectsTotalDayConsumptionDataReport,
+):
+    for i, c in enumerate(consumers_params):
+        k = norms_kernel(c.consumer_norms)
+        expr = "Q^{<s><i>}_u = <0> \\cdot <1> / 1000"
+        _trace("Qu_tot", expr.replace("<s>", "tot"), (k.avg_day_tot, c.num_of_measurers), report.Qu_tots[i], i)
+        _trace("Qu_h", expr.replace("<s>", "h"), (k.avg_day_h, c.num_of_measurers), report.Qu_hs[i], i)
+        _trace("Qu_c", expr.replace("<s>", "c"), (k.avg_day_c, c.num_of_measurers), report.Qu_cs[i], i)
+
+    _trace("Qu_total", "\\sum{Q_u^{tot}}", (), report.Qu_total)
+    _trace("Qu_hot", "\\sum{Q_u^{h}}", (), report.Qu_hot)
+    _trace("Qu_cold", "\\sum{Q_u^{c}}", (), report.Qu_cold)
 
-        Q_tots.append(Q_total)
-        Q_hs.append(Q_hot)
-        Q_cs.append(Q_cold)
-    
-    Q_tot_sum = _d(sum(Q_tots))
-    Q_h_sum = _d(sum(Q_tots))
-    Q_c_sum = _d(sum(Q_tots))
 
-    return MultipleObjectsTotalDayConsumptionDataReport(
+@_calculation
+def calculate_multiple_objects_day_consumption(
+    consumers_params: list[WaterConsumerParams],
+    terms: VariantTerms | None = None,
+):
+    if terms is None:
+        terms = variant_terms(consumers_params)
+
+    report = MultipleObjectsTotalDayConsumptionDataReport(
         consumer_params=consumers_params,
-        Qu_tots=Q_tots,
-        Qu_hs=Q_hs,
-        Qu_cs=Q_cs,
-        Qu_total=Q_tot_sum,
-        Qu_hot=Q_h_sum,
-        Qu_cold=Q_c_sum,
+        Qu_tots=terms.column("Q_tot"),
+        Qu_hs=terms.column("Q_h"),
+        Qu_cs=terms.column("Q_c"),
+        Qu_total=terms.sum("Q_tot"),
+        Qu_hot=terms.sum("Q_h"),
+        Qu_cold=terms.sum("Q_c"),
     )
+    if current_trace() is not None:
+        _trace_objects_day(consumers_params, report)
+    return report
 
+
+@_calculation
 def calculate_multiple_objects_hour_consumption(
     seconds_consumption: MultipleObjectsSecondsConsumptionDataReport,
     consumers_params: list[WaterConsumerParams],
+    terms: VariantTerms | None = None,
+    alphas: tuple[Decimal, Decimal, Decimal] | None = None,
 ):
-    NPhr_tots: list[Decimal] = []
-    NPhr_hs: list[Decimal] = []
-    NPhr_cs: list[Decimal] = []
-
-    NPhr_tot_0 = 0
-    NPhr_hot_0 = 0
-    NPhr_cold_0 = 0
-
-    for ind, consumer in enumerate(consumers_params):
-        nPhr_tot = (
-            (3600 * seconds_consumption.NPs_tot[ind] * _d(consumer.consumer_norms.device_water_consumption_hot_and_cold_q0tot))
-            /
-            (_d(consumer.consumer_norms.device_water_consumption_hot_and_cold_q0tot_hr))
-        )
-        nPhr_c = (
-            (3600 * seconds_consumption.NPs_c[ind] * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0))
-            /
-            (_d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0_hr))
-        )
-        nPhr_h = (
-            (3600 * seconds_consumption.NPs_h[ind] * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0))
-            /
-            (_d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0_hr))
-        )        
-
-        NPhr_cs.append(nPhr_c)
-        NPhr_hs.append(nPhr_h)
-        NPhr_tots.append(nPhr_tot)
-
-        NPhr_tot_0 += nPhr_tot * _d(consumer.consumer_norms.device_water_consumption_hot_and_cold_q0tot_hr)
-        NPhr_hot_0 += nPhr_h * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)
-        NPhr_cold_0 += nPhr_c * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0_hr)
-
-    NPhr_tot_sum = _d(sum(NPhr_tots))
-    NPhr_h_sum = _d(sum(NPhr_hs))
-    NPhr_c_sum = _d(sum(NPhr_cs))
-    
-    alpha_hr_tot = aproximate_alpha(NPhr_tot_sum)
-    alpha_hr_h = aproximate_alpha(NPhr_h_sum)
-    alpha_hr_c = aproximate_alpha(NPhr_c_sum)
+    # alphas (tot, h, c) replace the table values, e.g. edited in the preview
+    if terms is None:
+        terms = variant_terms(consumers_params)
+
+    NPhr_tot_sum = terms.sum("nPhr_tot")
+    NPhr_h_sum = terms.sum("nPhr_h")
+    NPhr_c_sum = terms.sum("nPhr_c")
+
+    NPhr_tot_0 = terms.weighted_sum("nPhr_tot", "q0tot_hr")
+    NPhr_hot_0 = terms.weighted_sum("nPhr_h", "q0_hr")
+    NPhr_cold_0 = terms.weighted_sum("nPhr_c", "q0_hr")
+
+    N_tot, N_h = terms.num_of_devices()
+
+    if alphas is None:
+        alpha_hr_tot = aproximate_alpha(NPhr_tot_sum, N_tot)
+        alpha_hr_h = aproximate_alpha(NPhr_h_sum, N_h)
+        alpha_hr_c = aproximate_alpha(NPhr_c_sum, N_tot - N_h)
+    else:
+        alpha_hr_tot, alpha_hr_h, alpha_hr_c = alphas
 
     q0hr_tot = NPhr_tot_0 / NPhr_tot_sum
     q0hr_c = NPhr_cold_0 / NPhr_c_sum
     q0hr_h = NPhr_hot_0 / NPhr_h_sum
 
-    qhr_tot = _d(0.005) * NPhr_tot_sum * alpha_hr_tot
-    qhr_c = _d(0.005) * NPhr_c_sum * alpha_hr_c
-    qhr_h = _d(0.005) * NPhr_h_sum * alpha_hr_h
+    qhr_tot = K_0_005 * NPhr_tot_sum * alpha_hr_tot
+    qhr_c = K_0_005 * NPhr_c_sum * alpha_hr_c
+    qhr_h = K_0_005 * NPhr_h_sum * alpha_hr_h
 
-    return MultipleObjectsTotalHoursConsumptionDataReport(
+    report = MultipleObjectsTotalHoursConsumptionDataReport(
         consumer_params=consumers_params,
-        NPhrs_tot=NPhr_tots,
-        NPhrs_c=NPhr_cs,
-        NPhrs_h=NPhr_hs,
+        NPhrs_tot=terms.column("nPhr_tot"),
+        NPhrs_c=terms.column("nPhr_c"),
+        NPhrs_h=terms.column("nPhr_h"),
         NPhrs_tot_sum=NPhr_tot_sum,
         NPhrs_c_sum=NPhr_c_sum,
         NPhrs_h_sum=NPhr_h_sum,
@@ -453,81 +885,81 @@ def calculate_multiple_objects_hour_consumption(
         q0hr_c=q0hr_c,
         q0hr_h=q0hr_h,
     )
+    if current_trace() is not None:
+        _trace_objects_hours(consumers_params, seconds_consumption, report)
+    return report
 
-def calculate_multiple_objects_seconds_consumption(consumers_params: list[WaterConsumerParams]):
-    NP_tots: list[Decimal] = []
-    NP_hs: list[Decimal] = []
-    NP_cs: list[Decimal] = []
 
-    NP_tot_0 = 0
-    NP_hot_0 = 0
-    NP_cold_0 = 0
-    
-    for consumer in consumers_params:
-        nP_tot = (
-            (_d(consumer.consumer_norms.max_hot_and_cold_water_norms_per_hour) * _d(consumer.num_of_measurers))
-            / 
-            (_d(consumer.consumer_norms.device_water_consumption_hot_and_cold_q0tot) * _d(consumer.num_of_devices) * 3600)
-        )
-        nP_h = (
-            (_d(consumer.consumer_norms.max_hot_water_norms_per_hour) * _d(consumer.num_of_measurers))
-            / 
-            (_d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0) * _d(consumer.num_of_devices_hot) * 3600)
-        )
-        nP_c = (
-            ((_d(consumer.consumer_norms.max_hot_and_cold_water_norms_per_hour) - _d(consumer.consumer_norms.max_hot_water_norms_per_hour)) * _d(consumer.num_of_measurers))
-            / 
-            (_d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0) * (_d(consumer.num_of_devices) - _d(consumer.num_of_devices_hot)) * 3600)
-        )
+@_calculation
+def calculate_multiple_objects_seconds_consumption(
+    consumers_params: list[WaterConsumerParams],
+    terms: VariantTerms | None = None,
+    alphas: tuple[Decimal, Decimal, Decimal] | None = None,
+):
+    # alphas (tot, h, c) replace the table values, e.g. edited in the preview
+    if terms is None:
+        terms = variant_terms(consumers_params)
 
-        NP_cs.append(nP_c)
-        NP_hs.append(nP_h)
-        NP_tots.append(nP_tot)
+    NP_tot_sum = terms.sum("nP_tot")
+    NP_h_sum = terms.sum("nP_h")
+    NP_c_sum = terms.sum("nP_c")
 
-        NP_tot_0 += nP_tot * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0)
-        NP_hot_0 += nP_h * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0)
-        NP_cold_0 += nP_c * _d(consumer.consumer_norms.device_water_consumption_hot_or_cold_q0)
-    
-    NP_tot_sum = _d(sum(NP_tots))
-    NP_h_sum = _d(sum(NP_hs))
-    NP_c_sum = _d(sum(NP_cs))
-    
-    alpha_tot = aproximate_alpha(NP_tot_sum)
-    alpha_h = aproximate_alpha(NP_h_sum)
-    alpha_c = aproximate_alpha(NP_c_sum)
+    NP_tot_0 = terms.weighted_sum("nP_tot", "q0")
+    NP_hot_0 = terms.weighted_sum("nP_h", "q0")
+    NP_cold_0 = terms.weighted_sum("nP_c", "q0")
+
+    N_tot, N_h = terms.num_of_devices()
+
+    if alphas is None:
+        alpha_tot = aproximate_alpha(NP_tot_sum, N_tot)
+        alpha_h = aproximate_alpha(NP_h_sum, N_h)
+        alpha_c = aproximate_alpha(NP_c_sum, N_tot - N_h)
+    else:
+        alpha_tot, alpha_h, alpha_c = alphas
 
     q0_tot = NP_tot_0 / NP_tot_sum
     q0_c = NP_cold_0 / NP_c_sum
     q0_h = NP_hot_0 / NP_h_sum
 
-    q_tot = _d(5) * q0_tot * alpha_tot
-    q_h = _d(5) * q0_h * alpha_h
-    q_c = _d(5) * q0_c * alpha_c
-    
-    return MultipleObjectsSecondsConsumptionDataReport(
+    q_tot = K_5 * q0_tot * alpha_tot
+    q_h = K_5 * q0_h * alpha_h
+    q_c = K_5 * q0_c * alpha_c
+
+    report = MultipleObjectsSecondsConsumptionDataReport(
         consumer_params=consumers_params,
-        NPs_tot= NP_tots,
-        NPs_c= NP_cs,
-        NPs_h= NP_hs,
+        NPs_tot=terms.column("nP_tot"),
+        NPs_c=terms.column("nP_c"),
+        NPs_h=terms.column("nP_h"),
         NPs_tot_sum=NP_tot_sum,
-        NPs_c_sum=NP_h_sum,
-        NPs_h_sum=NP_c_sum,
+        NPs_c_sum=NP_c_sum,
+        NPs_h_sum=NP_h_sum,
         alpha_tot=alpha_tot,
         alpha_h=alpha_h,
         alpha_c=alpha_c,
         q_tot=q_tot,
         q_h=q_h,
         q_c=q_c,
-        q0_tot=q_tot,
-        q0_h=q_h,
-        q0_c=q_c,
+        q0_tot=q0_tot,
+        q0_h=q0_h,
+        q0_c=q0_c,
     )
+    if current_trace() is not None:
+        _trace_objects_seconds(consumers_params, report)
+    return report
+
 
 
-def calculate_consumption_for_multiple_objects(consumers_params: list[WaterConsumerParams]) -> MultipleObjectsDataReport:
-    seconds_report = calculate_multiple_objects_seconds_consumption(consumers_params)
-    hours_report = calculate_multiple_objects_hour_consumption(seconds_report, consumers_params)
-    day_report = calculate_multiple_objects_day_consumption(consumers_params)
+@_calculation
+def calculate_multiple_objects_report(
+    consumers_params: list[WaterConsumerParams],
+    terms: VariantTerms | None = None,
+) -> MultipleObjectsDataReport:
+    if terms is None:
+        terms = variant_terms(consumers_params)
+
+    seconds_report = calculate_multiple_objects_seconds_consumption(consumers_params, terms)
+    hours_report = calculate_multiple_objects_hour_consumption(seconds_report, consumers_params, terms)
+    day_report = calculate_multiple_objects_day_consumption(consumers_params, terms)
     heat_report = calculate_multiple_objects_heat_consumption(consumers_params, hours_report, day_report)
 
     return MultipleObjectsDataReport(
@@ -539,10 +971,61 @@ def calculate_consumption_for_multiple_objects(consumers_params: list[WaterConsu
     )
 
 
+def calculate_consumption_for_multiple_objects(
+    consumers_params: list[WaterConsumerParams],
+    engine: CalculationEngine = CalculationEngine.DECIMAL,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+    trace: bool = False,
+) -> MultipleObjectsDataReport:
+    if engine == CalculationEngine.FIXED_POINT and not trace:
+        # scaled ints do not depend on the precision policy
+        from fixed_point import calculate_consumption_for_multiple_objects_fixed
+        return calculate_consumption_for_multiple_objects_fixed(consumers_params)
+
+    with precision_context(precision):
+        if not trace:
+            return _calculate_consumption_for_multiple_objects(consumers_params, engine)
+        return traced(lambda: _calculate_consumption_for_multiple_objects(consumers_params, engine), engine)
+
+
+def _calculate_consumption_for_multiple_objects(
+    consumers_params: list[WaterConsumerParams],
+    engine: CalculationEngine,
+) -> MultipleObjectsDataReport:
+    if engine == CalculationEngine.NUMPY:
+        from vectorized import calculate_consumption_for_multiple_objects_vectorized
+        return calculate_consumption_for_multiple_objects_vectorized(consumers_params)
+
+    return calculate_multiple_objects_report(consumers_params)
+
+
 ### One object calculations ###
 
 
-def calculate_consumption_for_one_object(consumer_params: WaterConsumerParams) -> OneObjectDataReport:
+def calculate_consumption_for_one_object(
+    consumer_params: WaterConsumerParams,
+    engine: CalculationEngine = CalculationEngine.DECIMAL,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+    trace: bool = False,
+) -> OneObjectDataReport:
+    if engine == CalculationEngine.FIXED_POINT and not trace:
+        # scaled ints do not depend on the precision policy
+        from fixed_point import calculate_consumption_for_one_object_fixed
+        return calculate_consumption_for_one_object_fixed(consumer_params)
+
+    with precision_context(precision):
+        if not trace:
+            return _calculate_consumption_for_one_object(consumer_params, engine)
+        return traced(lambda: _calculate_consumption_for_one_object(consumer_params, engine), engine)
+
+
+def _calculate_consumption_for_one_object(
+    consumer_params: WaterConsumerParams,
+    engine: CalculationEngine,
+) -> OneObjectDataReport:
+    if engine == CalculationEngine.NUMPY:
+        raise ValueError("NumPy engine is available only for multiple objects")
+
     seconds_consumption = calculate_max_per_sec_consumption(
         consumer_params.consumer_norms,
         consumer_params.num_of_measurers,
@@ -550,7 +1033,12 @@ def calculate_consumption_for_one_object(consumer_params: WaterConsumerParams) -
         consumer_params.num_of_devices_hot,
     )
 
-    max_hour_consumption = calculate_max_hour_consumption(consumer_params.consumer_norms, seconds_consumption)
+    max_hour_consumption = calculate_max_hour_consumption(
+        consumer_params.consumer_norms,
+        seconds_consumption,
+        consumer_params.num_of_devices,
+        consumer_params.num_of_devices_hot,
+    )
     avg_hour_consumption = calculate_avg_hour_consumption(consumer_params, consumer_params.consumer_norms, consumer_params.num_of_measurers)
     heat_consumption = calculate_heat_consumption(consumer_params, avg_hour_consumption, max_hour_consumption)
     total_day_consumption = calculate_total_day_consumption(consumer_params, consumer_params.num_of_measurers)
@@ -576,6 +1064,7 @@ def calculate_consumption_for_one_object(consumer_params: WaterConsumerParams) -
     )
 
 
+@_calculation
 def calculate_total_object_consumption(
     grass_watering: GrassWateringReportData,
     total_day_consumption: TotalDayConsumptionReportData,
@@ -608,6 +1097,7 @@ def calculate_total_object_consumption(
     )
 
 
+@_calculation
 def calculate_grass_watering(num_of_measurers: int) -> GrassWateringReportData:
     # TODO: WateringConsumption param definition
     # NOTE: do not do this for now
@@ -617,39 +1107,29 @@ def calculate_grass_watering(num_of_measurers: int) -> GrassWateringReportData:
     return GrassWateringReportData(Quc=Quc)
 
 
+def _working_shifts(consumer_params: WaterConsumerParams) -> Decimal:
+    if consumer_params.consumer_norms.T == 24:
+        return _d(1)
+    return _d(consumer_params.work_hours) / norms_kernel(consumer_params.consumer_norms).T
+
+
+@_calculation
 def calculate_total_day_consumption(
     consumer_params: WaterConsumerParams,
     num_of_measurers: int) -> TotalDayConsumptionReportData:
 
-    if consumer_params.consumer_norms.T == 24:
-        working_shifts = _d(1)
-    else:
-        working_shifts = _d(consumer_params.work_hours) / _d(consumer_params.consumer_norms.T)
+    k = norms_kernel(consumer_params.consumer_norms)
+    working_shifts = _working_shifts(consumer_params)
 
-    Q_total = (
-        _d(consumer_params.consumer_norms.avg_hot_and_cold_water_norms_per_day)
-        * num_of_measurers
-        * working_shifts
-        / _d(1000)
-    )
-    Q_hot = (
-        (
-            _d(consumer_params.consumer_norms.avg_hot_water_norms_per_day)
-        )
-        * num_of_measurers
-        * working_shifts
-        / _d(1000)
-    )
-    Q_cold = (
-        (
-            _d(consumer_params.consumer_norms.avg_hot_and_cold_water_norms_per_day) 
-            - _d(consumer_params.consumer_norms.avg_hot_water_norms_per_day)
-        )
-        * num_of_measurers
-        * working_shifts
-        / _d(1000)
-    )
+    Q_total = k.avg_day_tot * num_of_measurers * working_shifts / K_1000
+    Q_hot = k.avg_day_h * num_of_measurers * working_shifts / K_1000
+    Q_cold = k.avg_day_c * num_of_measurers * working_shifts / K_1000
 
+    if current_trace() is not None:
+        Q_expr = "Q_u^{<s>} = <0> \\cdot <1> \\cdot <2> / 1000"
+        _trace("Q_total", Q_expr.replace("<s>", "tot"), (k.avg_day_tot, num_of_measurers, working_shifts), Q_total)
+        _trace("Q_hot", Q_expr.replace("<s>", "h"), (k.avg_day_h, num_of_measurers, working_shifts), Q_hot)
+        _trace("Q_cold", Q_expr.replace("<s>", "c"), (k.avg_day_c, num_of_measurers, working_shifts), Q_cold)
 
     return TotalDayConsumptionReportData(
         Q_total=Q_total,
@@ -658,6 +1138,7 @@ def calculate_total_day_consumption(
     )
 
 
+@_calculation
 def calculate_heat_consumption(
     consumer_params: WaterConsumerParams,
     avg_hour_consumption: AvgHourConsumptionReportData,
@@ -666,54 +1147,50 @@ def calculate_heat_consumption(
     temp_diff = _d(consumer_params.temp_hot) - _d(consumer_params.temp_cold)
 
     Qht = (
-        _d(1.16) 
+        K_1_16
         * avg_hour_consumption.q_hot 
         * temp_diff
-        + max_hour_consumption.q_hot * _d(0.3)
+        + max_hour_consumption.q_hot * K_0_3
     )
     Qhrt = (
-        _d(1.16) 
+        K_1_16
         * max_hour_consumption.q_hot 
         * temp_diff
-        + max_hour_consumption.q_hot * _d(0.3)
+        + max_hour_consumption.q_hot * K_0_3
     )
 
+    if current_trace() is not None:
+        losses = max_hour_consumption.q_hot * K_0_3
+        temps = (consumer_params.temp_hot, consumer_params.temp_cold, losses)
+        _trace("Q_avg_hour", HEAT_AVG_EXPRESSION, (avg_hour_consumption.q_hot, *temps), Qht)
+        _trace("Q_max_hour", HEAT_MAX_EXPRESSION, (max_hour_consumption.q_hot, *temps), Qhrt)
+
     return HeatConsumptionReportData(
         Q_avg_hour=Qht,
         Q_max_hour=Qhrt,
     ) 
 
 
+@_calculation
 def calculate_avg_hour_consumption(
     consumer_params: WaterConsumerParams,
     consumer: WaterConsumerNorms,
     num_of_measurers: int,
 ) -> AvgHourConsumptionReportData:
-    if consumer_params.consumer_norms.T == 24:
-        working_shifts = _d(1)
-    else:
-        working_shifts = _d(consumer_params.work_hours) / _d(consumer_params.consumer_norms.T)
+    k = norms_kernel(consumer)
+    working_shifts = _working_shifts(consumer_params)
 
     # TODO: ask and check
     
-    qT_tot = (
-        _d(consumer.avg_hot_and_cold_water_norms_per_day)
-        * num_of_measurers
-        / (1000 * _d(consumer.T) * working_shifts)
-    )
-    qT_h = (
-        _d(consumer.avg_hot_water_norms_per_day)
-        * num_of_measurers
-        / (1000 * _d(consumer.T) * working_shifts)
-    )
-    qT_c = (
-        (
-            _d(consumer.avg_hot_and_cold_water_norms_per_day) 
-            - _d(consumer.avg_hot_water_norms_per_day)
-        )
-        * num_of_measurers
-        / (1000 * _d(consumer.T) * working_shifts)
-    )
+    qT_tot = k.avg_day_tot * num_of_measurers / (k.T_x1000 * working_shifts)
+    qT_h = k.avg_day_h * num_of_measurers / (k.T_x1000 * working_shifts)
+    qT_c = k.avg_day_c * num_of_measurers / (k.T_x1000 * working_shifts)
+
+    if current_trace() is not None:
+        qT_expr = "q_{T}^{<s>} = \\frac{<0> \\cdot <1>}{1000 \\cdot <2> \\cdot <3>}"
+        _trace("qT_total", qT_expr.replace("<s>", "tot"), (k.avg_day_tot, num_of_measurers, k.T, working_shifts), qT_tot)
+        _trace("qT_hot", qT_expr.replace("<s>", "h"), (k.avg_day_h, num_of_measurers, k.T, working_shifts), qT_h)
+        _trace("qT_cold", qT_expr.replace("<s>", "c"), (k.avg_day_c, num_of_measurers, k.T, working_shifts), qT_c)
 
     return AvgHourConsumptionReportData(
         q_total=qT_tot,
@@ -722,52 +1199,47 @@ def calculate_avg_hour_consumption(
     )
 
 
+@_calculation
 def calculate_max_hour_consumption(
     consumer: WaterConsumerNorms,
     second_consumption: SecondConsumptionReportData,
+    num_of_devices: int,
+    num_of_devices_with_hot_water: int,
+    alphas: tuple[Decimal, Decimal, Decimal] | None = None,
 ) -> MaxHourConsumptionReportData:
+    # alphas (total, hot, cold) replace the table values, e.g. edited in the preview
+    k = norms_kernel(consumer)
 
-    Phr_tot = (
-        (
-            3600
-            * second_consumption.P_total
-            * _d(consumer.device_water_consumption_hot_and_cold_q0tot)
-        )
-        /
-        (
-            _d(consumer.device_water_consumption_hot_and_cold_q0tot_hr)
-        )
-    )
-    Phr_c = (
-        (
-            3600
-            * second_consumption.P_cold
-            * _d(consumer.device_water_consumption_hot_or_cold_q0)
-        )
-        /
-        (
-            _d(consumer.device_water_consumption_hot_or_cold_q0_hr)
-        )
-    )
-    Phr_h = (
-        (
-            3600
-            * second_consumption.P_hot
-            * _d(consumer.device_water_consumption_hot_or_cold_q0)
-        )
-        /
-        (
-            _d(consumer.device_water_consumption_hot_or_cold_q0_hr)
-        )
-    )
+    Phr_tot = (3600 * second_consumption.P_total * k.q0tot) / k.q0tot_hr
+    Phr_c = (3600 * second_consumption.P_cold * k.q0) / k.q0_hr
+    Phr_h = (3600 * second_consumption.P_hot * k.q0) / k.q0_hr
 
-    alpha_hr_tot = aproximate_alpha(Phr_tot)
-    alpha_hr_h = aproximate_alpha(Phr_h)
-    alpha_hr_c = aproximate_alpha(Phr_c)
+    N_c = num_of_devices - num_of_devices_with_hot_water
 
-    qhr_tot = _d(0.005) * _d(consumer.device_water_consumption_hot_and_cold_q0tot_hr) * alpha_hr_tot
-    qhr_c = _d(0.005) * _d(consumer.device_water_consumption_hot_or_cold_q0_hr) * alpha_hr_c
-    qhr_h = _d(0.005) * _d(consumer.device_water_consumption_hot_or_cold_q0_hr) * alpha_hr_h
+    if alphas is None:
+        alpha_hr_tot = aproximate_alpha(Phr_tot * num_of_devices, num_of_devices)
+        alpha_hr_h = aproximate_alpha(Phr_h * num_of_devices_with_hot_water, num_of_devices_with_hot_water)
+        alpha_hr_c = aproximate_alpha(Phr_c * N_c, N_c)
+    else:
+        alpha_hr_tot, alpha_hr_h, alpha_hr_c = alphas
+
+    qhr_tot = k.q0tot_hr_x0005 * alpha_hr_tot
+    qhr_c = k.q0_hr_x0005 * alpha_hr_c
+    qhr_h = k.q0_hr_x0005 * alpha_hr_h
+
+    if current_trace() is not None:
+        P_expr = "P_{hr}^{<s>} = \\frac{3600 \\cdot <0> \\cdot <1>}{<2>}"
+        _trace("Phr_total", P_expr.replace("<s>", "tot"), (second_consumption.P_total, k.q0tot, k.q0tot_hr), Phr_tot)
+        _trace("Phr_hot", P_expr.replace("<s>", "h"), (second_consumption.P_hot, k.q0, k.q0_hr), Phr_h)
+        _trace("Phr_cold", P_expr.replace("<s>", "c"), (second_consumption.P_cold, k.q0, k.q0_hr), Phr_c)
+        alpha_expr = "NP_{hr}^{<s>} = <0> \\cdot <1> \\rightarrow \\alpha_{hr}"
+        _trace("alpha_hr_total", alpha_expr.replace("<s>", "tot"), (Phr_tot, num_of_devices), alpha_hr_tot)
+        _trace("alpha_hr_hot", alpha_expr.replace("<s>", "h"), (Phr_h, num_of_devices_with_hot_water), alpha_hr_h)
+        _trace("alpha_hr_cold", alpha_expr.replace("<s>", "c"), (Phr_c, N_c), alpha_hr_c)
+        q_expr = "q_{hr}^{<s>} = 0,005 \\cdot <0> \\cdot <1>"
+        _trace("qhr_total", q_expr.replace("<s>", "tot"), (k.q0tot_hr, alpha_hr_tot), qhr_tot)
+        _trace("qhr_hot", q_expr.replace("<s>", "h"), (k.q0_hr, alpha_hr_h), qhr_h)
+        _trace("qhr_cold", q_expr.replace("<s>", "c"), (k.q0_hr, alpha_hr_c), qhr_c)
 
     return MaxHourConsumptionReportData(
         alpha_total=alpha_hr_tot, alpha_cold=alpha_hr_c, alpha_hot=alpha_hr_h,
@@ -776,59 +1248,47 @@ def calculate_max_hour_consumption(
     )
 
 
+@_calculation
 def calculate_max_per_sec_consumption(
     consumer: WaterConsumerNorms,
     num_of_measurers: int,
     num_of_devices: int,
-    num_of_devices_with_hot_water: int) -> SecondConsumptionReportData:
-
-    P_tot = (
-        (
-            _d(consumer.max_hot_and_cold_water_norms_per_hour) 
-            * _d(num_of_measurers)
-        )
-        / 
-        (
-            _d(consumer.device_water_consumption_hot_and_cold_q0tot)
-            * _d(num_of_devices)
-            * 3600
-        )
-    )
-    P_h = (
-        (
-            _d(consumer.max_hot_water_norms_per_hour) 
-            * _d(num_of_measurers)
-        )
-        / 
-        (
-            _d(consumer.device_water_consumption_hot_or_cold_q0)
-            * _d(num_of_devices_with_hot_water)
-            * 3600
-        )
-    )
-    P_c = (
-        (
-            (
-            _d(consumer.max_hot_and_cold_water_norms_per_hour)
-            - _d(consumer.max_hot_water_norms_per_hour)
-            )
-            * _d(num_of_measurers)
-        )
-        / 
-        (
-            _d(consumer.device_water_consumption_hot_or_cold_q0)
-            * (_d(num_of_devices) - _d(num_of_devices_with_hot_water))
-            * 3600
-        )
-    )
-
-    alpha_tot = aproximate_alpha(P_tot)
-    alpha_h = aproximate_alpha(P_h)
-    alpha_c = aproximate_alpha(P_c)
-
-    q_tot = _d(5) * _d(consumer.device_water_consumption_hot_and_cold_q0tot) * alpha_tot
-    q_h = _d(5) * _d(consumer.device_water_consumption_hot_or_cold_q0) * alpha_h
-    q_c = _d(5) * _d(consumer.device_water_consumption_hot_or_cold_q0) * alpha_c
+    num_of_devices_with_hot_water: int,
+    alphas: tuple[Decimal, Decimal, Decimal] | None = None) -> SecondConsumptionReportData:
+    # alphas (total, hot, cold) replace the table values, e.g. edited in the preview
+    k = norms_kernel(consumer)
+    U = _d(num_of_measurers)
+
+    P_tot = (k.max_hour_tot * U) / (k.q0tot * _d(num_of_devices) * 3600)
+    P_h = (k.max_hour_h * U) / (k.q0 * _d(num_of_devices_with_hot_water) * 3600)
+    P_c = (k.max_hour_c * U) / (k.q0 * (_d(num_of_devices) - _d(num_of_devices_with_hot_water)) * 3600)
+
+    N_c = num_of_devices - num_of_devices_with_hot_water
+
+    if alphas is None:
+        alpha_tot = aproximate_alpha(P_tot * num_of_devices, num_of_devices)
+        alpha_h = aproximate_alpha(P_h * num_of_devices_with_hot_water, num_of_devices_with_hot_water)
+        alpha_c = aproximate_alpha(P_c * N_c, N_c)
+    else:
+        alpha_tot, alpha_h, alpha_c = alphas
+
+    q_tot = k.q0tot_x5 * alpha_tot
+    q_h = k.q0_x5 * alpha_h
+    q_c = k.q0_x5 * alpha_c
+
+    if current_trace() is not None:
+        P_expr = "P^{<s>} = <0> \\cdot <1> / (<2> \\cdot <3> \\cdot 3600)"
+        _trace("P_total", P_expr.replace("<s>", "tot"), (k.max_hour_tot, num_of_measurers, k.q0tot, num_of_devices), P_tot)
+        _trace("P_hot", P_expr.replace("<s>", "h"), (k.max_hour_h, num_of_measurers, k.q0, num_of_devices_with_hot_water), P_h)
+        _trace("P_cold", P_expr.replace("<s>", "c"), (k.max_hour_c, num_of_measurers, k.q0, N_c), P_c)
+        alpha_expr = "NP^{<s>} = <0> \\cdot <1> \\rightarrow \\alpha"
+        _trace("alpha_total", alpha_expr.replace("<s>", "tot"), (P_tot, num_of_devices), alpha_tot)
+        _trace("alpha_hot", alpha_expr.replace("<s>", "h"), (P_h, num_of_devices_with_hot_water), alpha_h)
+        _trace("alpha_cold", alpha_expr.replace("<s>", "c"), (P_c, N_c), alpha_c)
+        q_expr = "q^{<s>} = 5 \\cdot <0> \\cdot <1>"
+        _trace("q_total", q_expr.replace("<s>", "tot"), (k.q0tot, alpha_tot), q_tot)
+        _trace("q_hot", q_expr.replace("<s>", "h"), (k.q0, alpha_h), q_h)
+        _trace("q_cold", q_expr.replace("<s>", "c"), (k.q0, alpha_c), q_c)
 
     return SecondConsumptionReportData(
         alpha_total=alpha_tot, alpha_cold=alpha_c, alpha_hot=alpha_h,
@@ -0,0 +1,187 @@
+"""
+
+Кэширование расчетов
+
+Bounded LRU caches keyed by a stable fingerprint of WaterConsumerNorms and
+WaterConsumerParams. Placement ids are not part of the fingerprint, so two
+consumers with the same norms and parameters share one entry, and editing a
+consumer in a variant only recomputes its group (see group_consumers).
+
+"""
+
+import copy
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Generic, Hashable, TypeVar
+
+from mathematics import (
+    DEFAULT_PRECISION,
+    CalculationEngine,
+    ConsumerGroup,
+    ConsumerTerms,
+    MultipleObjectsDataReport,
+    OneObjectDataReport,
+    PrecisionPolicy,
+    VariantTerms,
+    WaterConsumerNorms,
+    WaterConsumerParams,
+    calculate_consumption_for_multiple_objects,
+    calculate_consumption_for_one_object,
+    calculate_multiple_objects_report,
+    group_consumers,
+    precision_context,
+    record,
+    traced,
+)
+
+
+T = TypeVar("T")
+
+
+@record
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class LRUCache(Generic[T]):
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, T] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._data),
+            maxsize=self.maxsize,
+        )
+
+
+def norms_fingerprint(norms: WaterConsumerNorms) -> tuple:
+    return (
+        norms.name,
+        norms.measurer.value,
+        norms.avg_hot_and_cold_water_norms_per_day,
+        norms.avg_hot_water_norms_per_day,
+        norms.max_hot_and_cold_water_norms_per_hour,
+        norms.max_hot_water_norms_per_hour,
+        norms.device_water_consumption_hot_and_cold_q0tot,
+        norms.device_water_consumption_hot_and_cold_q0tot_hr,
+        norms.device_water_consumption_hot_or_cold_q0,
+        norms.device_water_consumption_hot_or_cold_q0_hr,
+        norms.T,
+    )
+
+
+def params_fingerprint(params: WaterConsumerParams) -> tuple:
+    return (
+        norms_fingerprint(params.consumer_norms),
+        params.num_of_devices,
+        params.num_of_devices_hot,
+        params.num_of_measurers,
+        params.temp_hot,
+        params.temp_cold,
+        params.work_hours,
+    )
+
+
+def group_fingerprint(group: ConsumerGroup) -> tuple:
+    # params of the first member with U of the whole group
+    key = params_fingerprint(group.params)
+    return (*key[:3], group.num_of_measurers, *key[4:])
+
+
+ONE_OBJECT_CACHE: LRUCache[OneObjectDataReport] = LRUCache(maxsize=1024)
+CONSUMER_TERMS_CACHE: LRUCache[ConsumerTerms] = LRUCache(maxsize=16384)
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    return {
+        "one_object": ONE_OBJECT_CACHE.stats(),
+        "consumer_terms": CONSUMER_TERMS_CACHE.stats(),
+    }
+
+
+def clear_caches():
+    ONE_OBJECT_CACHE.clear()
+    CONSUMER_TERMS_CACHE.clear()
+
+
+def calculate_consumption_for_one_object_cached(
+    consumer_params: WaterConsumerParams,
+    engine: CalculationEngine = CalculationEngine.DECIMAL,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+    trace: bool = False,
+) -> OneObjectDataReport:
+    """The fingerprint covers every field of the norms and params, so the
+    report of an equal consumer is the report of this one.
+    """
+    key = (params_fingerprint(consumer_params), engine, precision.prec, precision.rounding, trace)
+    report = ONE_OBJECT_CACHE.get_or_compute(
+        key,
+        lambda: calculate_consumption_for_one_object(consumer_params, engine, precision, trace),
+    )
+    # reports are mutable and edited in place by the GUI (alpha overrides, trace)
+    return copy.deepcopy(report, {
+        id(report.consumer): consumer_params.consumer_norms,
+        id(report.consumer_params): consumer_params,
+    })
+
+
+def calculate_consumption_for_multiple_objects_cached(
+    consumers_params: list[WaterConsumerParams],
+    engine: CalculationEngine = CalculationEngine.DECIMAL,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+    trace: bool = False,
+) -> MultipleObjectsDataReport:
+    # group intermediates exist only in the Decimal engine
+    if engine != CalculationEngine.DECIMAL:
+        return calculate_consumption_for_multiple_objects(consumers_params, engine, precision, trace)
+
+    with precision_context(precision):
+        groups, index = group_consumers(consumers_params)
+        group_terms = [
+            CONSUMER_TERMS_CACHE.get_or_compute(
+                (group_fingerprint(g), precision.prec, precision.rounding),
+                g.terms,
+            )
+            for g in groups
+        ]
+        terms = VariantTerms(consumers_params, groups, index, group_terms)
+        # per-consumer formulas are traced by the stages, so cached terms are enough
+        if trace:
+            return traced(lambda: calculate_multiple_objects_report(consumers_params, terms))
+        return calculate_multiple_objects_report(consumers_params, terms)
@@ -0,0 +1,295 @@
+"""
+
+Показания счетчиков и калибровка норм
+
+Meter readings are CSV rows
+
+    building,timestamp,volume
+
+with an integer building id, an ISO timestamp (YYYY-MM-DD HH:MM[:SS] or
+with a T, seconds may be present in some rows only) and the volume used
+since the previous reading, m3 unless volume_scale says otherwise; a
+negative volume is a correction and is subtracted. The file is
+memory-mapped and parsed in chunks that end on a line break; each chunk is
+parsed as one NumPy byte array (no per-row Python code) and reduced to
+volumes per building and hour, so memory grows with the number of building
+hours, not of rows.
+
+Per building the hourly volumes give the peak hour and the daily volumes
+give the mean and peak day. calibrate() compares them with
+calculate_total_day_consumption and calculate_max_hour_consumption of the
+building params and solves, for all buildings at once, the effective
+number of measurers (equivalently the norm scaling factor) that reproduces
+the measured mean day and peak hour.
+
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from mathematics import (
+    WaterConsumerParams,
+    calculate_max_hour_consumption,
+    calculate_max_per_sec_consumption,
+    calculate_total_day_consumption,
+    record,
+)
+from sweep import one_object_arrays
+
+
+DEFAULT_CHUNK_BYTES = 64 << 20
+
+# separators of the timestamp are read as field separators; a minus that
+# follows a digit separates the date, any other one is the sign of a number
+_SEPARATORS = np.arange(256, dtype=np.uint8)
+_SEPARATORS[list(b",:T\t\r")] = ord(" ")
+
+_SPACE = 32
+_DOT = 46
+_MINUS = 45
+_NEWLINE = 10
+
+# fields of a row with a HH:MM and with a HH:MM:SS timestamp
+_ROW_WIDTHS = (7, 8)
+
+# hours since the epoch fit into the low bits of the building-hour key
+_HOUR_BITS = 24
+
+_MAX_DOUBLINGS = 60
+_BISECTIONS = 50
+
+
+@record
+class MeterStats:
+    building: int
+    # days with readings
+    days: int
+    # m3/day
+    Q_day_mean: float
+    Q_day_max: float
+    # m3/h
+    q_hour_max: float
+
+
+@record
+class Calibration:
+    building: int
+    Q_day_measured: float
+    Q_day_calculated: float
+    qhr_measured: float
+    qhr_calculated: float
+    # measured / calculated; scaling factor of the day and the max hour norms
+    day_factor: float
+    hour_factor: float
+    # num_of_measurers that reproduce the measured mean day and peak hour
+    num_of_measurers_day: float
+    num_of_measurers_hour: float
+
+
+def _tokens(raw: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Values and start offsets of the numbers of a translated chunk."""
+    at = np.flatnonzero(raw > _SPACE)
+    if len(at) == 0:
+        return np.empty(0), np.empty(0, dtype=np.intp)
+    b = raw[at]
+
+    start = np.empty(len(at), dtype=bool)
+    start[0] = True
+    np.not_equal(at[1:], at[:-1] + 1, out=start[1:])
+    token = np.cumsum(start) - 1
+
+    starts = np.flatnonzero(start)
+    ends = np.append(starts[1:], len(at))
+
+    is_dot = b == _DOT
+    dots = np.flatnonzero(is_dot)
+    dot_at = ends.copy()
+    dot_at[token[dots]] = dots
+    has_dot = dot_at < ends
+
+    # integer mantissa of every token is exact in float64, then one division
+    pos = np.arange(len(at))
+    exponent = ends[token] - pos - 1 - ((pos < dot_at[token]) & has_dot[token])
+    digits = b.astype(np.float64) - 48
+    digits[is_dot | (b == _MINUS)] = 0
+    mantissa = np.bincount(token, weights=digits * 10.0 ** exponent, minlength=len(starts))
+    sign = np.where(b[starts] == _MINUS, -1.0, 1.0)
+
+    return sign * mantissa / 10.0 ** np.where(has_dot, ends - dot_at - 1, 0), at[starts]
+
+
+def parse_numbers(chunk: bytes) -> np.ndarray:
+    """All decimal numbers of a chunk separated by spaces and line breaks."""
+    return _tokens(np.frombuffer(chunk, dtype=np.uint8))[0]
+
+
+def _reduce(keys: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=values, minlength=len(unique))
+
+
+def _hourly_chunk(chunk: bytes) -> tuple[np.ndarray, np.ndarray]:
+    raw = np.frombuffer(chunk, dtype=np.uint8)
+    text = _SEPARATORS[raw]
+    minus = np.flatnonzero(raw[1:] == _MINUS) + 1
+    prev = raw[minus - 1]
+    text[minus[(prev >= 48) & (prev <= 57)]] = _SPACE
+
+    numbers, starts = _tokens(text)
+    # rows are the lines; each may have a HH:MM or a HH:MM:SS timestamp
+    line = np.cumsum(raw == _NEWLINE)[starts]
+    first = np.flatnonzero(np.diff(line, prepend=-1))
+    width = np.diff(first, append=len(numbers))
+    if not np.isin(width, _ROW_WIDTHS).all():
+        raise ValueError("Meter rows must be building,YYYY-MM-DD HH:MM[:SS],volume")
+
+    rows = numbers[first[:, None] + np.arange(5)].astype(np.int64)
+    Y, M, D, h = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+    months = (Y - 1970) * 12 + (M - 1)
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + (D - 1)
+
+    keys = (rows[:, 0] << _HOUR_BITS) | (days * 24 + h)
+    return _reduce(keys, numbers[first + width - 1])
+
+
+def read_meter_csv(
+    path: Path | str,
+    volume_scale: float = 1.0,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> dict[int, MeterStats]:
+    """Day and hour statistics of every building of a meter CSV with a header line."""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    size = len(data)
+
+    header_end = bytes(data[:min(size, 1 << 16)]).find(b"\n")
+    pos = size if header_end < 0 else header_end + 1
+
+    keys_parts: list[np.ndarray] = []
+    volume_parts: list[np.ndarray] = []
+
+    while pos < size:
+        stop = min(pos + chunk_bytes, size)
+        if stop < size:
+            # extend the chunk to the end of its last line
+            tail = bytes(data[stop:min(stop + (1 << 16), size)]).find(b"\n")
+            stop = size if tail < 0 else stop + tail + 1
+        chunk = bytes(data[pos:stop])
+        pos = stop
+        if not chunk.strip():
+            continue
+
+        hour_keys, volumes = _hourly_chunk(chunk)
+        keys_parts.append(hour_keys)
+        volume_parts.append(volumes)
+
+    if not keys_parts:
+        return {}
+
+    hour_keys, hour_volumes = _reduce(np.concatenate(keys_parts), np.concatenate(volume_parts))
+    hour_volumes *= volume_scale
+
+    buildings = hour_keys >> _HOUR_BITS
+    hours = hour_keys & ((1 << _HOUR_BITS) - 1)
+    day_keys, day_volumes = _reduce((buildings << _HOUR_BITS) | (hours // 24), hour_volumes)
+    day_buildings = day_keys >> _HOUR_BITS
+
+    ids, hour_owner = np.unique(buildings, return_inverse=True)
+    day_owner = np.searchsorted(ids, day_buildings)
+
+    q_hour_max = np.full(len(ids), -np.inf)
+    np.maximum.at(q_hour_max, hour_owner, hour_volumes)
+    Q_day_max = np.full(len(ids), -np.inf)
+    np.maximum.at(Q_day_max, day_owner, day_volumes)
+    days = np.bincount(day_owner, minlength=len(ids))
+    Q_day_sum = np.bincount(day_owner, weights=day_volumes, minlength=len(ids))
+
+    return {
+        int(b): MeterStats(int(b), int(n), float(s / n), float(dm), float(hm))
+        for b, n, s, dm, hm in zip(ids, days, Q_day_sum, Q_day_max, q_hour_max)
+    }
+
+
+def _qhr(params: list[WaterConsumerParams], U: np.ndarray) -> np.ndarray:
+    """Max hour total flow of every building with its num_of_measurers replaced by U."""
+    out = np.empty(len(params))
+    groups: dict = {}
+    for i, p in enumerate(params):
+        groups.setdefault(p.consumer_norms, []).append(i)
+    for norms, idx in groups.items():
+        idx = np.asarray(idx)
+        N = np.array([params[i].num_of_devices for i in idx], dtype=np.float64)
+        N_h = np.array([params[i].num_of_devices_hot for i in idx], dtype=np.float64)
+        out[idx] = one_object_arrays(norms, U[idx], N, N_h, 61, 5, 12)["qhr_total"]
+    return out
+
+
+def solve_measurers_for_peak_hour(params: list[WaterConsumerParams], targets: np.ndarray) -> np.ndarray:
+    """num_of_measurers whose max hour total flow reaches each target, NaN if none.
+
+    Bisection over all buildings at once; alpha comes from the tables, so the
+    flow is a step function of U and the smallest U reaching the target is
+    returned.
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    lo = np.zeros(len(params))
+    hi = np.array([max(p.num_of_measurers, 1) for p in params], dtype=np.float64)
+
+    for _ in range(_MAX_DOUBLINGS):
+        low = _qhr(params, hi) < targets
+        if not low.any():
+            break
+        lo = np.where(low, hi, lo)
+        hi = np.where(low, hi * 2, hi)
+    reached = _qhr(params, hi) >= targets
+
+    for _ in range(_BISECTIONS):
+        mid = (lo + hi) / 2
+        up = _qhr(params, mid) >= targets
+        hi = np.where(up, mid, hi)
+        lo = np.where(up, lo, mid)
+
+    return np.where(reached, hi, np.nan)
+
+
+def calibrate(
+    stats: dict[int, MeterStats],
+    buildings: dict[int, WaterConsumerParams],
+) -> list[Calibration]:
+    """Calibration of every building that has both meter statistics and params."""
+    ids = [b for b in buildings if b in stats]
+    params = [buildings[b] for b in ids]
+
+    Q_day: list[float] = []
+    qhr: list[float] = []
+    for p in params:
+        Q_day.append(float(calculate_total_day_consumption(p, p.num_of_measurers).Q_total))
+        seconds = calculate_max_per_sec_consumption(
+            p.consumer_norms, p.num_of_measurers, p.num_of_devices, p.num_of_devices_hot,
+        )
+        hour = calculate_max_hour_consumption(p.consumer_norms, seconds, p.num_of_devices, p.num_of_devices_hot)
+        qhr.append(float(hour.q_total))
+
+    measured_day = np.array([stats[b].Q_day_mean for b in ids])
+    measured_hour = np.array([stats[b].q_hour_max for b in ids])
+    U = np.array([p.num_of_measurers for p in params], dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        day_factor = measured_day / np.array(Q_day)
+    # max hour norms enter P only as a product with U, so scaling them is scaling U
+    U_hour = solve_measurers_for_peak_hour(params, measured_hour)
+
+    return [
+        Calibration(
+            building=b,
+            Q_day_measured=float(measured_day[i]),
+            Q_day_calculated=Q_day[i],
+            qhr_measured=float(measured_hour[i]),
+            qhr_calculated=qhr[i],
+            day_factor=float(day_factor[i]),
+            hour_factor=float(U_hour[i] / U[i]),
+            num_of_measurers_day=float(day_factor[i] * U[i]),
+            num_of_measurers_hour=float(U_hour[i]),
+        )
+        for i, b in enumerate(ids)
+    ]
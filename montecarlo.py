@@ -0,0 +1,146 @@
+"""
+
+Статистическое моделирование одновременной работы приборов
+
+Monte Carlo check of the normative peak flows. Each device of a consumer is
+in use with the probability P of the seconds calculation, independently of
+the others. The number of busy devices of a consumer is therefore
+Binomial(N, P), which is sampled directly instead of N Bernoulli draws.
+Trials are generated in chunks of at most `max_elements` samples, and flows
+are accumulated into a fixed histogram, so memory does not grow with the
+number of trials.
+
+"""
+
+import numpy as np
+
+from mathematics import (
+    WaterConsumerParams,
+    calculate_consumption_for_multiple_objects,
+    calculate_consumption_for_one_object,
+    record,
+)
+from vectorized import ConsumersArrays
+
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+@record
+class PeakFlowEstimate:
+    normative_q: float
+    mean: float
+    max: float
+    quantiles: dict[float, float]
+    # P > 1 (norms outside of the table domain) are clipped to 1
+    clipped_probabilities: int
+
+
+@record
+class MonteCarloReport:
+    trials: int
+    total: PeakFlowEstimate
+    hot: PeakFlowEstimate
+    cold: PeakFlowEstimate
+
+
+class _FlowHistogram:
+    def __init__(self, max_flow: float, resolution: float, max_bins: int):
+        self.resolution = max(resolution, max_flow / max_bins) if max_flow > 0 else resolution
+        self.counts = np.zeros(int(max_flow / self.resolution) + 2, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+        self.n = 0
+
+    def add(self, flows: np.ndarray):
+        bins = np.rint(flows / self.resolution).astype(np.int64)
+        self.counts += np.bincount(bins, minlength=len(self.counts))[:len(self.counts)]
+        self.total += float(flows.sum())
+        self.max = max(self.max, float(flows.max()))
+        self.n += len(flows)
+
+    def quantile(self, q: float) -> float:
+        cum = np.cumsum(self.counts)
+        return float(np.searchsorted(cum, q * self.n, side="left")) * self.resolution
+
+
+def _simulate(
+    rng: np.random.Generator,
+    devices: np.ndarray,
+    probabilities: np.ndarray,
+    q0: np.ndarray,
+    trials: int,
+    max_elements: int,
+    resolution: float,
+    max_bins: int,
+) -> _FlowHistogram:
+    hist = _FlowHistogram(float((devices * q0).sum()), resolution, max_bins)
+    chunk = max(1, max_elements // max(len(devices), 1))
+
+    done = 0
+    while done < trials:
+        size = min(chunk, trials - done)
+        busy = rng.binomial(devices, probabilities, size=(size, len(devices)))
+        hist.add(busy @ q0)
+        done += size
+
+    return hist
+
+
+def usage_groups(
+    consumers_params: list[WaterConsumerParams],
+) -> list[tuple[np.ndarray, np.ndarray, np.ndarray, int]]:
+    """(devices, P, q0, clipped) per consumer for the total, hot and cold flows."""
+    arr = ConsumersArrays(consumers_params)
+
+    N = arr.num_of_devices
+    N_h = arr.num_of_devices_hot
+    N_c = N - N_h
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        P_tot = arr.max_hour_tot * arr.num_of_measurers / (arr.q0tot * N * 3600)
+        P_h = arr.max_hour_h * arr.num_of_measurers / (arr.q0 * N_h * 3600)
+        P_c = (arr.max_hour_tot - arr.max_hour_h) * arr.num_of_measurers / (arr.q0 * N_c * 3600)
+
+    groups = []
+    for devices, P, q0 in ((N, P_tot, arr.q0tot), (N_h, P_h, arr.q0), (N_c, P_c, arr.q0)):
+        P = np.nan_to_num(P, nan=0.0, posinf=0.0)
+        clipped = int((P > 1).sum())
+        groups.append((devices.astype(np.int64), np.clip(P, 0.0, 1.0), q0, clipped))
+    return groups
+
+
+def normative_peak_flows(consumers_params: list[WaterConsumerParams]) -> tuple[float, float, float]:
+    if len(consumers_params) > 1:
+        r = calculate_consumption_for_multiple_objects(consumers_params).seconds_consumption
+        return float(r.q_tot), float(r.q_h), float(r.q_c)
+    r = calculate_consumption_for_one_object(consumers_params[0]).seconds_report
+    return float(r.q_total), float(r.q_hot), float(r.q_cold)
+
+
+def simulate_peak_flows(
+    consumers_params: list[WaterConsumerParams],
+    trials: int = 1_000_000,
+    quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+    seed: int | None = None,
+    max_elements: int = 1 << 22,
+    resolution: float = 0.001,
+    max_bins: int = 1 << 20,
+) -> MonteCarloReport:
+    if len(consumers_params) == 0:
+        raise ValueError("Nothing to simulate")
+
+    rng = np.random.default_rng(seed)
+
+    estimates = []
+    for (devices, P, q0, clipped), q_norm in zip(usage_groups(consumers_params), normative_peak_flows(consumers_params)):
+        hist = _simulate(rng, devices, P, q0, trials, max_elements, resolution, max_bins)
+        estimates.append(PeakFlowEstimate(
+            normative_q=q_norm,
+            mean=hist.total / hist.n,
+            max=hist.max,
+            quantiles={q: hist.quantile(q) for q in quantiles},
+            clipped_probabilities=clipped,
+        ))
+
+    return MonteCarloReport(trials=trials, total=estimates[0], hot=estimates[1], cold=estimates[2])
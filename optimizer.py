@@ -0,0 +1,179 @@
+"""
+
+Подбор минимального числа приборов
+
+For a consumer type and a number of measurers, finds the smallest number
+of devices and its split into hot and cold devices such that P of every
+water kind stays within table Б.1 (P <= P_TABLE_MAX and Phr <= P_TABLE_MAX,
+where alpha is not clamped) and the searched flow reaches its target.
+
+NP does not depend on the number of devices, so alpha, and with it q and
+qhr, change with N only through the table lookup. The lookup is not
+monotone in N, so instead of bisection every candidate count up to
+max_devices is evaluated at once with the array formulas of sweep.
+
+"""
+
+import numpy as np
+
+from alpha import P_TABLE_MAX
+from mathematics import WaterConsumerNorms, record
+from sweep import one_object_arrays
+
+
+# searched flow -> water kind it depends on
+SEARCH_QUANTITIES = {
+    "q_total": "total",
+    "q_hot": "hot",
+    "q_cold": "cold",
+    "qhr_total": "total",
+    "qhr_hot": "hot",
+    "qhr_cold": "cold",
+}
+
+
+@record
+class DeviceSearch:
+    norms: WaterConsumerNorms
+    num_of_measurers: int
+    quantity: str = "q_total"
+    target: float = 0.0
+
+
+@record
+class DeviceConfiguration:
+    num_of_devices: int
+    num_of_devices_hot: int
+    # searched flow at the found configuration
+    value: float
+
+
+def _count_columns(
+    norms: WaterConsumerNorms,
+    num_of_measurers: np.ndarray,
+    counts: np.ndarray,
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """Sweep columns by count of devices for every number of measurers (rows).
+
+    Total and hot columns depend only on N and N_h, cold ones only on N - N_h,
+    so one column per count serves every split.
+    """
+    U = np.asarray(num_of_measurers, dtype=np.float64)[:, None]
+    by_count = one_object_arrays(norms, U, counts, counts, 61, 5, 12)
+    by_cold_count = one_object_arrays(norms, U, counts + 1, np.ones_like(counts), 61, 5, 12)
+    return by_count, by_cold_count
+
+
+def _feasible(
+    search: DeviceSearch,
+    by_count: dict[str, np.ndarray],
+    by_cold_count: dict[str, np.ndarray],
+) -> dict[str, np.ndarray]:
+    """Whether each count of devices of each water kind is acceptable on its own."""
+    kind_of_target = SEARCH_QUANTITIES[search.quantity]
+
+    feasible = {}
+    for kind, columns in (("total", by_count), ("hot", by_count), ("cold", by_cold_count)):
+        with np.errstate(invalid="ignore"):
+            ok = (columns[f"P_{kind}"] <= P_TABLE_MAX) & (columns[f"Phr_{kind}"] <= P_TABLE_MAX)
+            if kind == kind_of_target:
+                ok &= columns[search.quantity] >= search.target
+        feasible[kind] = ok
+    return feasible
+
+
+def _first(ok: np.ndarray) -> int | None:
+    found = np.flatnonzero(ok)
+    return int(found[0]) + 1 if len(found) else None
+
+
+def find_minimal_devices(search: DeviceSearch, max_devices: int = 1000) -> DeviceConfiguration | None:
+    """Smallest configuration for one search, None if there is none up to max_devices."""
+    counts = np.arange(1, max_devices + 1, dtype=np.float64)
+    by_count, by_cold_count = _count_columns(search.norms, np.array([search.num_of_measurers]), counts)
+    return _find(
+        search,
+        {name: column[0] for name, column in by_count.items()},
+        {name: column[0] for name, column in by_cold_count.items()},
+        max_devices,
+    )
+
+
+def _find(
+    search: DeviceSearch,
+    by_count: dict[str, np.ndarray],
+    by_cold_count: dict[str, np.ndarray],
+    max_devices: int,
+) -> DeviceConfiguration | None:
+    if search.quantity not in SEARCH_QUANTITIES:
+        raise ValueError(f"Unknown searched quantity: {search.quantity}")
+
+    ok = _feasible(search, by_count, by_cold_count)
+    has_hot = search.norms.max_hot_water_norms_per_hour > 0
+
+    N_min = _first(ok["total"])
+    if N_min is None:
+        return None
+
+    if not has_hot:
+        if SEARCH_QUANTITIES[search.quantity] != "total":
+            return None
+        N, N_h = N_min, 0
+    else:
+        h_min, c_min = _first(ok["hot"]), _first(ok["cold"])
+        if h_min is None or c_min is None:
+            return None
+
+        # smallest N that has a split, and its smallest hot part
+        found = None
+        for N in range(max(N_min, h_min + c_min), max_devices + 1):
+            if not ok["total"][N - 1]:
+                continue
+            hot = np.arange(h_min, N - c_min + 1)
+            split = ok["hot"][hot - 1] & ok["cold"][N - hot - 1]
+            if split.any():
+                found = N, int(hot[np.argmax(split)])
+                break
+        if found is None:
+            return None
+        N, N_h = found
+
+    value = one_object_arrays(search.norms, search.num_of_measurers, np.array([N]), np.array([max(N_h, 1)]), 61, 5, 12)
+    return DeviceConfiguration(N, N_h, float(value[search.quantity][0]))
+
+
+def find_minimal_devices_many(
+    searches: list[DeviceSearch],
+    max_devices: int = 1000,
+    batch_size: int = 64,
+) -> list[DeviceConfiguration | None]:
+    """find_minimal_devices of every search.
+
+    Searches with the same norms share the sweep columns: they are computed
+    for up to batch_size numbers of measurers at once, one row per number.
+    """
+    counts = np.arange(1, max_devices + 1, dtype=np.float64)
+    results: list[DeviceConfiguration | None] = [None] * len(searches)
+
+    groups: dict[WaterConsumerNorms, list[int]] = {}
+    for i, search in enumerate(searches):
+        groups.setdefault(search.norms, []).append(i)
+
+    for norms, idx in groups.items():
+        measurers = sorted({searches[i].num_of_measurers for i in idx})
+        for start in range(0, len(measurers), batch_size):
+            batch = measurers[start:start + batch_size]
+            by_count, by_cold_count = _count_columns(norms, np.array(batch), counts)
+            row = {U: j for j, U in enumerate(batch)}
+            for i in idx:
+                j = row.get(searches[i].num_of_measurers)
+                if j is None:
+                    continue
+                results[i] = _find(
+                    searches[i],
+                    {name: column[j] for name, column in by_count.items()},
+                    {name: column[j] for name, column in by_cold_count.items()},
+                    max_devices,
+                )
+
+    return results
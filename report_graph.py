@@ -0,0 +1,322 @@
+"""
+
+Ленивый граф величин отчета
+
+Report quantities as a dependency graph of named nodes. A node is computed
+only when it (or something downstream) is requested, and its value is kept
+until an input or an override upstream of it changes. Overriding a quantity
+(e.g. an alpha edited in the report preview) invalidates only the nodes that
+depend on it.
+
+Nodes are the stage functions of mathematics.py (calculate_*) and fields
+of their reports, so nodes equal the fields of the full report. Alpha nodes
+come from the stages with the table lookup; the stages are run again with
+those alphas for the flows that follow them, so an overridden alpha reaches
+q, qhr, the heat flows and the "report" node, the full report.
+
+"""
+
+from typing import Any, Callable
+
+from mathematics import (
+    DEFAULT_PRECISION,
+    AvgHourConsumptionReportData,
+    HeatConsumptionReportData,
+    MaxHourConsumptionReportData,
+    MultipleObjectsDataReport,
+    MultipleObjectsHeatConsumptionDataReport,
+    MultipleObjectsSecondsConsumptionDataReport,
+    MultipleObjectsTotalDayConsumptionDataReport,
+    MultipleObjectsTotalHoursConsumptionDataReport,
+    OneObjectDataReport,
+    PrecisionPolicy,
+    SecondConsumptionReportData,
+    TotalDayConsumptionReportData,
+    WaterConsumerParams,
+    calculate_avg_hour_consumption,
+    calculate_grass_watering,
+    calculate_heat_consumption,
+    calculate_max_hour_consumption,
+    calculate_max_per_sec_consumption,
+    calculate_multiple_objects_day_consumption,
+    calculate_multiple_objects_heat_consumption,
+    calculate_multiple_objects_hour_consumption,
+    calculate_multiple_objects_seconds_consumption,
+    calculate_total_day_consumption,
+    calculate_total_object_consumption,
+    precision_context,
+    traced,
+    variant_terms,
+)
+
+
+Rule = tuple[tuple[str, ...], Callable[..., Any]]
+
+
+class ReportGraph:
+    def __init__(
+        self,
+        rules: dict[str, Rule],
+        inputs: dict[str, Any],
+        precision: PrecisionPolicy = DEFAULT_PRECISION,
+    ):
+        self.rules = rules
+        self.precision = precision
+        self._inputs = dict(inputs)
+        self._values: dict[str, Any] = {}
+        self._overrides: dict[str, Any] = {}
+
+        self._dependents: dict[str, set[str]] = {name: set() for name in (*inputs, *rules)}
+        for name, (deps, _) in rules.items():
+            for dep in deps:
+                if dep not in self._dependents:
+                    raise KeyError(f"{name} depends on unknown quantity {dep}")
+                self._dependents[dep].add(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._dependents
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
+
+    @property
+    def evaluated(self) -> set[str]:
+        """Names of the nodes that currently hold a computed value."""
+        return set(self._values)
+
+    def get(self, name: str) -> Any:
+        if name in self._overrides:
+            return self._overrides[name]
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in self._values:
+            return self._values[name]
+
+        deps, func = self.rules[name]
+        args = [self.get(dep) for dep in deps]
+        with precision_context(self.precision):
+            value = func(*args)
+        self._values[name] = value
+        return value
+
+    def values(self, *names: str) -> dict[str, Any]:
+        return {name: self.get(name) for name in names}
+
+    def _invalidate_dependents(self, name: str):
+        stack = list(self._dependents[name])
+        while stack:
+            node = stack.pop()
+            if self._values.pop(node, None) is not None:
+                stack.extend(self._dependents[node])
+
+    def set_input(self, name: str, value: Any):
+        if name not in self._inputs:
+            raise KeyError(f"{name} is not an input")
+        self._inputs[name] = value
+        self._invalidate_dependents(name)
+
+    def override(self, name: str, value: Any):
+        if name not in self.rules:
+            raise KeyError(f"{name} is not a computed quantity")
+        self._overrides[name] = value
+        self._values.pop(name, None)
+        self._invalidate_dependents(name)
+
+    def clear_override(self, name: str):
+        if self._overrides.pop(name, None) is not None:
+            self._invalidate_dependents(name)
+
+    @property
+    def overrides(self) -> dict[str, Any]:
+        return dict(self._overrides)
+
+
+def _field(node: str, name: str) -> Rule:
+    return ((node,), lambda report: getattr(report, name))
+
+
+def _one_object_report(
+    params: WaterConsumerParams,
+    seconds_consumption: SecondConsumptionReportData,
+    max_hour_consumption: MaxHourConsumptionReportData,
+    avg_hour_consumption: AvgHourConsumptionReportData,
+    total_day_consumption: TotalDayConsumptionReportData,
+    heat_consumption: HeatConsumptionReportData,
+) -> OneObjectDataReport:
+    grass_watering = calculate_grass_watering(params.num_of_measurers)
+    return OneObjectDataReport(
+        consumer=params.consumer_norms,
+        consumer_params=params,
+        seconds_report=seconds_consumption,
+        hours_avg_report=avg_hour_consumption,
+        hours_max_report=max_hour_consumption,
+        heat_report=heat_consumption,
+        total_day_report=total_day_consumption,
+        grass_watering_report=grass_watering,
+        total_object_report=calculate_total_object_consumption(
+            grass_watering,
+            total_day_consumption,
+            max_hour_consumption,
+            seconds_consumption,
+        ),
+    )
+
+
+def _multiple_objects_report(
+    consumers: list[WaterConsumerParams],
+    seconds_consumption: MultipleObjectsSecondsConsumptionDataReport,
+    hours_consumption: MultipleObjectsTotalHoursConsumptionDataReport,
+    day_consumption: MultipleObjectsTotalDayConsumptionDataReport,
+    heat_consumption: MultipleObjectsHeatConsumptionDataReport,
+) -> MultipleObjectsDataReport:
+    return MultipleObjectsDataReport(
+        seconds_consumption=seconds_consumption,
+        hours_consumption=hours_consumption,
+        day_consumption=day_consumption,
+        heat_consumption=heat_consumption,
+        consumers_params=consumers,
+    )
+
+
+# "seconds" and "hours" are the stages with the table alphas; the "*_report"
+# nodes run the same stages with the alpha nodes, which may be overridden
+ONE_OBJECT_RULES: dict[str, Rule] = {
+    # Секундный расход
+    "seconds": (("params",), lambda p: calculate_max_per_sec_consumption(
+        p.consumer_norms, p.num_of_measurers, p.num_of_devices, p.num_of_devices_hot,
+    )),
+    "P_total": _field("seconds", "P_total"),
+    "P_hot": _field("seconds", "P_hot"),
+    "P_cold": _field("seconds", "P_cold"),
+    "alpha_total": _field("seconds", "alpha_total"),
+    "alpha_hot": _field("seconds", "alpha_hot"),
+    "alpha_cold": _field("seconds", "alpha_cold"),
+    "seconds_report": (
+        ("params", "alpha_total", "alpha_hot", "alpha_cold"),
+        lambda p, *alphas: calculate_max_per_sec_consumption(
+            p.consumer_norms, p.num_of_measurers, p.num_of_devices, p.num_of_devices_hot, alphas,
+        ),
+    ),
+    "q_total": _field("seconds_report", "q_total"),
+    "q_hot": _field("seconds_report", "q_hot"),
+    "q_cold": _field("seconds_report", "q_cold"),
+    # Максимальный часовой расход
+    "hours": (("params", "seconds"), lambda p, seconds: calculate_max_hour_consumption(
+        p.consumer_norms, seconds, p.num_of_devices, p.num_of_devices_hot,
+    )),
+    "Phr_total": _field("hours", "P_total"),
+    "Phr_hot": _field("hours", "P_hot"),
+    "Phr_cold": _field("hours", "P_cold"),
+    "alpha_hr_total": _field("hours", "alpha_total"),
+    "alpha_hr_hot": _field("hours", "alpha_hot"),
+    "alpha_hr_cold": _field("hours", "alpha_cold"),
+    "hours_max_report": (
+        ("params", "seconds", "alpha_hr_total", "alpha_hr_hot", "alpha_hr_cold"),
+        lambda p, seconds, *alphas: calculate_max_hour_consumption(
+            p.consumer_norms, seconds, p.num_of_devices, p.num_of_devices_hot, alphas,
+        ),
+    ),
+    "qhr_total": _field("hours_max_report", "q_total"),
+    "qhr_hot": _field("hours_max_report", "q_hot"),
+    "qhr_cold": _field("hours_max_report", "q_cold"),
+    # Средний часовой и суточный расход
+    "hours_avg_report": (("params",), lambda p: calculate_avg_hour_consumption(p, p.consumer_norms, p.num_of_measurers)),
+    "qT_total": _field("hours_avg_report", "q_total"),
+    "qT_hot": _field("hours_avg_report", "q_hot"),
+    "qT_cold": _field("hours_avg_report", "q_cold"),
+    "total_day_report": (("params",), lambda p: calculate_total_day_consumption(p, p.num_of_measurers)),
+    "Q_total": _field("total_day_report", "Q_total"),
+    "Q_hot": _field("total_day_report", "Q_hot"),
+    "Q_cold": _field("total_day_report", "Q_cold"),
+    # Тепловой поток
+    "heat_report": (("params", "hours_avg_report", "hours_max_report"), calculate_heat_consumption),
+    "Q_avg_hour": _field("heat_report", "Q_avg_hour"),
+    "Q_max_hour": _field("heat_report", "Q_max_hour"),
+    "report": (
+        ("params", "seconds_report", "hours_max_report", "hours_avg_report", "total_day_report", "heat_report"),
+        _one_object_report,
+    ),
+}
+
+
+MULTIPLE_OBJECTS_RULES: dict[str, Rule] = {
+    "terms": (("consumers",), variant_terms),
+    # Секундный расход
+    "seconds": (("consumers", "terms"), calculate_multiple_objects_seconds_consumption),
+    "NPs_tot_sum": _field("seconds", "NPs_tot_sum"),
+    "NPs_h_sum": _field("seconds", "NPs_h_sum"),
+    "NPs_c_sum": _field("seconds", "NPs_c_sum"),
+    "q0_tot": _field("seconds", "q0_tot"),
+    "q0_h": _field("seconds", "q0_h"),
+    "q0_c": _field("seconds", "q0_c"),
+    "alpha_tot": _field("seconds", "alpha_tot"),
+    "alpha_h": _field("seconds", "alpha_h"),
+    "alpha_c": _field("seconds", "alpha_c"),
+    "seconds_report": (
+        ("consumers", "terms", "alpha_tot", "alpha_h", "alpha_c"),
+        lambda consumers, terms, *alphas: calculate_multiple_objects_seconds_consumption(consumers, terms, alphas),
+    ),
+    "q_tot": _field("seconds_report", "q_tot"),
+    "q_h": _field("seconds_report", "q_h"),
+    "q_c": _field("seconds_report", "q_c"),
+    # Часовой расход
+    "hours": (("seconds", "consumers", "terms"), calculate_multiple_objects_hour_consumption),
+    "NPhrs_tot_sum": _field("hours", "NPhrs_tot_sum"),
+    "NPhrs_h_sum": _field("hours", "NPhrs_h_sum"),
+    "NPhrs_c_sum": _field("hours", "NPhrs_c_sum"),
+    "q0hr_tot": _field("hours", "q0hr_tot"),
+    "q0hr_h": _field("hours", "q0hr_h"),
+    "q0hr_c": _field("hours", "q0hr_c"),
+    "alpha_hr_tot": _field("hours", "alpha_hr_tot"),
+    "alpha_hr_h": _field("hours", "alpha_hr_h"),
+    "alpha_hr_c": _field("hours", "alpha_hr_c"),
+    "hours_report": (
+        ("seconds_report", "consumers", "terms", "alpha_hr_tot", "alpha_hr_h", "alpha_hr_c"),
+        lambda seconds, consumers, terms, *alphas: calculate_multiple_objects_hour_consumption(
+            seconds, consumers, terms, alphas,
+        ),
+    ),
+    "qhr_tot": _field("hours_report", "qhr_tot"),
+    "qhr_h": _field("hours_report", "qhr_h"),
+    "qhr_c": _field("hours_report", "qhr_c"),
+    # Суточный расход
+    "day_report": (("consumers", "terms"), calculate_multiple_objects_day_consumption),
+    "Qu_total": _field("day_report", "Qu_total"),
+    "Qu_hot": _field("day_report", "Qu_hot"),
+    "Qu_cold": _field("day_report", "Qu_cold"),
+    # Тепловой поток
+    "heat_report": (("consumers", "hours_report", "day_report"), calculate_multiple_objects_heat_consumption),
+    "Q_avg_hour": _field("heat_report", "Q_avg_hour"),
+    "Q_max_hour": _field("heat_report", "Q_max_hour"),
+    "report": (
+        ("consumers", "seconds_report", "hours_report", "day_report", "heat_report"),
+        _multiple_objects_report,
+    ),
+}
+
+
+def one_object_graph(
+    consumer_params: WaterConsumerParams,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+) -> ReportGraph:
+    return ReportGraph(ONE_OBJECT_RULES, {"params": consumer_params}, precision)
+
+
+def multiple_objects_graph(
+    consumers_params: list[WaterConsumerParams],
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+) -> ReportGraph:
+    return ReportGraph(MULTIPLE_OBJECTS_RULES, {"consumers": consumers_params}, precision)
+
+
+def traced_report(graph: ReportGraph) -> OneObjectDataReport | MultipleObjectsDataReport:
+    """The "report" node with the trace of its formulas, for the document.
+
+    Stages with the table alphas are evaluated before tracing, so the trace
+    holds every formula once, with the overridden alphas where there are any.
+    """
+    fresh = ReportGraph(graph.rules, graph._inputs, graph.precision)
+    for name, value in graph.overrides.items():
+        fresh.override(name, value)
+    fresh.values("seconds", "hours")
+    return traced(lambda: fresh["report"])
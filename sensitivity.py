@@ -0,0 +1,255 @@
+"""
+
+Чувствительность результатов к исходным данным
+
+Forward-mode automatic differentiation of the multiple objects calculation.
+Every quantity is a Dual: its float64 value and its partial derivatives by
+SENSITIVITY_INPUTS of every consumer. Per-consumer quantities are NumPy
+vectors over the variant (see ConsumersArrays), so one pass gives the
+derivatives of every report quantity by every input of every consumer
+instead of one re-run of the calculation per input.
+
+Heat quantities use the temperatures of the first consumer, like the
+calculation itself, so temperatures of the other consumers have zero
+derivatives. Alpha values are those of calculate_consumption_for_multiple_objects
+and are differentiated through the interpolation of tables Б.1 and Б.2
+(see alpha_slopes). report_mismatches() compares the values with the report.
+
+"""
+
+from dataclasses import fields
+from decimal import Decimal
+
+import numpy as np
+
+from alpha import alpha_slopes
+from mathematics import (
+    K_0_3,
+    K_0_005,
+    K_1_16,
+    K_1000,
+    K_5,
+    MultipleObjectsDataReport,
+    WaterConsumerParams,
+    calculate_consumption_for_multiple_objects,
+    record,
+)
+from vectorized import ConsumersArrays
+
+
+SENSITIVITY_INPUTS = (
+    "num_of_measurers",
+    "num_of_devices",
+    "num_of_devices_hot",
+    "temp_hot",
+    "temp_cold",
+)
+
+U, N, N_H, T_HOT, T_COLD = range(len(SENSITIVITY_INPUTS))
+
+# constants of the stage functions
+_K_5, _K_1000, _K_0_005, _K_0_3, _K_1_16 = (float(k) for k in (K_5, K_1000, K_0_005, K_0_3, K_1_16))
+
+
+class Dual:
+    """Value with its partial derivatives by the inputs of every consumer.
+
+    grad[k, i] is the derivative by input k of consumer i. A per-consumer
+    vector depends only on the inputs of its own consumer, so its grad holds
+    just that diagonal and sum() makes it the gradient of the sum.
+    """
+
+    __slots__ = ("value", "grad")
+
+    # NumPy arrays defer to the reflected operators of Dual
+    __array_ufunc__ = None
+
+    def __init__(self, value, grad):
+        self.value = value
+        self.grad = grad
+
+    @staticmethod
+    def _lift(other) -> "Dual":
+        return other if isinstance(other, Dual) else Dual(other, 0.0)
+
+    def __add__(self, other) -> "Dual":
+        other = Dual._lift(other)
+        return Dual(self.value + other.value, self.grad + other.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other) -> "Dual":
+        other = Dual._lift(other)
+        return Dual(self.value - other.value, self.grad - other.grad)
+
+    def __rsub__(self, other) -> "Dual":
+        return Dual._lift(other) - self
+
+    def __neg__(self) -> "Dual":
+        return Dual(-self.value, -self.grad)
+
+    def __mul__(self, other) -> "Dual":
+        other = Dual._lift(other)
+        return Dual(self.value * other.value, self.grad * other.value + self.value * other.grad)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other) -> "Dual":
+        other = Dual._lift(other)
+        return Dual(
+            self.value / other.value,
+            (self.grad * other.value - self.value * other.grad) / (other.value * other.value),
+        )
+
+    def __rtruediv__(self, other) -> "Dual":
+        return Dual._lift(other) / self
+
+    def sum(self) -> "Dual":
+        return Dual(float(np.sum(self.value)), self.grad)
+
+
+@record
+class Sensitivities:
+    # values and partials by report field name;
+    # partials[name][k, i] - derivative by SENSITIVITY_INPUTS[k] of consumer i
+    values: dict[str, float]
+    partials: dict[str, np.ndarray]
+
+    def of(self, quantity: str, input_name: str) -> np.ndarray:
+        return self.partials[quantity][SENSITIVITY_INPUTS.index(input_name)]
+
+
+def _report_values(report: MultipleObjectsDataReport) -> dict[str, float]:
+    parts = (report.seconds_consumption, report.hours_consumption, report.day_consumption, report.heat_consumption)
+    return {
+        f.name: float(getattr(part, f.name))
+        for part in parts
+        for f in fields(part)
+        if isinstance(getattr(part, f.name), Decimal)
+    }
+
+
+def _alpha(value: float, NP: Dual, N_: Dual) -> Dual:
+    # alpha of the report; float NP may differ from the Decimal one in the
+    # last digit and round to the neighbouring table value
+    d_NP, d_N = alpha_slopes(NP.value, N_.value)
+    return Dual(value, d_NP * NP.grad + d_N * N_.grad)
+
+
+def calculate_sensitivities(consumers_params: list[WaterConsumerParams]) -> Sensitivities:
+    """Report quantities of the multiple objects calculation and their partial derivatives."""
+    arr = ConsumersArrays(consumers_params)
+    n = len(arr)
+    report = _report_values(calculate_consumption_for_multiple_objects(consumers_params))
+
+    def seed(values: np.ndarray, k: int) -> Dual:
+        grad = np.zeros((len(SENSITIVITY_INPUTS), n))
+        grad[k] = 1.0
+        return Dual(values, grad)
+
+    def seed_first(value: float, k: int) -> Dual:
+        grad = np.zeros((len(SENSITIVITY_INPUTS), n))
+        grad[k, 0] = 1.0
+        return Dual(float(value), grad)
+
+    measurers = seed(arr.num_of_measurers, U)
+    devices = seed(arr.num_of_devices, N)
+    devices_hot = seed(arr.num_of_devices_hot, N_H)
+
+    N_tot = devices.sum()
+    N_h = devices_hot.sum()
+    N_c = N_tot - N_h
+
+    # Seconds
+    nP_tot = (arr.max_hour_tot * measurers) / (arr.q0tot * devices * 3600)
+    nP_h = (arr.max_hour_h * measurers) / (arr.q0 * devices_hot * 3600)
+    nP_c = ((arr.max_hour_tot - arr.max_hour_h) * measurers) / (arr.q0 * (devices - devices_hot) * 3600)
+
+    NP_tot, NP_h, NP_c = nP_tot.sum(), nP_h.sum(), nP_c.sum()
+
+    q0_tot = (nP_tot * arr.q0).sum() / NP_tot
+    q0_h = (nP_h * arr.q0).sum() / NP_h
+    q0_c = (nP_c * arr.q0).sum() / NP_c
+
+    alpha_tot = _alpha(report["alpha_tot"], NP_tot, N_tot)
+    alpha_h = _alpha(report["alpha_h"], NP_h, N_h)
+    alpha_c = _alpha(report["alpha_c"], NP_c, N_c)
+
+    # Hours
+    nPhr_tot = 3600 * nP_tot * arr.q0tot / arr.q0tot_hr
+    nPhr_h = 3600 * nP_h * arr.q0 / arr.q0_hr
+    nPhr_c = 3600 * nP_c * arr.q0 / arr.q0_hr
+
+    NPhr_tot, NPhr_h, NPhr_c = nPhr_tot.sum(), nPhr_h.sum(), nPhr_c.sum()
+
+    alpha_hr_tot = _alpha(report["alpha_hr_tot"], NPhr_tot, N_tot)
+    alpha_hr_h = _alpha(report["alpha_hr_h"], NPhr_h, N_h)
+    alpha_hr_c = _alpha(report["alpha_hr_c"], NPhr_c, N_c)
+
+    qhr_h = _K_0_005 * NPhr_h * alpha_hr_h
+
+    # Day
+    Qu_tot = (arr.avg_day_tot * measurers / _K_1000).sum()
+    Qu_hot = (arr.avg_day_h * measurers / _K_1000).sum()
+    Qu_cold = ((arr.avg_day_tot - arr.avg_day_h) * measurers / _K_1000).sum()
+
+    # Heat
+    first = consumers_params[0]
+    temp_diff = seed_first(first.temp_hot, T_HOT) - seed_first(first.temp_cold, T_COLD)
+
+    quantities = {
+        "NPs_tot_sum": NP_tot,
+        "NPs_h_sum": NP_h,
+        "NPs_c_sum": NP_c,
+        "alpha_tot": alpha_tot,
+        "alpha_h": alpha_h,
+        "alpha_c": alpha_c,
+        "q0_tot": q0_tot,
+        "q0_h": q0_h,
+        "q0_c": q0_c,
+        "q_tot": _K_5 * q0_tot * alpha_tot,
+        "q_h": _K_5 * q0_h * alpha_h,
+        "q_c": _K_5 * q0_c * alpha_c,
+        "NPhrs_tot_sum": NPhr_tot,
+        "NPhrs_h_sum": NPhr_h,
+        "NPhrs_c_sum": NPhr_c,
+        "alpha_hr_tot": alpha_hr_tot,
+        "alpha_hr_h": alpha_hr_h,
+        "alpha_hr_c": alpha_hr_c,
+        "q0hr_tot": (nPhr_tot * arr.q0tot_hr).sum() / NPhr_tot,
+        "q0hr_h": (nPhr_h * arr.q0_hr).sum() / NPhr_h,
+        "q0hr_c": (nPhr_c * arr.q0_hr).sum() / NPhr_c,
+        "qhr_tot": _K_0_005 * NPhr_tot * alpha_hr_tot,
+        "qhr_h": qhr_h,
+        "qhr_c": _K_0_005 * NPhr_c * alpha_hr_c,
+        "Qu_total": Qu_tot,
+        "Qu_hot": Qu_hot,
+        "Qu_cold": Qu_cold,
+        "Q_avg_hour": _K_1_16 * Qu_hot * temp_diff + qhr_h * _K_0_3,
+        "Q_max_hour": _K_1_16 * qhr_h * temp_diff + qhr_h * _K_0_3,
+    }
+
+    shape = (len(SENSITIVITY_INPUTS), n)
+    return Sensitivities(
+        values={name: float(d.value) for name, d in quantities.items()},
+        partials={name: np.broadcast_to(d.grad, shape).copy() for name, d in quantities.items()},
+    )
+
+
+def report_mismatches(
+    consumers_params: list[WaterConsumerParams],
+    rtol: float = 1e-6,
+) -> list[tuple[str, float, float]]:
+    """(quantity, sensitivity value, report value) where the values of
+    calculate_sensitivities differ from calculate_consumption_for_multiple_objects.
+
+    The formulas here are a float copy of the stage functions; the report
+    computes in Decimal with 8 digits, so values agree up to rtol.
+    """
+    values = calculate_sensitivities(consumers_params).values
+    report = _report_values(calculate_consumption_for_multiple_objects(consumers_params))
+    return [
+        (name, value, report[name])
+        for name, value in values.items()
+        if abs(value - report[name]) > rtol * max(1.0, abs(report[name]))
+    ]
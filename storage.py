@@ -0,0 +1,125 @@
+"""
+
+Подбор емкостного водонагревателя
+
+Hour-by-hour simulation of a hot water storage tank over a year, for a
+grid of tank volumes and heater powers at once. The hourly draw is the hot
+water profile of the variant (see demand_profile) repeated every day and
+optionally scaled per day; its heat is 1,16 * q * (t_hot - t_cold) kW as
+in the heat formulas, with the temperatures of the first consumer.
+
+The tank stores heat between t_cold and t_hot, 1,16 * V * (t_hot - t_cold)
+kWh for V m3. Every hour the heater adds up to its power, the draw and the
+losses are taken out, and the charge is kept between empty and full; heat
+that an empty tank cannot give is counted as unmet. All candidates are
+advanced together, so a year costs 8760 array steps whatever the grid size.
+
+"""
+
+import numpy as np
+
+from demand_profile import DEFAULT_START_HOUR, HOURS, DemandProfile, build_demand_profile
+from mathematics import WaterConsumerParams, record
+
+
+DAYS_IN_YEAR = 365
+
+# kWh to heat 1 m3 of water by 1 degree
+WATER_HEAT = 1.16
+
+
+@record
+class StorageSimulation:
+    tank_volumes: np.ndarray
+    heater_powers: np.ndarray
+    # results over the grid: [i, j] - tank_volumes[i] with heater_powers[j]
+    unmet_energy: np.ndarray
+    unmet_hours: np.ndarray
+    heater_energy: np.ndarray
+    min_charge: np.ndarray
+
+    @property
+    def adequate(self) -> np.ndarray:
+        """Candidates that cover every hour of the year."""
+        return self.unmet_hours == 0
+
+    def smallest_tanks(self) -> np.ndarray:
+        """Smallest adequate tank volume for every heater power, NaN if none."""
+        volumes = np.where(self.adequate, self.tank_volumes[:, None], np.inf).min(axis=0)
+        return np.where(np.isfinite(volumes), volumes, np.nan)
+
+
+def hourly_heat_demand(
+    profile: DemandProfile,
+    temp_diff: float,
+    day_factors: np.ndarray | None = None,
+) -> np.ndarray:
+    """Heat drawn in every hour of a year, kWh."""
+    hot = profile.variant_profile("hot").reshape(HOURS, profile.steps_per_hour).mean(axis=1)
+    if day_factors is None:
+        day_factors = np.ones(DAYS_IN_YEAR)
+    day_factors = np.asarray(day_factors, dtype=np.float64)
+    if day_factors.shape != (DAYS_IN_YEAR,):
+        raise ValueError("day_factors must have one factor per day of a year")
+    return (day_factors[:, None] * hot[None, :]).ravel() * WATER_HEAT * temp_diff
+
+
+def simulate_storage(
+    consumers_params: list[WaterConsumerParams],
+    tank_volumes: np.ndarray,
+    heater_powers: np.ndarray,
+    start_hours: float | np.ndarray = DEFAULT_START_HOUR,
+    day_shape: np.ndarray | None = None,
+    day_factors: np.ndarray | None = None,
+    losses: float = 0.0,
+) -> StorageSimulation:
+    """Year of operation of every tank volume (m3) and heater power (kW).
+
+    losses is a constant heat loss of the system, kW. Tanks start full.
+    """
+    first = consumers_params[0]
+    temp_diff = first.temp_hot - first.temp_cold
+
+    profile = build_demand_profile(consumers_params, start_hours=start_hours, day_shape=day_shape)
+    demand = hourly_heat_demand(profile, temp_diff, day_factors) + losses
+
+    volumes = np.asarray(tank_volumes, dtype=np.float64)
+    powers = np.asarray(heater_powers, dtype=np.float64)
+
+    capacity = np.broadcast_to((WATER_HEAT * temp_diff * volumes)[:, None], (len(volumes), len(powers)))
+    power = np.broadcast_to(powers[None, :], capacity.shape)
+
+    charge = capacity.copy()
+    min_charge = charge.copy()
+    unmet_energy = np.zeros(capacity.shape)
+    unmet_hours = np.zeros(capacity.shape, dtype=np.int64)
+    heater_energy = np.zeros(capacity.shape)
+
+    level = np.empty(capacity.shape)
+    heated = np.empty(capacity.shape)
+
+    for d in demand.tolist():
+        # heater runs only as much as the tank can take
+        np.subtract(capacity, charge, out=heated)
+        heated += d
+        np.minimum(heated, power, out=heated)
+        heater_energy += heated
+
+        np.add(charge, heated, out=level)
+        level -= d
+
+        short = level < 0
+        unmet_hours += short
+        unmet_energy -= np.where(short, level, 0.0)
+
+        np.maximum(level, 0.0, out=charge)
+        np.minimum(min_charge, charge, out=min_charge)
+
+    return StorageSimulation(
+        tank_volumes=volumes,
+        heater_powers=powers,
+        unmet_energy=unmet_energy,
+        unmet_hours=unmet_hours,
+        heater_energy=heater_energy,
+        min_charge=min_charge,
+    )
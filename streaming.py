@@ -0,0 +1,113 @@
+"""
+
+Потоковый расчет нескольких объектов
+
+Calculates the totals of the multiple objects calculation in one pass over
+an iterable of consumers, so a variant of millions of rows never has to be
+held in memory. Only the running sums (RunningSums) are kept, one entry per
+group of consumers, so memory is bound by the number of distinct groups and
+not by the number of rows; per-object rows can be written to a CSV file as
+they are produced instead of being collected in the lists of
+MultipleObjectsDataReport.
+
+Totals are the values of calculate_consumption_for_multiple_objects for the
+same consumers, digit for digit (see report_mismatches).
+
+"""
+
+import csv
+import dataclasses
+import io
+from decimal import Decimal
+from typing import Iterable, Iterator, TextIO
+
+from aggregate import RunningSums, VariantTotals
+from mathematics import (
+    DEFAULT_PRECISION,
+    PrecisionPolicy,
+    WaterConsumerParams,
+    calculate_consumer_terms,
+    calculate_consumption_for_multiple_objects,
+    precision_context,
+)
+
+
+# same names as the per-object lists of the multiple objects reports
+ROW_COLUMNS = (
+    "NPs_tot", "NPs_h", "NPs_c",
+    "NPhrs_tot", "NPhrs_h", "NPhrs_c",
+    "Qu_tots", "Qu_hs", "Qu_cs",
+)
+
+
+def calculate_consumption_streaming(
+    consumers: Iterable[WaterConsumerParams],
+    rows: TextIO | None = None,
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+) -> VariantTotals:
+    """Totals of the consumers, calculated in constant memory.
+
+    When rows is given, one CSV row of ROW_COLUMNS per consumer is written
+    to it, in the order of the consumers.
+    """
+    sums = RunningSums(precision)
+    writer = None
+    if rows is not None:
+        writer = csv.writer(rows)
+        writer.writerow(ROW_COLUMNS)
+
+    for params in consumers:
+        sums.push(params)
+        if writer is not None:
+            with precision_context(precision):
+                t = calculate_consumer_terms(params)
+            writer.writerow((
+                t.nP_tot, t.nP_h, t.nP_c,
+                t.nPhr_tot, t.nPhr_h, t.nPhr_c,
+                t.Q_tot, t.Q_h, t.Q_c,
+            ))
+
+    return sums.totals()
+
+
+def read_rows(rows: TextIO) -> Iterator[tuple[Decimal, ...]]:
+    """Per-object rows written by calculate_consumption_streaming."""
+    reader = csv.reader(rows)
+    header = next(reader, None)
+    if header is not None and tuple(header) != ROW_COLUMNS:
+        raise ValueError(f"Unexpected rows header: {header}")
+    for row in reader:
+        yield tuple(Decimal(v) for v in row)
+
+
+def report_mismatches(
+    consumers_params: list[WaterConsumerParams],
+    precision: PrecisionPolicy = DEFAULT_PRECISION,
+) -> list[tuple[str, Decimal, Decimal]]:
+    """(quantity, streaming value, report value) where the totals or rows of
+    calculate_consumption_streaming differ from
+    calculate_consumption_for_multiple_objects.
+
+    Both round the same exact group sums once with the precision policy, so
+    no tolerance applies: any difference is a mismatch.
+    """
+    buf = io.StringIO()
+    totals = calculate_consumption_streaming(consumers_params, buf, precision)
+    report = calculate_consumption_for_multiple_objects(consumers_params, precision=precision)
+
+    stages = (report.seconds_consumption, report.hours_consumption, report.day_consumption, report.heat_consumption)
+    values = {name: getattr(stage, name) for stage in stages for name in stage.__slots__}
+
+    mismatches = [
+        (f.name, getattr(totals, f.name), values[f.name])
+        for f in dataclasses.fields(totals)
+        if f.name in values and getattr(totals, f.name) != values[f.name]
+    ]
+
+    buf.seek(0)
+    for i, row in enumerate(read_rows(buf)):
+        for name, value in zip(ROW_COLUMNS, row):
+            if value != values[name][i]:
+                mismatches.append((f"{name}[{i}]", value, values[name][i]))
+
+    return mismatches
@@ -0,0 +1,288 @@
+"""
+
+Параметрический анализ чувствительности
+
+Evaluates calculate_max_per_sec_consumption, calculate_max_hour_consumption
+and calculate_heat_consumption over a full Cartesian grid of consumer
+parameters for one WaterConsumerNorms. The grid is walked in flat batches,
+each batch is computed with NumPy, and the result is stored as one float64
+column per quantity.
+
+Probabilities are rounded like the Decimal operations of the report, so
+every alpha equals the alpha of calculate_consumption_for_one_object;
+report_mismatches() compares a sweep with the report point by point.
+
+Points where a formula is undefined (e.g. all devices are hot, so P_c has no
+cold devices) come out as NaN.
+
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+from alpha import lookup_alpha, lookup_alpha_array
+from mathematics import (
+    DEFAULT_PRECISION,
+    WaterConsumerNorms,
+    WaterConsumerParams,
+    calculate_consumption_for_one_object,
+    norms_kernel,
+    precision_context,
+)
+
+
+SWEEP_AXES = (
+    "num_of_measurers",
+    "num_of_devices",
+    "num_of_devices_hot",
+    "temp_hot",
+    "temp_cold",
+    "work_hours",
+)
+
+SWEEP_COLUMNS = (
+    "P_total", "P_hot", "P_cold",
+    "alpha_total", "alpha_hot", "alpha_cold",
+    "q_total", "q_hot", "q_cold",
+    "Phr_total", "Phr_hot", "Phr_cold",
+    "alpha_hr_total", "alpha_hr_hot", "alpha_hr_cold",
+    "qhr_total", "qhr_hot", "qhr_cold",
+    "qT_hot",
+    "Q_avg_hour", "Q_max_hour",
+)
+
+# (report, field) of calculate_consumption_for_one_object for every column
+_REPORT_FIELDS = {
+    **{f"{p}_{kind}": ("seconds_report", f"{p}_{kind}") for p in ("P", "alpha", "q") for kind in ("total", "hot", "cold")},
+    **{f"Phr_{kind}": ("hours_max_report", f"P_{kind}") for kind in ("total", "hot", "cold")},
+    **{f"alpha_hr_{kind}": ("hours_max_report", f"alpha_{kind}") for kind in ("total", "hot", "cold")},
+    **{f"qhr_{kind}": ("hours_max_report", f"q_{kind}") for kind in ("total", "hot", "cold")},
+    "qT_hot": ("hours_avg_report", "q_hot"),
+    "Q_avg_hour": ("heat_report", "Q_avg_hour"),
+    "Q_max_hour": ("heat_report", "Q_max_hour"),
+}
+
+
+class SweepResult:
+    """Columnar sweep result; column i corresponds to np.unravel_index(i, shape)."""
+
+    def __init__(self, axes: dict[str, np.ndarray], columns: dict[str, np.ndarray]):
+        self.axes = axes
+        self.columns = columns
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return tuple(len(v) for v in self.axes.values())
+
+    def __len__(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def grid(self, column: str) -> np.ndarray:
+        """Column reshaped to the sweep grid, one dimension per axis."""
+        return self.columns[column].reshape(self.shape)
+
+    def inputs(self, index: int) -> dict[str, float]:
+        idx = np.unravel_index(index, self.shape)
+        return {name: float(values[i]) for (name, values), i in zip(self.axes.items(), idx)}
+
+
+def _decimal_round(x: np.ndarray, prec: int = DEFAULT_PRECISION.prec) -> tuple[np.ndarray, np.ndarray]:
+    """x rounded to prec significant digits, half to even, as a Decimal context
+    rounds, and where x is too close to a half for float arithmetic to tell."""
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        scale = 10.0 ** (prec - 1 - np.floor(np.log10(np.abs(x))))
+        scaled = x * scale
+        near = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        rounded = np.where((x == 0) | ~np.isfinite(x), x, np.round(scaled) / scale)
+    return rounded, near
+
+
+@lru_cache(maxsize=1 << 16)
+def _report_probabilities(
+    max_hour: Decimal,
+    q0: Decimal,
+    q0_hr: Decimal,
+    U: float,
+    n: int,
+) -> tuple[float, float, float, float]:
+    """_probabilities of one point, in Decimal as the report computes them."""
+    with precision_context():
+        P = (max_hour * Decimal(U)) / (q0 * Decimal(n) * 3600)
+        Phr = (3600 * P * q0) / q0_hr
+        return float(P), float(lookup_alpha(P * n, n)), float(Phr), float(lookup_alpha(Phr * n, n))
+
+
+def _probabilities(
+    max_hour: Decimal,
+    q0: Decimal,
+    q0_hr: Decimal,
+    U: np.ndarray,
+    n: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """P, alpha, Phr and alpha_hr of one kind (total, hot or cold) of water.
+
+    Every operation is rounded like the Decimal operation of
+    calculate_max_per_sec_consumption and calculate_max_hour_consumption, so
+    alpha is looked up with the NP of the report. Points where a rounding is
+    too close to a half are computed in Decimal.
+    """
+    near = np.zeros(np.broadcast(U, n).shape, dtype=bool)
+
+    def r(x):
+        rounded, tie = _decimal_round(x)
+        np.logical_or(near, tie, out=near)
+        return rounded
+
+    m, q, q_hr = float(max_hour), float(q0), float(q0_hr)
+    P = r(r(m * U) / r(r(q * n) * 3600))
+    P[~np.isfinite(P) | (n <= 0)] = np.nan
+    NP = r(P * n)
+    Phr = r(r(r(3600 * P) * q) / q_hr)
+    NPhr = r(Phr * n)
+    alpha = lookup_alpha_array(NP, n)
+    alpha_hr = lookup_alpha_array(NPhr, n)
+
+    at = np.flatnonzero(near & np.isfinite(P))
+    if len(at):
+        # (U, n) as one complex key, the exact values are computed once per pair
+        points = np.broadcast_to(U, P.shape).flat[at] + 1j * np.broadcast_to(n, P.shape).flat[at]
+        unique, inverse = np.unique(points, return_inverse=True)
+        exact = np.array([
+            _report_probabilities(max_hour, q0, q0_hr, p.real, int(p.imag)) for p in unique.tolist()
+        ])[inverse]
+        for column, values in zip((P, alpha, Phr, alpha_hr), exact.T):
+            column.flat[at] = values
+
+    return P, alpha, Phr, alpha_hr
+
+
+def one_object_arrays(
+    norms: WaterConsumerNorms,
+    num_of_measurers: np.ndarray,
+    num_of_devices: np.ndarray,
+    num_of_devices_hot: np.ndarray,
+    temp_hot: np.ndarray,
+    temp_cold: np.ndarray,
+    work_hours: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Seconds, max hour and heat formulas of the one object report over arrays."""
+    U = np.asarray(num_of_measurers, dtype=np.float64)
+    N = np.asarray(num_of_devices, dtype=np.float64)
+    N_h = np.asarray(num_of_devices_hot, dtype=np.float64)
+    N_c = N - N_h
+
+    q0tot = norms.device_water_consumption_hot_and_cold_q0tot
+    q0tot_hr = norms.device_water_consumption_hot_and_cold_q0tot_hr
+    q0 = norms.device_water_consumption_hot_or_cold_q0
+    q0_hr = norms.device_water_consumption_hot_or_cold_q0_hr
+    k = norms_kernel(norms)
+
+    out: dict[str, np.ndarray] = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        P_tot, alpha_tot, Phr_tot, alpha_hr_tot = _probabilities(k.max_hour_tot, k.q0tot, k.q0tot_hr, U, N)
+        P_h, alpha_h, Phr_h, alpha_hr_h = _probabilities(k.max_hour_h, k.q0, k.q0_hr, U, N_h)
+        P_c, alpha_c, Phr_c, alpha_hr_c = _probabilities(k.max_hour_c, k.q0, k.q0_hr, U, N_c)
+
+        qhr_h = 0.005 * q0_hr * alpha_hr_h
+
+        if norms.T == 24:
+            working_shifts = np.ones_like(U)
+        else:
+            working_shifts = np.asarray(work_hours, dtype=np.float64) / norms.T
+        qT_h = norms.avg_hot_water_norms_per_day * U / (1000 * norms.T * working_shifts)
+
+        temp_diff = np.asarray(temp_hot, dtype=np.float64) - np.asarray(temp_cold, dtype=np.float64)
+
+        out["P_total"], out["P_hot"], out["P_cold"] = P_tot, P_h, P_c
+        out["alpha_total"], out["alpha_hot"], out["alpha_cold"] = alpha_tot, alpha_h, alpha_c
+        out["q_total"] = 5 * q0tot * alpha_tot
+        out["q_hot"] = 5 * q0 * alpha_h
+        out["q_cold"] = 5 * q0 * alpha_c
+        out["Phr_total"], out["Phr_hot"], out["Phr_cold"] = Phr_tot, Phr_h, Phr_c
+        out["alpha_hr_total"], out["alpha_hr_hot"], out["alpha_hr_cold"] = alpha_hr_tot, alpha_hr_h, alpha_hr_c
+        out["qhr_total"] = 0.005 * q0tot_hr * alpha_hr_tot
+        out["qhr_hot"] = qhr_h
+        out["qhr_cold"] = 0.005 * q0_hr * alpha_hr_c
+        out["qT_hot"] = qT_h
+        out["Q_avg_hour"] = 1.16 * qT_h * temp_diff + qhr_h * 0.3
+        out["Q_max_hour"] = 1.16 * qhr_h * temp_diff + qhr_h * 0.3
+
+    return out
+
+
+def _axis(v: int | float | Iterable[float]) -> np.ndarray:
+    arr = np.atleast_1d(np.asarray(list(v) if not np.isscalar(v) else v, dtype=np.float64))
+    if arr.ndim != 1 or len(arr) == 0:
+        raise ValueError("Sweep axis must be a scalar or a non-empty 1D sequence")
+    return arr
+
+
+def sweep(
+    norms: WaterConsumerNorms,
+    num_of_measurers: int | Iterable[int],
+    num_of_devices: int | Iterable[int],
+    num_of_devices_hot: int | Iterable[int],
+    temp_hot: int | Iterable[int] = 61,
+    temp_cold: int | Iterable[int] = 5,
+    work_hours: int | Iterable[int] = 12,
+    batch_size: int = 1 << 16,
+) -> SweepResult:
+    axes = {
+        name: _axis(v)
+        for name, v in zip(
+            SWEEP_AXES,
+            (num_of_measurers, num_of_devices, num_of_devices_hot, temp_hot, temp_cold, work_hours),
+        )
+    }
+    shape = tuple(len(v) for v in axes.values())
+    total = int(np.prod(shape))
+
+    columns = {name: np.empty(total, dtype=np.float64) for name in SWEEP_COLUMNS}
+
+    for start in range(0, total, batch_size):
+        stop = min(start + batch_size, total)
+        idx = np.unravel_index(np.arange(start, stop), shape)
+        values = [axes[name][i] for name, i in zip(SWEEP_AXES, idx)]
+
+        batch = one_object_arrays(norms, *values)
+        for name in SWEEP_COLUMNS:
+            columns[name][start:stop] = batch[name]
+
+    return SweepResult(axes, columns)
+
+
+def report_mismatches(
+    norms: WaterConsumerNorms,
+    result: SweepResult,
+    indices: Iterable[int] | None = None,
+    rtol: float = 1e-6,
+) -> list[tuple[int, str, float, float]]:
+    """(index, column, sweep value, report value) where a sweep point differs
+    from calculate_consumption_for_one_object of the same inputs.
+
+    Points with a NaN column (no report exists) are skipped. Probabilities
+    and alphas are those of the report; flows are computed in float and
+    agree up to rtol.
+    """
+    mismatches: list[tuple[int, str, float, float]] = []
+
+    for i in range(len(result)) if indices is None else indices:
+        if any(np.isnan(result[name][i]) for name in SWEEP_COLUMNS):
+            continue
+        inputs = {name: int(v) for name, v in result.inputs(i).items()}
+        report = calculate_consumption_for_one_object(WaterConsumerParams(consumer_norms=norms, **inputs))
+
+        for name, (part, field) in _REPORT_FIELDS.items():
+            value = float(getattr(getattr(report, part), field))
+            if abs(result[name][i] - value) > rtol * max(1.0, abs(value)):
+                mismatches.append((i, name, float(result[name][i]), value))
+
+    return mismatches
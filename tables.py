@@ -0,0 +1,173 @@
+"""
+
+Таблицы А.1 и А.2 СП 30.13330.2020
+
+Raw rows of the normative tables. Table A.2 rows are grouped by the row
+number of the standard: (number, group, measurer, T, sub-rows), each sub-row
+is (name, avg day total, avg day hot, max hour total, max hour hot,
+q0tot, q0tot_hr, q0, q0_hr). Consumers without hot water supply have zero
+hot norms.
+
+Table A.2 is not complete. Rows 1-7, 10, 11, 13, 15, 17-19, 23 and 24 are
+listed; rows 8, 9, 12, 14, 16, 20-22 and the rows after 24 are not, and the
+listed rows may miss sub-rows. Rows whose device flows are given
+"по технологическим данным" have no numbers to list and stay out.
+
+Only the values in REFERENCE_A2 are checked against the published text;
+table_problems() compares them and checks the rest for consistency.
+
+Table A.1 rows follow DeviceWaterConsumptionNorms field order.
+
+"""
+
+from mathematics import ConsuptionMeasurer as M
+
+
+TABLE_A2 = (
+    ("1", "Жилые дома квартирного типа", M.ONE_INHABITANT, 24, (
+        ("с водопроводом и канализацией без ванн", 95, 0, 6.5, 0, 0.2, 50, 0.2, 50),
+        ("с газоснабжением", 120, 0, 7, 0, 0.2, 100, 0.2, 100),
+        ("с водопроводом, канализацией и ваннами с водонагревателями на твердом топливе", 150, 0, 8.1, 0, 0.3, 300, 0.3, 300),
+        ("с водопроводом, канализацией и ваннами с газовыми водонагревателями", 190, 0, 10.5, 0, 0.3, 300, 0.3, 300),
+        ("с быстродействующими газовыми нагревателями и многоточечным водоразбором", 210, 0, 13, 0, 0.3, 300, 0.3, 300),
+        ("с централизованным горячим водоснабжением, умывальниками, мойками и душами", 195, 85, 12.5, 7.9, 0.2, 100, 0.14, 60),
+        ("с сидячими ваннами, оборудованными душами", 230, 90, 12.5, 9.2, 0.3, 300, 0.2, 200),
+        ("с ваннами длиной от 1500 до 1700 мм, оборудованными душами", 250, 105, 15.6, 10, 0.3, 300, 0.2, 200),
+        ("высотой свыше 12 этажей с повышенными требованиями к благоустройству", 360, 115, 20, 10.9, 0.3, 300, 0.2, 200),
+    )),
+    ("2", "Общежития", M.ONE_INHABITANT, 24, (
+        ("с общими душевыми", 85, 50, 10.4, 6.3, 0.2, 100, 0.14, 60),
+        ("с душами при всех жилых комнатах", 110, 60, 12.5, 8.2, 0.2, 100, 0.14, 60),
+        ("с общими кухнями и блоками душевых на этажах", 140, 80, 12, 7.5, 0.2, 100, 0.14, 60),
+    )),
+    ("3", "Гостиницы, пансионаты и мотели", M.ONE_INHABITANT, 24, (
+        ("с общими ваннами и душами", 120, 70, 12.5, 8.2, 0.3, 300, 0.2, 200),
+        ("с душами во всех отдельных номерах", 230, 140, 12.5, 8.2, 0.2, 100, 0.14, 60),
+        ("с ваннами в отдельных номерах, до 25 % номеров", 200, 100, 12, 7, 0.3, 300, 0.2, 200),
+        ("с ваннами в отдельных номерах, до 75 % номеров", 250, 150, 15, 10, 0.3, 300, 0.2, 200),
+        ("с ваннами в отдельных номерах, до 100 % номеров", 300, 180, 16, 11, 0.3, 300, 0.2, 200),
+    )),
+    ("4", "Больницы", M.ONE_BED, 24, (
+        ("с общими ваннами и душевыми", 115, 75, 8.4, 5.4, 0.2, 100, 0.14, 60),
+        ("с санитарными узлами, приближенными к палатам", 200, 90, 12, 7.7, 0.3, 300, 0.2, 200),
+        ("инфекционные", 240, 110, 10, 4.4, 0.3, 300, 0.2, 200),
+    )),
+    ("5", "Санатории и дома отдыха", M.ONE_BED, 24, (
+        ("с ваннами при всех жилых комнатах", 200, 120, 13, 4.9, 0.3, 300, 0.2, 200),
+        ("с душами при всех жилых комнатах", 150, 75, 10, 3.1, 0.2, 100, 0.14, 60),
+    )),
+    ("6", "Поликлиники и амбулатории", M.ONE_PERSON_PER_SHIFT, 10, (
+        ("на одного больного в смену", 13, 5.2, 2.6, 1.2, 0.2, 80, 0.14, 60),
+    )),
+    ("7", "Детские ясли-сады", M.ONE_PLACE, 10, (
+        ("с дневным пребыванием, столовые на полуфабрикатах", 21.5, 11.5, 9.5, 4.5, 0.14, 60, 0.1, 40),
+        ("с дневным пребыванием, столовые на сырье и прачечные", 75, 25, 16, 4.5, 0.2, 100, 0.14, 60),
+    )),
+    ("7", "Детские ясли-сады", M.ONE_PLACE, 24, (
+        ("с круглосуточным пребыванием, столовые на полуфабрикатах", 39, 21.4, 6.5, 3.2, 0.14, 60, 0.1, 40),
+        ("с круглосуточным пребыванием, столовые на сырье и прачечные", 93, 28.5, 16, 4.5, 0.2, 100, 0.14, 60),
+    )),
+    ("10", "Административные здания", M.ONE_PERSON_PER_SHIFT, 8, (
+        ("на одного работающего", 12, 5, 4, 2, 0.14, 80, 0.1, 60),
+    )),
+    ("11", "Учебные заведения", M.ONE_STUDENT_AND_ONE_TEACHER, 8, (
+        ("с душевыми при гимнастических залах и буфетами", 17.2, 8, 2.7, 1.2, 0.14, 100, 0.1, 60),
+    )),
+    ("13", "Общеобразовательные школы", M.ONE_STUDENT_AND_ONE_TEACHER, 8, (
+        ("с душевыми при гимнастических залах и столовыми на полуфабрикатах", 10, 3, 1.4, 0.6, 0.14, 100, 0.1, 60),
+    )),
+    ("15", "Школы-интернаты", M.ONE_STUDENT_AND_ONE_TEACHER, 8, (
+        ("учебные помещения с душевыми при гимнастических залах", 9, 2.7, 1.4, 0.6, 0.14, 100, 0.1, 60),
+    )),
+    ("15", "Школы-интернаты", M.ONE_PLACE, 24, (
+        ("спальные помещения", 70, 30, 5.4, 2.3, 0.2, 100, 0.14, 60),
+    )),
+    ("17", "Аптеки", M.ONE_PERSON_PER_SHIFT, 12, (
+        ("торговый зал и подсобные помещения", 12, 5, 4, 2, 0.14, 80, 0.1, 60),
+        ("лаборатория приготовления лекарств", 310, 55, 32, 8.6, 0.2, 100, 0.14, 60),
+    )),
+    ("18", "Предприятия общественного питания", M.ONE_DISH, 12, (
+        ("приготовление пищи, реализуемой в обеденном зале", 12, 4, 12, 4, 0.3, 300, 0.2, 200),
+        ("приготовление пищи, продаваемой на дом", 10, 3, 10, 3, 0.3, 300, 0.2, 200),
+    )),
+    ("19", "Магазины", M.ONE_EMPLOYEE_ON_20_SQU_MET, 12, (
+        ("продовольственные", 250, 65, 37, 9.6, 0.3, 300, 0.2, 200),
+    )),
+    ("19", "Магазины", M.ONE_PERSON_PER_SHIFT, 12, (
+        ("промтоварные", 12, 5, 4, 2, 0.14, 80, 0.1, 60),
+    )),
+    ("23", "Бани", M.ONE_INHABITANT, 3, (
+        ("душевая кабина", 360, 200, 360, 200, 0.2, 360, 0.14, 240),
+    )),
+    ("24", "Душевые в бытовых помещениях промышленных предприятий", M.ONE_DOUCH_PER_SHIFT, 1, (
+        ("на одну душевую сетку в смену", 500, 270, 500, 270, 0.2, 500, 0.14, 270),
+    )),
+)
+
+
+TABLE_A1 = (
+    (1, "Умывальник (рукомойник) с водоразборным краном", 0.1, 0.1, 0, 30, 30, 0, 0.15, 10, 32),
+    (2, "Умывальник со смесителем", 0.12, 0.09, 0.09, 60, 40, 40, 0.15, 10, 32),
+    (3, "Мойка (в том числе лабораторная) с водоразборным краном", 0.15, 0.15, 0, 50, 50, 0, 0.6, 10, 40),
+    (4, "Мойка (в том числе лабораторная) со смесителем", 0.12, 0.09, 0.09, 80, 60, 60, 0.6, 10, 40),
+    (5, "Мойка для предприятий общественного питания со смесителем", 0.3, 0.2, 0.2, 500, 280, 220, 0.6, 15, 50),
+    (6, "Раковина с водоразборным краном и смесителем", 0.3, 0.2, 0.2, 500, 280, 220, 0.3, 15, 50),
+    (7, "Ванна со смесителем (в том числе общим для ванн и умывальников)", 0.25, 0.18, 0.18, 300, 200, 200, 0.8, 10, 40),
+    (8, "Ванна с водогрейной колонкой и смесителем", 0.22, 0.22, 0, 300, 300, 0, 1.1, 15, 40),
+    (9, "Ванна медицинская со смесителем, условный проход 20 мм", 0.4, 0.3, 0.3, 700, 460, 460, 1.1, 20, 40),
+    (10, "Ванна медицинская со смесителем, условный проход 25 мм", 0.6, 0.4, 0.4, 1150, 800, 800, 1.1, 25, 40),
+    (11, "Ванна медицинская со смесителем, условный проход 32 мм", 1.4, 1.0, 1.0, 2700, 1800, 1800, 1.1, 32, 50),
+    (12, "Душевая кабина с мелким поддоном и смесителем", 0.12, 0.09, 0.09, 100, 60, 60, 0.2, 10, 40),
+    (13, "Душевая кабина с глубоким поддоном и смесителем", 0.12, 0.09, 0.09, 115, 80, 80, 0.6, 10, 40),
+    (14, "Душ в групповой установке со смесителем", 0.2, 0.14, 0.14, 500, 270, 230, 0.2, 10, 50),
+    (15, "Нижний восходящий душ", 0.15, 0.1, 0.1, 75, 54, 54, 0.15, 10, 32),
+    (16, "Гигиенический душ (биде) со смесителем и аэратором", 0.08, 0.05, 0.05, 75, 54, 54, 0.15, 10, 32),
+    (17, "Унитаз со смывным бачком", 0.1, 0.1, 0, 83, 83, 0, 1.6, 8, 85),
+    (18, "Унитаз со смывным краном", 1.4, 1.4, 0, 81, 81, 0, 1.4, 0, 85),
+    (19, "Писсуар", 0.035, 0.035, 0, 36, 36, 0, 0.1, 10, 40),
+    (20, "Писсуар с полуавтоматическим смывным краном", 0.2, 0.2, 0, 36, 36, 0, 0.2, 15, 50),
+    (21, "Питьевой фонтанчик", 0.04, 0.04, 0, 72, 72, 0, 0.05, 10, 25),
+    (22, "Поливочный кран", 0.3, 0.3, 0.2, 1080, 1080, 720, 0.3, 15, 0),
+)
+
+
+# (number, name, values) of the sub-rows checked against the published text
+REFERENCE_A2 = (
+    ("23", "душевая кабина", (360, 200, 360, 200, 0.2, 360, 0.14, 240, 3)),
+)
+
+
+def table_problems() -> list[str]:
+    """Rows that differ from REFERENCE_A2 or are inconsistent; empty if none."""
+    problems = []
+
+    a2 = {}
+    for number, group, measurer, T, rows in TABLE_A2:
+        if not 0 < T <= 24:
+            problems.append(f"A.2 {number} {group}: T = {T}")
+        for name, *values in rows:
+            if (number, name) in a2:
+                problems.append(f"A.2 {number} {name}: duplicate row")
+            a2[(number, name)] = (*values, T)
+
+            day, day_h, hour, hour_h, q0tot, q0tot_hr, q0, q0_hr = values
+            if day_h > day or hour_h > hour:
+                problems.append(f"A.2 {number} {name}: hot norms above the total")
+            if (day_h == 0) != (hour_h == 0):
+                problems.append(f"A.2 {number} {name}: hot norms are given for day or hour only")
+            if q0 > q0tot or q0_hr > q0tot_hr:
+                problems.append(f"A.2 {number} {name}: device flow above the total")
+            if q0tot_hr > 3600 * q0tot or q0_hr > 3600 * q0:
+                problems.append(f"A.2 {number} {name}: l/h flow above 3600 l/s flow")
+
+    for number, name, values in REFERENCE_A2:
+        if a2.get((number, name)) != values:
+            problems.append(f"A.2 {number} {name}: {a2.get((number, name))} differs from the standard {values}")
+
+    for i, (id_, name, q0tot, q0c, q0h, q_hr_tot, q_hr_c, q_hr_h, *_) in enumerate(TABLE_A1, start=1):
+        if id_ != i:
+            problems.append(f"A.1 {name}: number {id_}, expected {i}")
+        if max(q0c, q0h) > q0tot or max(q_hr_c, q_hr_h) > q_hr_tot:
+            problems.append(f"A.1 {id_} {name}: cold or hot flow above the total")
+
+    return problems
@@ -0,0 +1,253 @@
+"""
+
+Многолетний почасовой расчет потребления
+
+Hourly demand of every variant of many projects over several years, built
+from the day profiles of the variant objects (ProjectContext.get_variant_objects,
+see demand_profile) and a calendar of weekend, holiday and month factors.
+
+The series are generated in fixed-size chunks and written to a columnar
+store on disk, so memory does not grow with the length of the period:
+
+    meta.json                     - start, length, dtype, columns, levels
+    c<j>.raw                      - hourly flow of column j, m3/h
+    c<j>.l<factor>.<stat>         - pyramid: mean and max over factor hours
+
+Every file is a flat little-endian float32 array and is read through
+np.memmap, so a range read touches only the pages it needs and plots of
+long periods read a coarse pyramid level instead of the hourly data.
+
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from demand_profile import DEFAULT_START_HOUR, HOURS, build_demand_profile
+from mathematics import record
+from settings import app_logger
+
+
+STORE_VERSION = 1
+META_NAME = "meta.json"
+
+# every factor divides the next one, so chunks aligned to the last factor
+# hold whole bins of every level
+PYRAMID_FACTORS = (24, 168, 1344)
+PYRAMID_STATS = ("mean", "max")
+
+DEFAULT_CHUNK_HOURS = 8 * PYRAMID_FACTORS[-1]
+
+_DTYPE = np.dtype("<f4")
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+
+@record
+class Calendar:
+    # factors of Saturdays, Sundays and holidays
+    weekend_factor: float = 1.0
+    # factors of the months, January first
+    month_factors: tuple[float, ...] = (1.0,) * 12
+    # ISO dates of holidays
+    holidays: tuple[str, ...] = ()
+
+    def day_factors(self, days: np.ndarray) -> np.ndarray:
+        """Factor of every day of a datetime64[D] array."""
+        weekday = (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+        month = days.astype("datetime64[M]").astype(np.int64) % 12
+
+        off = weekday >= 5
+        if self.holidays:
+            off |= np.isin(days, np.array(self.holidays, dtype="datetime64[D]"))
+
+        return np.asarray(self.month_factors, dtype=np.float64)[month] * np.where(off, self.weekend_factor, 1.0)
+
+
+def _raw_name(j: int) -> str:
+    return f"c{j}.raw"
+
+
+def _level_name(j: int, factor: int, stat: str) -> str:
+    return f"c{j}.l{factor}.{stat}"
+
+
+class TimeSeriesStore:
+    """Read-only view of a store written by simulate_to_store."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        meta = json.loads((self.path / META_NAME).read_text(encoding="utf-8"))
+        if meta["version"] != STORE_VERSION:
+            raise ValueError(f"{self.path} has version {meta['version']}, expected {STORE_VERSION}")
+
+        self.start = np.datetime64(meta["start"], "h")
+        self.hours: int = meta["hours"]
+        self.columns: list[str] = meta["columns"]
+        self.factors: tuple[int, ...] = tuple(meta["factors"])
+        self._index = {name: j for j, name in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return self.hours
+
+    def _hour(self, at: int | str | np.datetime64) -> int:
+        if isinstance(at, (int, np.integer)):
+            return int(at)
+        return int((np.datetime64(at, "h") - self.start).astype(np.int64))
+
+    def _map(self, name: str, factor: int = 1, stat: str = "mean") -> np.memmap:
+        j = self._index[name]
+        if factor == 1:
+            return np.memmap(self.path / _raw_name(j), dtype=_DTYPE, mode="r", shape=(self.hours,))
+        if factor not in self.factors or stat not in PYRAMID_STATS:
+            raise ValueError(f"No pyramid level {factor} {stat}")
+        return np.memmap(
+            self.path / _level_name(j, factor, stat),
+            dtype=_DTYPE, mode="r", shape=(-(-self.hours // factor),),
+        )
+
+    def read(
+        self,
+        name: str,
+        start: int | str | np.datetime64 = 0,
+        stop: int | str | np.datetime64 | None = None,
+        factor: int = 1,
+        stat: str = "mean",
+    ) -> np.ndarray:
+        """Values of a column between two hours (indices or datetimes), at a pyramid level."""
+        a = max(self._hour(start), 0)
+        b = self.hours if stop is None else min(self._hour(stop), self.hours)
+        return np.array(self._map(name, factor, stat)[a // factor:-(-b // factor)])
+
+    def times(self, start: int, stop: int, factor: int = 1) -> np.ndarray:
+        """Start time of every bin of a range read."""
+        return self.start + np.arange(start // factor, -(-stop // factor)) * np.timedelta64(factor, "h")
+
+    def read_for_plot(
+        self,
+        name: str,
+        start: int | str | np.datetime64 = 0,
+        stop: int | str | np.datetime64 | None = None,
+        max_points: int = 2000,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(times, mean, max) of the finest level that has at most max_points in the range."""
+        a = max(self._hour(start), 0)
+        b = self.hours if stop is None else min(self._hour(stop), self.hours)
+
+        factor = 1
+        for f in self.factors:
+            if -(-(b - a) // factor) <= max_points:
+                break
+            factor = f
+
+        if factor == 1:
+            values = self.read(name, a, b)
+            return self.times(a, b), values, values
+        return (
+            self.times(a, b, factor),
+            self.read(name, a, b, factor, "mean"),
+            self.read(name, a, b, factor, "max"),
+        )
+
+
+def _variant_profiles(
+    project_paths: list[str],
+    start_hours: float,
+) -> tuple[list[str], np.ndarray]:
+    """Column names and the (24, columns) matrix of hourly flows of every variant."""
+    from data import ProjectContext
+
+    names: list[str] = []
+    profiles: list[np.ndarray] = []
+
+    for path in project_paths:
+        project = ProjectContext.load(path)
+        for tag in project.variants_data.keys():
+            objects = project.get_variant_objects(tag)
+            if not objects:
+                continue
+            profile = build_demand_profile(objects, start_hours=start_hours)
+            for kind in ("total", "hot"):
+                names.append(f"{path}:{tag}:{kind}")
+                profiles.append(profile.variant_profile(kind))
+
+    return names, np.stack(profiles, axis=1) if profiles else np.empty((HOURS, 0))
+
+
+def _write_at(path: Path, offset: int, values: np.ndarray):
+    with open(path, "r+b") as f:
+        f.seek(offset * _DTYPE.itemsize)
+        f.write(np.ascontiguousarray(values, dtype=_DTYPE).tobytes())
+
+
+def _bins(values: np.ndarray, factor: int) -> tuple[np.ndarray, np.ndarray]:
+    """Mean and max over bins of factor rows; the last bin may be partial."""
+    rows = len(values)
+    padded = np.full((-(-rows // factor) * factor, values.shape[1]), np.nan)
+    padded[:rows] = values
+    padded = padded.reshape(-1, factor, values.shape[1])
+    return np.nanmean(padded, axis=1), np.nanmax(padded, axis=1)
+
+
+def simulate_to_store(
+    path: Path | str,
+    project_paths: list[str],
+    start: str,
+    stop: str,
+    calendar: Calendar = Calendar(),
+    start_hours: float = DEFAULT_START_HOUR,
+    chunk_hours: int = DEFAULT_CHUNK_HOURS,
+) -> TimeSeriesStore:
+    """Hourly flows of every variant from the start date up to the stop date."""
+    if chunk_hours <= 0 or chunk_hours % PYRAMID_FACTORS[-1]:
+        raise ValueError(f"chunk_hours must be a multiple of {PYRAMID_FACTORS[-1]}")
+
+    begin = np.datetime64(start, "D").astype("datetime64[h]")
+    hours = int((np.datetime64(stop, "D").astype("datetime64[h]") - begin).astype(np.int64))
+    if hours <= 0:
+        raise ValueError("Stop date must be after the start date")
+
+    names, daily = _variant_profiles(project_paths, start_hours)
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for j in range(len(names)):
+        with open(path / _raw_name(j), "wb") as f:
+            f.truncate(hours * _DTYPE.itemsize)
+        for factor in PYRAMID_FACTORS:
+            for stat in PYRAMID_STATS:
+                with open(path / _level_name(j, factor, stat), "wb") as f:
+                    f.truncate(-(-hours // factor) * _DTYPE.itemsize)
+
+    for a in range(0, hours, chunk_hours):
+        b = min(a + chunk_hours, hours)
+        idx = np.arange(a, b)
+        days = (begin + idx).astype("datetime64[D]")
+        values = daily[idx % HOURS] * calendar.day_factors(days)[:, None]
+
+        for j in range(len(names)):
+            _write_at(path / _raw_name(j), a, values[:, j])
+        for factor in PYRAMID_FACTORS:
+            means, maxes = _bins(values, factor)
+            for j in range(len(names)):
+                _write_at(path / _level_name(j, factor, "mean"), a // factor, means[:, j])
+                _write_at(path / _level_name(j, factor, "max"), a // factor, maxes[:, j])
+
+    meta = {
+        "version": STORE_VERSION,
+        "start": str(begin),
+        "hours": hours,
+        "dtype": _DTYPE.str,
+        "columns": names,
+        "factors": list(PYRAMID_FACTORS),
+    }
+    # meta is written last, a store without it is incomplete
+    tmp = path / (META_NAME + ".tmp")
+    tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path / META_NAME)
+
+    app_logger.debug(f"wrote {len(names)} columns x {hours} hours to {path}")
+    return TimeSeriesStore(path)
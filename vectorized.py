@@ -0,0 +1,252 @@
+"""
+
+Векторизованный расчет для нескольких объектов (NumPy)
+
+Variant is packed into struct-of-arrays once, one row per group of
+consumers (see group_consumers), and NP / NPhr / Qu vectors are computed
+in one pass; device counts are weighted by the group sizes. Only the sums are converted to Decimal, the
+per-object lists of the report (ObjectValues) convert when first read.
+Results are float64, so they match the Decimal path of
+`calculate_consumption_for_multiple_objects` up to a relative error of
+VECTORIZED_RTOL (Decimal path runs with 8 significant digits).
+
+"""
+
+from collections.abc import Sequence
+from decimal import Decimal, getcontext
+
+import numpy as np
+
+from mathematics import (
+    MultipleObjectsDataReport,
+    MultipleObjectsSecondsConsumptionDataReport,
+    MultipleObjectsTotalDayConsumptionDataReport,
+    MultipleObjectsTotalHoursConsumptionDataReport,
+    WaterConsumerNorms,
+    WaterConsumerParams,
+    _calculation,
+    aproximate_alpha,
+    calculate_multiple_objects_heat_consumption,
+    group_consumers,
+)
+
+
+VECTORIZED_RTOL = 1e-6
+
+
+def _norms_values(norms: WaterConsumerNorms) -> tuple[float, ...]:
+    return (
+        norms.avg_hot_and_cold_water_norms_per_day,
+        norms.avg_hot_water_norms_per_day,
+        norms.max_hot_and_cold_water_norms_per_hour,
+        norms.max_hot_water_norms_per_hour,
+        norms.device_water_consumption_hot_and_cold_q0tot,
+        norms.device_water_consumption_hot_and_cold_q0tot_hr,
+        norms.device_water_consumption_hot_or_cold_q0,
+        norms.device_water_consumption_hot_or_cold_q0_hr,
+        norms.T,
+    )
+
+
+class ConsumersArrays:
+    """Struct-of-arrays view of a variant.
+
+    Rows are the consumers, or with grouped=True the groups of consumers
+    (see group_consumers) with U of all members and their number in weight.
+    index maps every consumer to its row and share is the part of the row U
+    that belongs to the consumer.
+    """
+
+    def __init__(self, consumers_params: list[WaterConsumerParams], grouped: bool = False):
+        groups, index = group_consumers(consumers_params)
+
+        # norms are read once per distinct norms, params once per group
+        norms_rows: dict[WaterConsumerNorms, int] = {}
+        params = np.array(
+            [
+                (
+                    g.num_of_measurers, p.num_of_devices, p.num_of_devices_hot, p.work_hours,
+                    norms_rows.setdefault(p.consumer_norms, len(norms_rows)),
+                )
+                for g, p in ((g, g.params) for g in groups)
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 5)
+        norms = np.array([_norms_values(n) for n in norms_rows], dtype=np.float64).reshape(-1, 9)
+        columns = np.concatenate((params[:, :4], norms[params[:, 4].astype(np.intp)]), axis=1)
+
+        self.index = np.asarray(index, dtype=np.intp)
+        U = np.array([c.num_of_measurers for c in consumers_params], dtype=np.float64)
+        if grouped:
+            self.weight = np.array([g.weight for g in groups], dtype=np.float64)
+            U_rows = columns[self.index, 0]
+            self.share = np.divide(U, U_rows, out=np.zeros_like(U), where=U_rows != 0)
+        else:
+            columns = columns[self.index]
+            columns[:, 0] = U
+            self.weight = np.ones(len(columns))
+            self.index = np.arange(len(columns))
+            self.share = np.ones(len(columns))
+
+        (
+            self.num_of_measurers, self.num_of_devices, self.num_of_devices_hot, self.work_hours,
+            self.avg_day_tot, self.avg_day_h, self.max_hour_tot, self.max_hour_h,
+            self.q0tot, self.q0tot_hr, self.q0, self.q0_hr, self.T,
+        ) = np.ascontiguousarray(columns.T)
+
+    def __len__(self) -> int:
+        return len(self.num_of_measurers)
+
+
+def _dec(v: float) -> Decimal:
+    # rounds to the current context precision, same as the Decimal path
+    return getcontext().create_decimal_from_float(float(v))
+
+
+class ObjectValues(Sequence):
+    """Per-object values of a report, converted to Decimal on first access.
+
+    Holds the values of the rows of ConsumersArrays, the row of every object
+    and its share of the row; the context of the calculation is kept for
+    the conversion.
+    """
+
+    __slots__ = ("_values", "_index", "_share", "_context", "_decimals")
+
+    def __init__(self, values: np.ndarray, index: np.ndarray, share: np.ndarray):
+        self._values = values
+        self._index = index
+        self._share = share
+        self._context = getcontext().copy()
+        self._decimals: list[Decimal] | None = None
+
+    def _converted(self) -> list[Decimal]:
+        if self._decimals is None:
+            convert = self._context.create_decimal_from_float
+            values = self._values[self._index] * self._share
+            self._decimals = [convert(v) for v in values.tolist()]
+        return self._decimals
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i):
+        return self._converted()[i]
+
+    def __iter__(self):
+        return iter(self._converted())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._converted())
+
+
+@_calculation
+def calculate_consumption_for_multiple_objects_vectorized(
+    consumers_params: list[WaterConsumerParams],
+) -> MultipleObjectsDataReport:
+    arr = ConsumersArrays(consumers_params, grouped=True)
+    w = arr.weight
+
+    def per_object(values: np.ndarray) -> ObjectValues:
+        # values are linear in U, so an object gets its share of the row
+        return ObjectValues(values, arr.index, arr.share)
+
+    N_tot = int((w * arr.num_of_devices).sum())
+    N_h = int((w * arr.num_of_devices_hot).sum())
+
+    # Seconds
+    nP_tot = (arr.max_hour_tot * arr.num_of_measurers) / (arr.q0tot * arr.num_of_devices * 3600)
+    nP_h = (arr.max_hour_h * arr.num_of_measurers) / (arr.q0 * arr.num_of_devices_hot * 3600)
+    nP_c = (
+        ((arr.max_hour_tot - arr.max_hour_h) * arr.num_of_measurers)
+        / (arr.q0 * (arr.num_of_devices - arr.num_of_devices_hot) * 3600)
+    )
+
+    NP_tot_sum, NP_h_sum, NP_c_sum = nP_tot.sum(), nP_h.sum(), nP_c.sum()
+
+    q0_tot = (nP_tot * arr.q0).sum() / NP_tot_sum
+    q0_h = (nP_h * arr.q0).sum() / NP_h_sum
+    q0_c = (nP_c * arr.q0).sum() / NP_c_sum
+
+    alpha_tot = aproximate_alpha(_dec(NP_tot_sum), N_tot)
+    alpha_h = aproximate_alpha(_dec(NP_h_sum), N_h)
+    alpha_c = aproximate_alpha(_dec(NP_c_sum), N_tot - N_h)
+
+    seconds_report = MultipleObjectsSecondsConsumptionDataReport(
+        consumer_params=consumers_params,
+        NPs_tot=per_object(nP_tot),
+        NPs_c=per_object(nP_c),
+        NPs_h=per_object(nP_h),
+        NPs_tot_sum=_dec(NP_tot_sum),
+        NPs_c_sum=_dec(NP_c_sum),
+        NPs_h_sum=_dec(NP_h_sum),
+        alpha_tot=alpha_tot,
+        alpha_h=alpha_h,
+        alpha_c=alpha_c,
+        q_tot=_dec(5 * q0_tot * float(alpha_tot)),
+        q_h=_dec(5 * q0_h * float(alpha_h)),
+        q_c=_dec(5 * q0_c * float(alpha_c)),
+        q0_tot=_dec(q0_tot),
+        q0_h=_dec(q0_h),
+        q0_c=_dec(q0_c),
+    )
+
+    # Hours
+    nPhr_tot = 3600 * nP_tot * arr.q0tot / arr.q0tot_hr
+    nPhr_h = 3600 * nP_h * arr.q0 / arr.q0_hr
+    nPhr_c = 3600 * nP_c * arr.q0 / arr.q0_hr
+
+    NPhr_tot_sum, NPhr_h_sum, NPhr_c_sum = nPhr_tot.sum(), nPhr_h.sum(), nPhr_c.sum()
+
+    alpha_hr_tot = aproximate_alpha(_dec(NPhr_tot_sum), N_tot)
+    alpha_hr_h = aproximate_alpha(_dec(NPhr_h_sum), N_h)
+    alpha_hr_c = aproximate_alpha(_dec(NPhr_c_sum), N_tot - N_h)
+
+    hours_report = MultipleObjectsTotalHoursConsumptionDataReport(
+        consumer_params=consumers_params,
+        NPhrs_tot=per_object(nPhr_tot),
+        NPhrs_c=per_object(nPhr_c),
+        NPhrs_h=per_object(nPhr_h),
+        NPhrs_tot_sum=_dec(NPhr_tot_sum),
+        NPhrs_c_sum=_dec(NPhr_c_sum),
+        NPhrs_h_sum=_dec(NPhr_h_sum),
+        alpha_hr_h=alpha_hr_h,
+        alpha_hr_c=alpha_hr_c,
+        alpha_hr_tot=alpha_hr_tot,
+        qhr_tot=_dec(0.005 * NPhr_tot_sum * float(alpha_hr_tot)),
+        qhr_c=_dec(0.005 * NPhr_c_sum * float(alpha_hr_c)),
+        qhr_h=_dec(0.005 * NPhr_h_sum * float(alpha_hr_h)),
+        q0hr_tot=_dec((nPhr_tot * arr.q0tot_hr).sum() / NPhr_tot_sum),
+        q0hr_c=_dec((nPhr_c * arr.q0_hr).sum() / NPhr_c_sum),
+        q0hr_h=_dec((nPhr_h * arr.q0_hr).sum() / NPhr_h_sum),
+    )
+
+    # Day
+    Qu_tot = arr.avg_day_tot * arr.num_of_measurers / 1000
+    Qu_h = arr.avg_day_h * arr.num_of_measurers / 1000
+    Qu_c = (arr.avg_day_tot - arr.avg_day_h) * arr.num_of_measurers / 1000
+
+    day_report = MultipleObjectsTotalDayConsumptionDataReport(
+        consumer_params=consumers_params,
+        Qu_tots=per_object(Qu_tot),
+        Qu_hs=per_object(Qu_h),
+        Qu_cs=per_object(Qu_c),
+        Qu_total=_dec(Qu_tot.sum()),
+        Qu_hot=_dec(Qu_h.sum()),
+        Qu_cold=_dec(Qu_c.sum()),
+    )
+
+    heat_report = calculate_multiple_objects_heat_consumption(consumers_params, hours_report, day_report)
+
+    return MultipleObjectsDataReport(
+        seconds_consumption=seconds_report,
+        hours_consumption=hours_report,
+        day_consumption=day_report,
+        heat_consumption=heat_report,
+        consumers_params=consumers_params,
+    )